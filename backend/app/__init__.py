@@ -12,6 +12,12 @@ from .routes.comments import comments_bp
 from .routes.admin import admin_bp
 from .routes.users import users_bp
 from .routes.migrate import migrate_bp
+from .utils.media_gc import media_cli
+from .utils.security import PasswordHasherBusy
+from .utils.email_utils import outbox_cli
+from .utils.points import points_cli
+from .utils.db_pool import init_pool_metrics
+from .utils.db_routing import init_replica_routing
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -31,8 +37,8 @@ def create_app(config_class=Config):
                 "https://sdf-pt10-group-09.onrender.com"
             ],
             "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "Accept"],
-            "expose_headers": ["Content-Type", "Authorization"],
+            "allow_headers": ["Content-Type", "Authorization", "Accept", "Idempotency-Key", "X-DB-Primary-Until"],
+            "expose_headers": ["Content-Type", "Authorization", "X-Total-Count", "X-Total-Count-Estimated", "X-Next-Cursor", "Idempotent-Replayed", "X-DB-Primary-Until"],
             "max_age": 600
         }},
         supports_credentials=True
@@ -45,6 +51,8 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     jwt.init_app(app)
     mail.init_app(app)
+    init_replica_routing(app, db)
+    init_pool_metrics(app, db)
 
     # ----------------------------
     # Register Blueprints
@@ -57,6 +65,13 @@ def create_app(config_class=Config):
     app.register_blueprint(admin_bp)
     app.register_blueprint(migrate_bp)
 
+    # ----------------------------
+    # CLI commands
+    # ----------------------------
+    app.cli.add_command(media_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(points_cli)
+
     # ----------------------------
     # Serve uploaded images
     # ----------------------------
@@ -64,20 +79,23 @@ def create_app(config_class=Config):
     def uploaded_files(filename):
         return send_from_directory("uploads", filename)
 
+    # Login storms: shed load instead of queueing behind the hashing pool
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        return {"message": "Server busy, please try again shortly"}, 503
+
     # Optional: health check endpoint
     @app.route("/health")
     def health_check():
         return {"status": "ok"}, 200
 
-    # Global OPTIONS handler for CORS preflight
+    # Global OPTIONS handler for CORS preflight: answer before any auth decorator
+    # runs, and leave the Access-Control-* headers to flask-cors so they always
+    # match the allow-lists configured above
     @app.before_request
     def handle_preflight():
         if request.method == "OPTIONS":
-            response = make_response()
-            response.headers.add("Access-Control-Allow-Origin", "*")
-            response.headers.add('Access-Control-Allow-Headers', "Content-Type,Authorization")
-            response.headers.add('Access-Control-Allow-Methods', "GET,PUT,POST,DELETE,OPTIONS")
-            return response
+            return make_response()
 
     return app
 
@@ -9,9 +9,99 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "superjwtsecret")
 
+    # Password hashing: werkzeug method string (algorithm and cost). Changing it
+    # rehashes each user's password on their next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))  # 0 = hash in the request thread
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 8))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", 5))  # seconds
+
+    # Token revocation: in-process bloom filter in front of the revoked_token table
+    REVOCATION_BLOOM_CAPACITY = int(os.environ.get("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+    REVOCATION_SYNC_INTERVAL = int(os.environ.get("REVOCATION_SYNC_INTERVAL", 5))  # seconds between syncs
+    REVOCATION_REBUILD_INTERVAL = int(os.environ.get("REVOCATION_REBUILD_INTERVAL", 600))  # drop expired entries
+
+    # Rate limiting (sliding window). "memory" counts per worker process;
+    # "sqlite" shares counters between all gunicorn workers on the host.
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "True") == "True"
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH = os.environ.get("RATE_LIMIT_SQLITE_PATH", "/tmp/ajali-rate-limit.sqlite3")
+    # Trusted proxies in X-Forwarded-For; Render puts one load balancer in front of the app
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get("RATE_LIMIT_PROXY_HOPS", 1))
+    RATE_LIMITS = {
+        "login": "10/minute;50/hour",  # per IP
+        "login_account": "5/minute;20/hour",  # per email, however many IPs try it
+        "signup": "5/hour",  # per IP
+        "forgot_password": "5/hour",  # per IP
+        "create_incident": "20/hour",  # per user
+        "add_comment": "30/minute",  # per user
+    }
+
+    # Leaderboard: in-process rank index, kept current from the points ledger
+    LEADERBOARD_CACHE_SIZE = int(os.environ.get("LEADERBOARD_CACHE_SIZE", 100))  # top entries kept serialized
+    LEADERBOARD_SYNC_INTERVAL = int(os.environ.get("LEADERBOARD_SYNC_INTERVAL", 5))  # seconds between ledger syncs
+    LEADERBOARD_REBUILD_INTERVAL = int(os.environ.get("LEADERBOARD_REBUILD_INTERVAL", 600))  # full reload from users
+
+    # Idempotency-Key: how long a stored response is replayed, and how long an
+    # unfinished request holds its key before a retry may run it again
+    IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", 86400))  # seconds
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get("IDEMPOTENCY_LOCK_TIMEOUT", 60))  # seconds
+
+    # Admin dashboard summary is rebuilt at most this often per worker
+    ADMIN_SUMMARY_CACHE_TTL = int(os.environ.get("ADMIN_SUMMARY_CACHE_TTL", 10))  # seconds
+
+    # Admin audit log: routes enqueue events, a background thread inserts them in batches
+    # Unset: on, except under TESTING. Off: callers flush() themselves
+    AUDIT_LOG_THREAD = {"True": True, "False": False}.get(os.environ.get("AUDIT_LOG_THREAD"))
+    AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", 200))  # rows per INSERT
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 2))  # seconds a partial batch waits
+    AUDIT_QUEUE_SIZE = int(os.environ.get("AUDIT_QUEUE_SIZE", 10000))  # events held before new ones are dropped
+    AUDIT_PAGE_SIZE = int(os.environ.get("AUDIT_PAGE_SIZE", 50))
+
+    # How long a user's role/status may be served from the in-process cache
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 30))  # seconds, 0 = no caching
+
+    # Database connection pool, per gunicorn worker: each worker may open up to
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so keep
+    # workers * (size + overflow) under the server's connection limit.
+    # Recycle connections before the provider's idle timeout closes them.
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 280))  # seconds, -1 = never
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "True") == "True"  # test connections on checkout
+
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if not SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+        SQLALCHEMY_ENGINE_OPTIONS.update(
+            pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT
+        )
+
+    # Read replicas: comma-separated URLs. GET/HEAD requests read from a healthy
+    # replica (falling back to the primary); a client that just wrote reads from
+    # the primary for DB_REPLICA_STICKY_SECONDS so it sees its own changes.
+    DB_REPLICA_URLS = [url.strip() for url in os.environ.get("DB_REPLICA_URLS", "").split(",") if url.strip()]
+    DB_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))  # longer than replication lag
+    DB_REPLICA_CHECK_INTERVAL = int(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 30))  # seconds between health pings
+    DB_REPLICA_CONNECT_TIMEOUT = int(os.environ.get("DB_REPLICA_CONNECT_TIMEOUT", 2))  # seconds, Postgres replicas
+
     # Enable SSL for Postgres if URL is Postgres
     if SQLALCHEMY_DATABASE_URI.startswith("postgresql"):
-        SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"sslmode": "require"}}
+        SQLALCHEMY_ENGINE_OPTIONS["connect_args"] = {"sslmode": "require"}
+
+    # Media uploads
+    UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER")  # defaults to app/uploads
+    MEDIA_BATCH_MAX_FILES = int(os.environ.get("MEDIA_BATCH_MAX_FILES", 10))
+    MEDIA_METADATA_WORKERS = int(os.environ.get("MEDIA_METADATA_WORKERS", 2))  # 0 = extract inline
+    IMAGE_RENDITION_QUALITY = int(os.environ.get("IMAGE_RENDITION_QUALITY", 75))  # WebP/AVIF quality
+
+    # Pagination
+    COMMENTS_PAGE_SIZE = int(os.environ.get("COMMENTS_PAGE_SIZE", 50))
+    USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", 50))
+    REDEMPTIONS_PAGE_SIZE = int(os.environ.get("REDEMPTIONS_PAGE_SIZE", 50))
+    ADMIN_INCIDENTS_PAGE_SIZE = int(os.environ.get("ADMIN_INCIDENTS_PAGE_SIZE", 50))
+    PAGINATION_EXACT_COUNT_LIMIT = int(os.environ.get("PAGINATION_EXACT_COUNT_LIMIT", 10000))  # estimate above this
 
     # Mail config
     MAIL_SERVER = os.environ.get("MAIL_SERVER", "smtp.gmail.com")
@@ -22,6 +112,32 @@ class Config:
     MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
     MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER")
 
+    # Email outbox: routes enqueue, a background sender delivers
+    EMAIL_OUTBOX_THREAD = os.environ.get("EMAIL_OUTBOX_THREAD", "True") == "True"  # False if running `flask outbox worker`
+    EMAIL_OUTBOX_POLL_INTERVAL = int(os.environ.get("EMAIL_OUTBOX_POLL_INTERVAL", 5))  # seconds
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 50))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5))
+    EMAIL_OUTBOX_RETRY_BASE = int(os.environ.get("EMAIL_OUTBOX_RETRY_BASE", 30))  # seconds, doubled per attempt
+    EMAIL_OUTBOX_LEASE = int(os.environ.get("EMAIL_OUTBOX_LEASE", 300))  # seconds before a claimed batch can be re-sent
+
+    # SMS notifications: queued in-process and sent in batches by background workers
+    SMS_ENABLED = os.environ.get("SMS_ENABLED", "True") == "True"
+    # none drops messages; console prints numbers and text, so keep it to local development
+    SMS_PROVIDER = os.environ.get("SMS_PROVIDER", "none")  # none, console, fake, africastalking
+    SMS_SENDER_ID = os.environ.get("SMS_SENDER_ID")
+    SMS_BATCH_WAIT = float(os.environ.get("SMS_BATCH_WAIT", 0.5))  # seconds to wait for a batch to fill
+    SMS_MAX_ATTEMPTS = int(os.environ.get("SMS_MAX_ATTEMPTS", 3))
+    SMS_RETRY_BACKOFF = float(os.environ.get("SMS_RETRY_BACKOFF", 30))  # seconds before a retry, doubled per attempt
+    SMS_COUNTRY_CODE = os.environ.get("SMS_COUNTRY_CODE", "254")  # for local numbers such as 07..., stored as +2547...
+    SMS_QUEUE_SIZE = int(os.environ.get("SMS_QUEUE_SIZE", 10000))
+    SMS_PROVIDER_LIMITS = {
+        # Overrides for a provider's batch_size / concurrency / rate_limit (batches per second)
+        "africastalking": {"batch_size": 500, "concurrency": 2, "rate_limit": 10},
+    }
+    AFRICASTALKING_USERNAME = os.environ.get("AFRICASTALKING_USERNAME", "sandbox")
+    AFRICASTALKING_API_KEY = os.environ.get("AFRICASTALKING_API_KEY")
+    AFRICASTALKING_SANDBOX = os.environ.get("AFRICASTALKING_SANDBOX", "False") == "True"
+
 
 
 
@@ -4,7 +4,7 @@ from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 
-db = SQLAlchemy()
+db = SQLAlchemy()  # init_replica_routing swaps in RoutingSession when DB_REPLICA_URLS is set
 migrate = Migrate()
 jwt = JWTManager()
 mail = Mail()
@@ -1,6 +1,10 @@
+import random
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from app.extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.pagination import NULL_DATETIME, sort_key
+from app.utils.security import hash_password, verify_password, needs_rehash
 
 
 class User(db.Model):
@@ -26,16 +30,32 @@ class User(db.Model):
     comments = db.relationship("Comment", backref="user", lazy=True, cascade="all, delete-orphan")
     media = db.relationship("Media", backref="user", lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination for each sort offered by the admin user directory (USER_SORT_COLUMNS)
+        db.Index("ix_user_created", sort_key(created_at, NULL_DATETIME), "id"),
+        db.Index("ix_user_name", "name", "id"),
+        db.Index("ix_user_points", sort_key(points, 0), "id"),
+        # Prefix search (LIKE 'abc%'); Postgres only uses these with pattern ops
+        db.Index("ix_user_name_lower", db.func.lower(name).label("name_lower"),
+                 postgresql_ops={"name_lower": "text_pattern_ops"}),
+        db.Index("ix_user_email_lower", db.func.lower(email).label("email_lower"),
+                 postgresql_ops={"email_lower": "text_pattern_ops"}),
+        db.Index("ix_user_phone_pattern", "phone", postgresql_ops={"phone": "text_pattern_ops"}),
+    )
+
     @property
     def password(self):
         raise AttributeError("Password is not readable")
 
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
 
 class Incident(db.Model):
@@ -46,6 +66,7 @@ class Incident(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), default="pending")  # pending, investigating, approved, resolved, rejected
     created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # maintained by Comment events
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -54,6 +75,15 @@ class Incident(db.Model):
     comments = db.relationship("Comment", backref="incident", lazy=True, cascade="all, delete-orphan")
     media = db.relationship("Media", backref="incident", lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Admin listing: status queue, per-reporter and date-range pages in created_at order,
+        # on the same NULL-safe expressions the listing filters and sorts on (INCIDENT_SORT_COLUMNS)
+        db.Index("ix_incident_status_created", sort_key(status, ""), sort_key(created_at, NULL_DATETIME), "id"),
+        db.Index("ix_incident_created_by_created", "created_by", sort_key(created_at, NULL_DATETIME), "id"),
+        db.Index("ix_incident_created", sort_key(created_at, NULL_DATETIME), "id"),
+        db.Index("ix_incident_location", "latitude", "longitude"),  # bounding-box filter
+    )
+
 
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -64,6 +94,96 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_comment_incident_created", "incident_id", sort_key(created_at, NULL_DATETIME), "id"),
+        db.Index("ix_comment_created_by", "created_by"),  # cascade when a user is deleted
+    )
+
+
+# Keep Incident.comment_count in step with its comments, in the same transaction.
+# Runs for every insert/delete path, including cascades from deleted users.
+# updated_at is pinned so a new comment doesn't count as an incident edit.
+@event.listens_for(Comment, "after_insert")
+def increment_comment_count(mapper, connection, target):
+    incident = Incident.__table__
+    connection.execute(
+        incident.update()
+        .where(incident.c.id == target.incident_id)
+        .values(comment_count=incident.c.comment_count + 1, updated_at=incident.c.updated_at)
+    )
+
+
+@event.listens_for(Comment, "after_delete")
+def decrement_comment_count(mapper, connection, target):
+    incident = Incident.__table__
+    connection.execute(
+        incident.update()
+        .where(incident.c.id == target.incident_id, incident.c.comment_count > 0)
+        .values(comment_count=incident.c.comment_count - 1, updated_at=incident.c.updated_at)
+    )
+
+
+STATUS_COUNT_SLOTS = 8  # rows per status, so concurrent writers rarely wait on the same one
+
+
+class IncidentStatusCount(db.Model):
+    """Number of incidents per status, maintained by the Incident events below.
+
+    Each status is spread over STATUS_COUNT_SLOTS rows and every change goes
+    to a random one; a status's count is the sum of its slots.
+    """
+    status = db.Column(db.String(50), primary_key=True)
+    slot = db.Column(db.Integer, primary_key=True, default=0, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def totals(cls):
+        rows = db.session.query(cls.status, db.func.sum(cls.count)).group_by(cls.status)
+        return {status: count for status, count in rows}
+
+
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _adjust_status_count(connection, status, delta):
+    if status is None:
+        return
+    counts = IncidentStatusCount.__table__
+    slot = random.randrange(STATUS_COUNT_SLOTS)
+    upsert = UPSERT_DIALECTS.get(connection.dialect.name)
+    if upsert:
+        # One statement, so two writers can't both miss the row and race to insert it
+        stmt = upsert(counts).values(status=status, slot=slot, count=delta)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[counts.c.status, counts.c.slot], set_={"count": counts.c.count + stmt.excluded.count}
+        ))
+        return
+    updated = connection.execute(
+        counts.update().where(counts.c.status == status, counts.c.slot == slot).values(count=counts.c.count + delta)
+    ).rowcount
+    if not updated:
+        connection.execute(counts.insert().values(status=status, slot=slot, count=delta))
+
+
+# Keep IncidentStatusCount in step with incidents, in the same transaction
+@event.listens_for(Incident, "after_insert")
+def count_new_incident(mapper, connection, target):
+    _adjust_status_count(connection, target.status, 1)
+
+
+@event.listens_for(Incident, "after_update")
+def count_status_change(mapper, connection, target):
+    history = db.inspect(target).attrs.status.history
+    if history.has_changes():
+        for old in history.deleted:
+            _adjust_status_count(connection, old, -1)
+        _adjust_status_count(connection, target.status, 1)
+
+
+@event.listens_for(Incident, "before_delete")  # status is still loadable here
+def count_deleted_incident(mapper, connection, target):
+    _adjust_status_count(connection, target.status, -1)
+
 
 class Media(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -72,9 +192,56 @@ class Media(db.Model):
     incident_id = db.Column(db.Integer, db.ForeignKey("incident.id"), nullable=False)
     uploaded_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    # File metadata, filled in by the background extraction worker
+    file_size = db.Column(db.Integer, nullable=True)  # bytes
+    mime_type = db.Column(db.String(100), nullable=True, index=True)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    duration = db.Column(db.Float, nullable=True)  # seconds, videos only
+    taken_at = db.Column(db.DateTime, nullable=True, index=True)  # EXIF capture time
+    gps_latitude = db.Column(db.Float, nullable=True)
+    gps_longitude = db.Column(db.Float, nullable=True)
+    phash = db.Column(db.String(16), nullable=True, index=True)  # 64-bit dHash (hex), images only
+    metadata_status = db.Column(db.String(20), default="pending")  # pending, done, failed
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_media_gps", "gps_latitude", "gps_longitude"),
+        db.Index("ix_media_incident", "incident_id", "id"),  # an incident's media, incident delete cascade
+        db.Index("ix_media_uploaded_by", "uploaded_by"),  # cascade when a user is deleted
+        db.Index("ix_media_updated", "updated_at"),  # similarity index sync
+    )
+
+
+class RevokedToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False, index=True)  # token jti, or "user:<id>" for all of a user's tokens
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    token_type = db.Column(db.String(20), nullable=False)  # access, refresh, user
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # safe to purge after this
+
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=True)
+    html = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # retry time, or lease end while sending
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
 
 class RewardRedemption(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +255,66 @@ class RewardRedemption(db.Model):
     # Relationship
     user = db.relationship("User", backref="redemptions")
 
+    __table_args__ = (
+        db.Index("ix_reward_redemption_user_redeemed", "user_id", "redeemed_at", "id"),  # history pages
+        db.Index("ix_reward_redemption_redeemed", "redeemed_at"),  # admin report date ranges
+    )
+
+
+class AuditLog(db.Model):
+    """Who did what to which record; written in batches by app.utils.audit."""
+    id = db.Column(db.Integer, primary_key=True)
+    actor_id = db.Column(db.Integer, nullable=True)  # no FK: entries outlive deleted users
+    action = db.Column(db.String(50), nullable=False)  # e.g. incident.status, user.delete
+    target_type = db.Column(db.String(30), nullable=False)  # incident, user
+    target_id = db.Column(db.Integer, nullable=True)
+    details = db.Column(db.JSON, nullable=True)
+    ip_address = db.Column(db.String(45), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_audit_log_actor_created", "actor_id", "created_at", "id"),
+        db.Index("ix_audit_log_target_created", "target_type", "target_id", "created_at", "id"),
+        db.Index("ix_audit_log_created", "created_at", "id"),
+    )
+
+
+class IdempotencyKey(db.Model):
+    """A client's Idempotency-Key and the response it got, replayed on retries."""
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(64), nullable=False)  # "user:<id>" or "ip:<addr>"
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)  # sha256 of method, path and body
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, completed
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("scope", "key", name="uq_idempotency_key_scope_key"),
+    )
+
+
+class PointsTransaction(db.Model):
+    """Append-only ledger; User.points is a cached sum of delta per user."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(50), nullable=False)  # opening_balance, incident_approved, incident_rejected, redemption, admin_adjustment
+    incident_id = db.Column(db.Integer, db.ForeignKey("incident.id", ondelete="SET NULL"), nullable=True)
+    redemption_id = db.Column(db.Integer, db.ForeignKey("reward_redemption.id", ondelete="SET NULL"), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    user = db.relationship("User", backref=db.backref("points_transactions", lazy="dynamic", cascade="all, delete-orphan"))
+
+    __table_args__ = (
+        db.Index("ix_points_transaction_user", "user_id", "id"),
+        db.Index("ix_points_transaction_incident", "incident_id"),  # ON DELETE SET NULL lookups
+    )
+
 
 
 # from datetime import datetime
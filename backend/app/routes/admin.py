@@ -1,14 +1,41 @@
 # app/routes/admin.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions import db, mail
-from app.models import Incident, User
-from flask_mail import Message
+from app.extensions import db
+from app.models import AuditLog, Incident, IncidentStatusCount, Media, RewardRedemption, User
+from app.utils.image_similarity import similarity_index
+from app.utils.user_cache import user_is_admin
+from app.utils.email_utils import queue_email
+from app.utils.sms_utils import send_sms
+from app.utils.leaderboard import get_leaderboard
+from app.utils.audit import audit
+from app.routes.incidents import ALLOWED_STATUSES
+from app.utils.db_pool import pool_metrics
+from app.utils.pagination import (
+    NULL_DATETIME, decode_cursor, encode_cursor, estimate_count, keyset_filter, keyset_page, parse_limit, sort_key,
+)
+import time
+from datetime import datetime, timedelta
 from functools import wraps
 
 # Remove strict_slashes from Blueprint constructor
 admin_bp = Blueprint("admin_bp", __name__, url_prefix="/api/v1/admin")
 
+MAX_INCIDENTS_PAGE_SIZE = 200
+MAX_AUDIT_PAGE_SIZE = 200
+# Nullable columns are read through the same COALESCE as the listing indexes, so NULL rows
+# aren't skipped between keyset pages
+INCIDENT_STATUS = sort_key(Incident.status, "")
+INCIDENT_CREATED = sort_key(Incident.created_at, NULL_DATETIME)
+INCIDENT_SORT_COLUMNS = {
+    "created_at": INCIDENT_CREATED,
+    "updated_at": sort_key(Incident.updated_at, NULL_DATETIME),
+    "status": INCIDENT_STATUS,
+    "title": Incident.title,
+    "comment_count": Incident.comment_count,
+    "id": Incident.id,
+}
+
 
 # ---------------------
 # Admin check decorator
@@ -25,25 +52,69 @@ def admin_required(fn):
         if not user_id:
             return jsonify({"message": "Authentication required"}), 401
             
-        user = User.query.get(user_id)
-        if not user or user.role != "admin":
+        if not user_is_admin(user_id):
             return jsonify({"msg": "Admin access required"}), 403
         return fn(*args, **kwargs)
     return wrapper
 
 
 # ---------------------
-# List all incidents (with optional status filter)
-# GET /api/v1/admin/incidents
+# List incidents, filtered and sorted in SQL, one page at a time
+# GET /api/v1/admin/incidents?status=pending,investigating&reporter=3&from=2025-01-01&to=2025-02-01
+#     &bbox=min_lon,min_lat,max_lon,max_lat&q=accident&sort=status,-created_at&limit=50&cursor=<next_cursor>
+# sort takes comma-separated keys (prefix "-" for descending); the next
+# page's cursor is returned in the X-Next-Cursor header
 # ---------------------
 @admin_bp.route("/incidents", methods=["GET"], strict_slashes=False)
 @admin_required
 def list_all_incidents():
-    status_filter = request.args.get("status")
-    query = Incident.query
-    if status_filter:
-        query = query.filter_by(status=status_filter)
-    incidents = query.all()
+    try:
+        limit = parse_limit(current_app.config.get("ADMIN_INCIDENTS_PAGE_SIZE", 50), MAX_INCIDENTS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    keys = []
+    for part in request.args.get("sort", "-created_at").split(","):
+        column = INCIDENT_SORT_COLUMNS.get(part.strip().lstrip("-"))
+        if column is None:
+            return jsonify({"msg": f"sort keys must be among: {', '.join(INCIDENT_SORT_COLUMNS)}"}), 400
+        keys.append((column, part.strip().startswith("-")))
+    if not any(column is Incident.id for column, _ in keys):
+        keys.append((Incident.id, keys[-1][1]))  # tie-breaker so the keyset is unique
+
+    filters = []
+    if request.args.get("status"):
+        filters.append(INCIDENT_STATUS.in_(request.args["status"].split(",")))
+    try:
+        if request.args.get("reporter"):
+            filters.append(Incident.created_by == int(request.args["reporter"]))
+        if request.args.get("from"):
+            filters.append(INCIDENT_CREATED >= datetime.fromisoformat(request.args["from"]))
+        if request.args.get("to"):
+            filters.append(INCIDENT_CREATED < datetime.fromisoformat(request.args["to"]))
+        if request.args.get("bbox"):
+            min_lon, min_lat, max_lon, max_lat = [float(v) for v in request.args["bbox"].split(",")]
+            filters += [Incident.latitude.between(min_lat, max_lat), Incident.longitude.between(min_lon, max_lon)]
+    except ValueError:
+        return jsonify({"msg": "reporter must be an id, from/to ISO dates and bbox four numbers"}), 400
+    search = request.args.get("q", "").strip()
+    if search:
+        pattern = "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        filters.append(db.or_(
+            Incident.title.ilike(pattern, escape="\\"), Incident.description.ilike(pattern, escape="\\")
+        ))
+
+    query = Incident.query.filter(*filters)
+    total, exact = estimate_count(query)
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor, [column for column, _ in keys])
+        if not position:
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(keys, position))
+    incidents, next_cursor = keyset_page(query, keys, limit)
+
     result = [
         {
             "id": i.id,
@@ -51,10 +122,71 @@ def list_all_incidents():
             "description": i.description,
             "status": i.status,
             "created_by": i.created_by,
-            "created_at": i.created_at
+            "created_at": i.created_at,
+            "comment_count": i.comment_count
         } for i in incidents
     ]
-    return jsonify(result)
+    response = jsonify(result)
+    response.headers["X-Total-Count"] = str(total)
+    if not exact:
+        response.headers["X-Total-Count-Estimated"] = "true"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
+# ---------------------
+# Dashboard summary: counters and a few small indexed queries, cached briefly
+# GET /api/v1/admin/summary?pending=10&top=5
+# ---------------------
+@admin_bp.route("/summary", methods=["GET"], strict_slashes=False)
+@admin_required
+def admin_summary():
+    try:
+        pending_n = max(0, min(int(request.args.get("pending", 10)), 50))
+        top_n = max(0, min(int(request.args.get("top", 5)), 50))
+    except ValueError:
+        return jsonify({"msg": "pending and top must be integers"}), 400
+
+    cache = current_app.extensions.setdefault("admin_summary", {})
+    cached = cache.get((pending_n, top_n))
+    if cached and cached[0] > time.monotonic():
+        return jsonify(cached[1])
+
+    status_counts = {status: 0 for status in ALLOWED_STATUSES}
+    status_counts.update(IncidentStatusCount.totals())
+    since = datetime.utcnow() - timedelta(hours=1)
+    new_last_hour = db.session.query(db.func.count(Incident.id)).filter(INCIDENT_CREATED >= since).scalar()
+    pending = (
+        Incident.query.filter(INCIDENT_STATUS == "pending")
+        .order_by(INCIDENT_CREATED.desc(), Incident.id.desc())
+        .limit(pending_n)
+        .all()
+    )
+    users, users_exact = estimate_count(User.query)
+
+    summary = {
+        "incidents": {
+            "total": sum(status_counts.values()),
+            "by_status": status_counts,
+            "new_last_hour": new_last_hour
+        },
+        "users": {"total": users, "estimated": not users_exact},
+        "top_reporters": get_leaderboard().top_users(top_n),
+        "latest_pending": [
+            {
+                "id": i.id,
+                "title": i.title,
+                "created_by": i.created_by,
+                "created_at": i.created_at,
+                "latitude": i.latitude,
+                "longitude": i.longitude
+            } for i in pending
+        ],
+        "generated_at": datetime.utcnow().isoformat()
+    }
+    cache[(pending_n, top_n)] = (time.monotonic() + current_app.config.get("ADMIN_SUMMARY_CACHE_TTL", 10), summary)
+    return jsonify(summary)
 
 
 # ---------------------
@@ -70,21 +202,23 @@ def update_incident_status(id):
     if new_status not in ["pending", "investigating", "approved", "resolved", "rejected"]:
         return jsonify({"msg": "Invalid status"}), 400
 
+    old_status = incident.status
     incident.status = new_status
-    db.session.commit()
 
-    # Notify reporter via email
+    # Notify reporter via email (queued in the same transaction as the status change)
     reporter = User.query.get(incident.created_by)
     if reporter and reporter.email:
-        try:
-            msg = Message(
-                subject=f"Incident #{incident.id} Status Updated",
-                recipients=[reporter.email],
-                body=f"Hi {reporter.name},\n\nYour incident '{incident.title}' status has been updated to '{new_status}'."
-            )
-            mail.send(msg)
-        except Exception as e:
-            print(f"Email send failed: {e}")
+        queue_email(
+            reporter.email,
+            f"Incident #{incident.id} Status Updated",
+            body=f"Hi {reporter.name},\n\nYour incident '{incident.title}' status has been updated to '{new_status}'."
+        )
+    db.session.commit()
+    audit("incident.status", "incident", incident.id, old=old_status, new=new_status)
+
+    # SMS goes out from a background worker once the change is committed
+    if reporter and old_status != new_status:
+        send_sms(reporter.phone, f"Your incident #{incident.id} '{incident.title}' is now {new_status}.")
 
     return jsonify({"msg": f"Incident status updated to {new_status}"})
 
@@ -112,6 +246,7 @@ def edit_incident(id):
         incident.longitude = data["longitude"]
     
     db.session.commit()
+    audit("incident.edit", "incident", incident.id, fields=sorted(data))
     return jsonify({"msg": "Incident updated successfully"}), 200
 
 
@@ -123,9 +258,232 @@ def edit_incident(id):
 @admin_required
 def delete_user_incident(id):
     incident = Incident.query.get_or_404(id)
+    title, reporter = incident.title, incident.created_by
     db.session.delete(incident)
     db.session.commit()
+    audit("incident.delete", "incident", id, title=title, created_by=reporter)
     return jsonify({"msg": "Incident deleted by admin"}), 200
+
+
+# ---------------------
+# Helper: ?max_distance= in bits, 0..20; raises ValueError if it isn't a number
+# ---------------------
+def parse_max_distance():
+    return max(0, min(int(request.args.get("max_distance", 10)), 20))
+
+
+# ---------------------
+# Admin: Images similar to a media item
+# GET /api/v1/admin/media/<id>/similar?max_distance=10
+# ---------------------
+@admin_bp.route("/media/<int:id>/similar", methods=["GET"], strict_slashes=False)
+@admin_required
+def similar_media(id):
+    media = Media.query.get_or_404(id)
+    if not media.phash:
+        return jsonify({"msg": "No perceptual hash for this media yet"}), 404
+
+    try:
+        max_distance = parse_max_distance()
+    except ValueError:
+        return jsonify({"msg": "max_distance must be an integer"}), 400
+    matches = [(d, media_id) for d, media_id in similarity_index.similar(media.phash, max_distance) if media_id != media.id]
+    found = {m.id: m for m in Media.query.filter(Media.id.in_([media_id for _, media_id in matches])).all()}
+
+    result = [
+        {
+            "id": media_id,
+            "distance": distance,
+            "incident_id": found[media_id].incident_id,
+            "file_url": found[media_id].file_url,
+            "uploaded_by": found[media_id].uploaded_by
+        } for distance, media_id in matches if media_id in found
+    ]
+    return jsonify(result)
+
+
+# ---------------------
+# Admin: Likely duplicate incidents (sharing similar images)
+# GET /api/v1/admin/incidents/<id>/similar?max_distance=10
+# ---------------------
+@admin_bp.route("/incidents/<int:id>/similar", methods=["GET"], strict_slashes=False)
+@admin_required
+def similar_incidents(id):
+    incident = Incident.query.get_or_404(id)
+    try:
+        max_distance = parse_max_distance()
+    except ValueError:
+        return jsonify({"msg": "max_distance must be an integer"}), 400
+
+    # media id -> best distance to any image of this incident
+    best = {}
+    for media in incident.media:
+        if not media.phash:
+            continue
+        for distance, media_id in similarity_index.similar(media.phash, max_distance):
+            if distance < best.get(media_id, max_distance + 1):
+                best[media_id] = distance
+
+    matches = {}
+    if best:
+        rows = Media.query.filter(Media.id.in_(list(best)), Media.incident_id != incident.id).all()
+        for m in rows:
+            entry = matches.setdefault(m.incident_id, {"incident_id": m.incident_id, "matches": 0, "best_distance": best[m.id]})
+            entry["matches"] += 1
+            entry["best_distance"] = min(entry["best_distance"], best[m.id])
+
+    titles = {i.id: i for i in Incident.query.filter(Incident.id.in_(list(matches))).all()} if matches else {}
+    result = sorted(matches.values(), key=lambda e: (e["best_distance"], -e["matches"]))
+    for entry in result:
+        entry["title"] = titles[entry["incident_id"]].title
+        entry["status"] = titles[entry["incident_id"]].status
+    return jsonify(result)
+
+
+# ---------------------
+# Helper: truncate a timestamp to a day/week/month bucket in SQL ("YYYY-MM-DD")
+# ---------------------
+REPORT_BUCKETS = ["day", "week", "month"]
+
+
+def time_bucket(column, bucket):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return db.func.to_char(db.func.date_trunc(bucket, column), "YYYY-MM-DD")
+    if bucket == "week":
+        return db.func.date(column, "weekday 0", "-6 days")  # Monday, as in date_trunc
+    return db.func.strftime("%Y-%m-01" if bucket == "month" else "%Y-%m-%d", column)
+
+
+# ---------------------
+# Admin: Redemption report, aggregated in SQL
+# GET /api/v1/admin/redemptions/report?bucket=week&from=2025-01-01&to=2025-02-01&user_id=3&status=completed
+# ---------------------
+@admin_bp.route("/redemptions/report", methods=["GET"], strict_slashes=False)
+@admin_required
+def redemption_report():
+    bucket = request.args.get("bucket", "day")
+    if bucket not in REPORT_BUCKETS:
+        return jsonify({"msg": f"bucket must be one of: {', '.join(REPORT_BUCKETS)}"}), 400
+
+    filters = []
+    try:
+        if request.args.get("from"):
+            filters.append(RewardRedemption.redeemed_at >= datetime.fromisoformat(request.args["from"]))
+        if request.args.get("to"):
+            filters.append(RewardRedemption.redeemed_at < datetime.fromisoformat(request.args["to"]))
+        if request.args.get("user_id"):
+            filters.append(RewardRedemption.user_id == int(request.args["user_id"]))
+    except ValueError:
+        return jsonify({"msg": "from/to must be ISO dates and user_id an integer"}), 400
+    if request.args.get("status"):
+        filters.append(RewardRedemption.status == request.args["status"])
+
+    period = time_bucket(RewardRedemption.redeemed_at, bucket).label("bucket")
+    count = db.func.count(RewardRedemption.id)
+    points = db.func.coalesce(db.func.sum(RewardRedemption.points_spent), 0)
+
+    totals = db.session.query(count, points, db.func.count(db.distinct(RewardRedemption.user_id))).filter(*filters).one()
+    by_reward = (
+        db.session.query(RewardRedemption.reward_name, count, points)
+        .filter(*filters)
+        .group_by(RewardRedemption.reward_name)
+        .order_by(points.desc())
+        .all()
+    )
+    by_bucket = (
+        db.session.query(period, RewardRedemption.reward_name, count, points)
+        .filter(*filters)
+        .group_by(period, RewardRedemption.reward_name)
+        .order_by(period, RewardRedemption.reward_name)
+        .all()
+    )
+
+    return jsonify({
+        "bucket": bucket,
+        "totals": {"redemptions": totals[0], "points_spent": totals[1], "users": totals[2]},
+        "by_reward": [
+            {"reward_name": name, "redemptions": n, "points_spent": p} for name, n, p in by_reward
+        ],
+        "by_bucket": [
+            {"bucket": b, "reward_name": name, "redemptions": n, "points_spent": p} for b, name, n, p in by_bucket
+        ]
+    })
+
+
+# ---------------------
+# Admin: Audit log, newest first
+# GET /api/v1/admin/audit?actor=3&target_type=user&target_id=7&action=user.status
+#     &from=2025-01-01&to=2025-02-01&limit=50&cursor=<next_cursor>
+# Events are written in the background, so the last couple of seconds may not show yet
+# ---------------------
+@admin_bp.route("/audit", methods=["GET"], strict_slashes=False)
+@admin_required
+def audit_log():
+    try:
+        limit = parse_limit(current_app.config.get("AUDIT_PAGE_SIZE", 50), MAX_AUDIT_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    filters = []
+    try:
+        if request.args.get("actor"):
+            filters.append(AuditLog.actor_id == int(request.args["actor"]))
+        if request.args.get("target_id"):
+            filters.append(AuditLog.target_id == int(request.args["target_id"]))
+        if request.args.get("from"):
+            filters.append(AuditLog.created_at >= datetime.fromisoformat(request.args["from"]))
+        if request.args.get("to"):
+            filters.append(AuditLog.created_at < datetime.fromisoformat(request.args["to"]))
+    except ValueError:
+        return jsonify({"msg": "actor/target_id must be integers and from/to ISO dates"}), 400
+    if request.args.get("target_type"):
+        filters.append(AuditLog.target_type == request.args["target_type"])
+    elif request.args.get("target_id"):
+        return jsonify({"msg": "target_id requires target_type"}), 400
+    if request.args.get("action"):
+        filters.append(AuditLog.action == request.args["action"])
+
+    keys = [(AuditLog.created_at, True), (AuditLog.id, True)]
+    query = AuditLog.query.filter(*filters)
+    cursor = request.args.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor, [column for column, _ in keys])
+        if not position:
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(keys, position))
+
+    events = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    response = jsonify([
+        {
+            "id": e.id,
+            "actor_id": e.actor_id,
+            "action": e.action,
+            "target_type": e.target_type,
+            "target_id": e.target_id,
+            "details": e.details,
+            "ip_address": e.ip_address,
+            "created_at": e.created_at
+        } for e in events
+    ])
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor([events[-1].created_at, events[-1].id])
+    return response
+
+
+# ---------------------
+# Admin: Database connection pool metrics for the worker that serves the request
+# GET /api/v1/admin/db/pool
+# Counters are per gunicorn worker; worker_pid tells samples apart
+# ---------------------
+@admin_bp.route("/db/pool", methods=["GET"], strict_slashes=False)
+@admin_required
+def db_pool_metrics():
+    return jsonify(pool_metrics(current_app))
+
+
 # from flask_jwt_extended import jwt_required, get_jwt_identity
 # from app.extensions import db, mail
 # from app.models import Incident, User
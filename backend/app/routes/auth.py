@@ -4,12 +4,18 @@ from flask_jwt_extended import (
     create_refresh_token,
     jwt_required,
     get_jwt_identity,
+    get_jwt,
 )
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from werkzeug.security import check_password_hash, generate_password_hash
-from app.extensions import db, mail
+from app.extensions import db
 from app.models import User
-from flask_mail import Message
+from app.utils.user_cache import get_cached_user, get_current_user, invalidate_cached_user, user_is_admin
+from app.utils.token_revocation import revoke_token
+from app.utils.rate_limit import rate_limit
+from app.utils.leaderboard import get_leaderboard
+from app.utils.email_utils import queue_email
+from app.utils.audit import audit
 
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/api/v1/auth")
 
@@ -22,6 +28,11 @@ def generate_token(email):
     return s.dumps(email, salt="password-reset-salt")
 
 
+def token_claims(user):
+    """Role and status ride along in access tokens so most requests skip the user lookup."""
+    return {"role": user.role, "status": user.status}
+
+
 def verify_token(token, expiration=3600):
     s = URLSafeTimedSerializer(current_app.config["SECRET_KEY"])
     try:
@@ -35,6 +46,7 @@ def verify_token(token, expiration=3600):
 # Signup
 # ---------------------
 @auth_bp.route("/signup", methods=["POST"])
+@rate_limit("signup")
 def signup():
     data = request.get_json()
     
@@ -62,12 +74,15 @@ def signup():
     
     db.session.add(user)
     db.session.commit()
+    get_leaderboard().update(user.id, user.name, user.points)
 
     return jsonify({"message": "User registered successfully"}), 201
 
 
 # ---------------------
 @auth_bp.route("/login", methods=["POST"])
+@rate_limit("login")
+@rate_limit("login_account", key="email")
 def login():
     data = request.get_json()
     
@@ -84,7 +99,15 @@ def login():
     if not user or not user.check_password(password):
         return jsonify({"message": "Invalid credentials"}), 401
 
-    access_token = create_access_token(identity=str(user.id))
+    if user.status == "suspended":
+        return jsonify({"message": "Account suspended"}), 403
+
+    # Transparently upgrade hashes made with an older algorithm or cost
+    if user.password_needs_rehash():
+        user.password = password
+        db.session.commit()
+
+    access_token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
     refresh_token = create_refresh_token(identity=str(user.id))
 
     return jsonify({
@@ -124,16 +147,32 @@ def me():
 @auth_bp.route("/refresh", methods=["POST"])
 @jwt_required(refresh=True)
 def refresh():
-    user_id = int(get_jwt_identity())
-    access_token = create_access_token(identity=str(user_id))
+    user = get_current_user()
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    access_token = create_access_token(identity=str(user.id), additional_claims=token_claims(user))
     return jsonify({"access_token": access_token})
 
 
+# ---------------------
+# Logout: revoke the presented access or refresh token
+# POST /api/v1/auth/logout
+# ---------------------
+@auth_bp.route("/logout", methods=["POST"])
+@jwt_required(verify_type=False)
+def logout():
+    revoke_token(get_jwt())
+    db.session.commit()
+    return jsonify({"message": "Token revoked"}), 200
+
+
 # ---------------------
 # Forgot password (send reset email)
 # POST /api/v1/auth/forgot-password
 # ---------------------
 @auth_bp.route("/forgot-password", methods=["POST", "OPTIONS"])
+@rate_limit("forgot_password")
 def forgot_password():
     # Handle preflight OPTIONS request
     if request.method == 'OPTIONS':
@@ -149,31 +188,25 @@ def forgot_password():
     if not user:
         return jsonify({"message": "Email not registered"}), 404
     
-    try:
-        # Generate reset token
-        token = generate_token(user.email)
-        reset_url = f"https://sdf-pt-10-group-09.vercel.app/reset-password?token={token}"
-        
-        # Send email
-        msg = Message(
-            "Password Reset Request",
-            recipients=[user.email],
-            html=f"""
-            <h2>Password Reset Request</h2>
-            <p>You have requested to reset your password. Click the link below to reset it:</p>
-            <p><a href="{reset_url}">Reset Password</a></p>
-            <p>This link will expire in 1 hour.</p>
-            <p>If you did not request this, please ignore this email.</p>
-            """
-        )
-        mail.send(msg)
-        
-        return jsonify({"message": "Password reset email sent"}), 200
-    
-    except Exception as e:
-        print(f"[ERROR] Failed to send password reset email: {str(e)}")
-        # Still return success to prevent email enumeration attacks
-        return jsonify({"message": "Password reset email sent"}), 200
+    # Generate reset token
+    token = generate_token(user.email)
+    reset_url = f"https://sdf-pt-10-group-09.vercel.app/reset-password?token={token}"
+
+    # Queue the email; the outbox sender delivers it off the request thread
+    queue_email(
+        user.email,
+        "Password Reset Request",
+        html=f"""
+        <h2>Password Reset Request</h2>
+        <p>You have requested to reset your password. Click the link below to reset it:</p>
+        <p><a href="{reset_url}">Reset Password</a></p>
+        <p>This link will expire in 1 hour.</p>
+        <p>If you did not request this, please ignore this email.</p>
+        """
+    )
+    db.session.commit()
+
+    return jsonify({"message": "Password reset email sent"}), 200
 
 
 # ---------------------
@@ -260,14 +293,17 @@ def change_password():
 @jwt_required()
 def promote_user(user_id):
     current_user_id = int(get_jwt_identity())
-    current_user = User.query.get_or_404(current_user_id)
+    if not get_cached_user(current_user_id):
+        return jsonify({"message": "User not found"}), 404
 
-    if current_user.role != "admin":
+    if not user_is_admin(current_user_id):
         return jsonify({"message": "Admins only"}), 403
 
     user = User.query.get_or_404(user_id)
     user.role = "admin"
     db.session.commit()
+    invalidate_cached_user(user.id)
+    audit("user.role", "user", user.id, new="admin")
 
     return jsonify({"message": f"User {user.email} promoted to admin"}), 200
 
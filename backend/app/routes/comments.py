@@ -1,12 +1,24 @@
 # app/routes/comments.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
-from app.models import Comment, Incident
+from app.models import Comment, Incident, User
+from app.utils.user_cache import user_is_admin
+from app.utils.rate_limit import rate_limit
+from app.utils.pagination import NULL_DATETIME, decode_cursor, keyset_filter, keyset_page, parse_limit, sort_key
 
 # ✅ Removed strict_slashes from Blueprint
 comments_bp = Blueprint("comments_bp", __name__, url_prefix="/api/v1/incidents")
 
+MAX_COMMENTS_PAGE_SIZE = 200
+MAX_BATCH_INCIDENTS = 100
+MAX_LATEST_PER_INCIDENT = 20
+
+# Oldest first, with NULL created_at read as the oldest so keyset pages don't skip
+# those comments; matches ix_comment_incident_created
+COMMENT_CREATED = sort_key(Comment.created_at, NULL_DATETIME)
+COMMENT_KEYS = [(COMMENT_CREATED, False), (Comment.id, False)]
+
 
 # ---------------------
 # Add a comment to an incident
@@ -14,6 +26,7 @@ comments_bp = Blueprint("comments_bp", __name__, url_prefix="/api/v1/incidents")
 # ---------------------
 @comments_bp.route("/<int:incident_id>/comments", methods=["POST"], strict_slashes=False)
 @jwt_required()
+@rate_limit("add_comment", key="user")
 def add_comment(incident_id):
     data = request.get_json()
     text = data.get("text")
@@ -29,20 +42,34 @@ def add_comment(incident_id):
         created_by=user_id
     )
     db.session.add(comment)
-    db.session.commit()
+    db.session.commit()  # incident.comment_count is bumped in the same transaction
 
     return jsonify({"msg": "Comment added", "comment_id": comment.id}), 201
 
 
 # ---------------------
-# List all comments for an incident
-# GET /api/v1/incidents/<id>/comments
+# List comments for an incident, oldest first, one page at a time
+# GET /api/v1/incidents/<id>/comments?limit=50&cursor=<next_cursor>
+# The next page's cursor is returned in the X-Next-Cursor header
 # ---------------------
 @comments_bp.route("/<int:incident_id>/comments", methods=["GET"], strict_slashes=False)
 def list_comments(incident_id):
     incident = Incident.query.get_or_404(incident_id)
-    comments = Comment.query.filter_by(incident_id=incident.id).all()
-    
+
+    try:
+        limit = parse_limit(current_app.config.get("COMMENTS_PAGE_SIZE", 50), MAX_COMMENTS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    query = Comment.query.filter_by(incident_id=incident.id)
+    cursor = request.args.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor, [column for column, _ in COMMENT_KEYS])
+        if not position:
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(COMMENT_KEYS, position))
+    comments, next_cursor = keyset_page(query, COMMENT_KEYS, limit)
+
     result = [
         {
             "id": c.id,
@@ -51,8 +78,76 @@ def list_comments(incident_id):
             "created_at": c.created_at
         } for c in comments
     ]
+    response = jsonify(result)
+    response.headers["X-Total-Count"] = str(incident.comment_count)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
+
+
+# ---------------------
+# Latest comments for several incidents in one query
+# GET /api/v1/incidents/comments/latest?ids=1,2,3&k=3
+# ---------------------
+@comments_bp.route("/comments/latest", methods=["GET"], strict_slashes=False)
+def latest_comments():
+    try:
+        incident_ids = {int(i) for i in request.args.get("ids", "").split(",") if i.strip()}
+        k = int(request.args.get("k", 3))
+    except ValueError:
+        return jsonify({"msg": "ids must be a comma-separated list of integers"}), 400
+
+    if not incident_ids:
+        return jsonify({"msg": "ids is required"}), 400
+    if len(incident_ids) > MAX_BATCH_INCIDENTS:
+        return jsonify({"msg": f"At most {MAX_BATCH_INCIDENTS} incidents per request"}), 400
+    k = max(1, min(k, MAX_LATEST_PER_INCIDENT))
+
+    # Rank comments within each incident, newest first, and keep the top k
+    rank = db.func.row_number().over(
+        partition_by=Comment.incident_id,
+        order_by=(COMMENT_CREATED.desc(), Comment.id.desc())
+    ).label("rank")
+    ranked = (
+        db.session.query(Comment.id, Comment.incident_id, Comment.text, Comment.created_by, Comment.created_at, rank)
+        .filter(Comment.incident_id.in_(incident_ids))
+        .subquery()
+    )
+    rows = (
+        db.session.query(ranked, User.name)
+        .join(User, User.id == ranked.c.created_by)
+        .filter(ranked.c.rank <= k)
+        .order_by(ranked.c.incident_id, ranked.c.rank)
+        .all()
+    )
+
+    result = {str(incident_id): [] for incident_id in sorted(incident_ids)}
+    for row in rows:
+        result[str(row.incident_id)].append({
+            "id": row.id,
+            "text": row.text,
+            "created_by": row.created_by,
+            "author_name": row.name,
+            "created_at": row.created_at
+        })
     return jsonify(result), 200
 
+# ---------------------
+# Delete a comment (author or admin)
+# DELETE /api/v1/incidents/<id>/comments/<comment_id>
+# ---------------------
+@comments_bp.route("/<int:incident_id>/comments/<int:comment_id>", methods=["DELETE"], strict_slashes=False)
+@jwt_required()
+def delete_comment(incident_id, comment_id):
+    user_id = int(get_jwt_identity())
+    comment = Comment.query.filter_by(id=comment_id, incident_id=incident_id).first_or_404()
+
+    if comment.created_by != user_id and not user_is_admin(user_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    db.session.delete(comment)
+    db.session.commit()  # incident.comment_count is decremented in the same transaction
+    return jsonify({"msg": "Comment deleted"}), 200
 
 
 
@@ -2,6 +2,12 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
 from app.models import Incident, Media, User
+from app.routes.media import serialize_media
+from app.utils.user_cache import user_is_admin
+from app.utils.rate_limit import rate_limit
+from app.utils.idempotency import idempotent
+from app.utils.sms_utils import send_sms
+from app.utils.points import INCIDENT_APPROVED_POINTS, apply_points
 
 incidents_bp = Blueprint("incidents_bp", __name__, url_prefix="/api/v1/incidents")
 
@@ -14,25 +20,15 @@ ALLOWED_STATUSES = ["pending", "investigating", "approved", "resolved", "rejecte
 # ------------------------------------------------
 def format_media_list(incident):
     """Return a list of media dicts for the given incident."""
-    return [
-        {
-            "id": m.id,
-            "filename": m.filename,
-            "file_url": m.file_url,
-            "uploaded_by": m.uploaded_by,
-            "created_at": m.created_at
-        }
-        for m in incident.media
-    ]
+    return [serialize_media(m) for m in incident.media]
 
 
 # -------------------------------------------------
 # Helper: check if user is admin
 # -------------------------------------------------
 def is_admin(user_id):
-    """Check if the user is an admin."""
-    user = User.query.get(user_id)
-    return user and user.role == "admin"
+    """Check if the user is an admin (JWT claims / user cache, not a fresh query)."""
+    return user_is_admin(user_id)
 
 
 # -------------------------------------------------
@@ -57,6 +53,7 @@ def get_all_incidents():
             "created_by": inc.created_by,
             "created_at": inc.created_at,
             "updated_at": inc.updated_at,
+            "comment_count": inc.comment_count,
             "media": media_list
         })
 
@@ -83,6 +80,7 @@ def get_incident(incident_id):
         "created_by": incident.created_by,
         "created_at": incident.created_at,
         "updated_at": incident.updated_at,
+        "comment_count": incident.comment_count,
         "media": media_list
     }
     return jsonify(response), 200
@@ -94,6 +92,8 @@ def get_incident(incident_id):
 # -------------------------------------------------
 @incidents_bp.route("/", methods=["POST"])
 @jwt_required()
+@idempotent
+@rate_limit("create_incident", key="user")
 def create_incident():
     data = request.get_json()
     user_id = int(get_jwt_identity())
@@ -153,9 +153,7 @@ def update_incident(incident_id):
         
         # Award points if status moves to approved
         if new_status == "approved" and incident.status != "approved":
-            incident_user = User.query.get(incident.created_by)
-            if incident_user:
-                incident_user.points += 10  # Award 10 points for approved incident
+            apply_points(incident.created_by, INCIDENT_APPROVED_POINTS, "incident_approved", incident_id=incident.id)
         
         incident.status = new_status
 
@@ -201,17 +199,19 @@ def update_incident_status(incident_id):
     
     # Award points if status moves to approved
     if new_status == "approved" and old_status != "approved":
-        incident_user = User.query.get(incident.created_by)
-        if incident_user:
-            incident_user.points += 10
+        apply_points(incident.created_by, INCIDENT_APPROVED_POINTS, "incident_approved", incident_id=incident.id)
     
-    # Deduct points if previously approved incident is rejected
+    # Deduct points if previously approved incident is rejected (skipped if already spent)
     elif new_status == "rejected" and old_status == "approved":
-        incident_user = User.query.get(incident.created_by)
-        if incident_user and incident_user.points >= 10:
-            incident_user.points -= 10
+        apply_points(incident.created_by, -INCIDENT_APPROVED_POINTS, "incident_rejected", incident_id=incident.id)
     
     db.session.commit()
+
+    # Let the reporter know by SMS (queued, sent by a background worker)
+    if new_status != old_status:
+        reporter = User.query.get(incident.created_by)
+        if reporter:
+            send_sms(reporter.phone, f"Your incident #{incident.id} '{incident.title}' is now {new_status}.")
     
     return jsonify({
         "msg": f"Incident status updated from '{old_status}' to '{new_status}'",
@@ -1,9 +1,15 @@
 import os
+import mimetypes
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
 from werkzeug.utils import secure_filename
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
-from app.models import Media, Incident, User
+from app.models import Media, Incident
+from app.utils.media_metadata import schedule_metadata_extraction
+from app.utils.image_renditions import negotiate_format, get_rendition, remove_renditions
+from app.utils.image_similarity import similarity_index
+from app.utils.user_cache import user_is_admin
+from app.utils.idempotency import idempotent
 
 media_bp = Blueprint("media_bp", __name__, url_prefix="/api/v1/media")
 
@@ -15,19 +21,85 @@ ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "mp4", "mov", "avi"}
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
+
+def get_upload_folder():
+    upload_folder = current_app.config.get("UPLOAD_FOLDER") or os.path.join(current_app.root_path, "uploads")
+    os.makedirs(upload_folder, exist_ok=True)
+    return upload_folder
+
+
+def save_upload(file):
+    """Stream an uploaded file to the uploads folder without overwriting existing files.
+
+    Returns the stored filename and its public serving URL.
+    """
+    upload_folder = get_upload_folder()
+    filename = secure_filename(file.filename)
+    base, ext = os.path.splitext(filename)
+    counter = 1
+    # O_EXCL reserves the name atomically, so concurrent uploads of the same name can't both take it
+    while True:
+        path = os.path.join(upload_folder, filename)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            break
+        except FileExistsError:
+            filename = f"{base}_{counter}{ext}"
+            counter += 1
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            file.save(out)
+    except Exception:
+        os.remove(path)
+        raise
+    return filename, f"/api/v1/media/uploads/{filename}"  # Public serving URL
+
+
+def new_media(filename, file_url, incident_id, user_id):
+    """Build a Media row with the cheap metadata (size, MIME type) filled in up front."""
+    return Media(
+        filename=filename,
+        file_url=file_url,
+        incident_id=incident_id,
+        uploaded_by=user_id,
+        file_size=os.path.getsize(os.path.join(get_upload_folder(), filename)),
+        mime_type=mimetypes.guess_type(filename)[0]
+    )
+
+
+def serialize_media(m):
+    return {
+        "id": m.id,
+        "filename": m.filename,
+        "file_url": m.file_url,
+        "uploaded_by": m.uploaded_by,
+        "file_size": m.file_size,
+        "mime_type": m.mime_type,
+        "width": m.width,
+        "height": m.height,
+        "duration": m.duration,
+        "taken_at": m.taken_at.isoformat() if m.taken_at else None,
+        "gps_latitude": m.gps_latitude,
+        "gps_longitude": m.gps_longitude,
+        "phash": m.phash,
+        "metadata_status": m.metadata_status,
+        "created_at": m.created_at
+    }
+
 # ---------------------
 # Upload media to an incident
 # POST /api/v1/media/<incident_id>/upload
 # ---------------------
 @media_bp.route("/<int:incident_id>/upload", methods=["POST"])
 @jwt_required()
+@idempotent
 def upload_media(incident_id):
     user_id = int(get_jwt_identity())  # ✅ cast to int
     incident = Incident.query.get_or_404(incident_id)
 
     # Check ownership or admin
-    user = User.query.get(user_id)
-    if incident.created_by != user_id and user.role != "admin":
+    if incident.created_by != user_id and not user_is_admin(user_id):
         return jsonify({"msg": "Unauthorized"}), 403
 
     if "file" not in request.files:
@@ -38,21 +110,11 @@ def upload_media(incident_id):
         return jsonify({"msg": "No selected file"}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        upload_folder = os.path.join(current_app.root_path, "uploads")
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-
-        file_url = f"/api/v1/media/uploads/{filename}"  # Public serving URL
-        media = Media(
-            filename=filename,
-            file_url=file_url,
-            incident_id=incident.id,
-            uploaded_by=user_id
-        )
+        filename, file_url = save_upload(file)
+        media = new_media(filename, file_url, incident.id, user_id)
         db.session.add(media)
         db.session.commit()
+        schedule_metadata_extraction([media.id], get_upload_folder())
 
         return jsonify({
             "msg": "File uploaded successfully",
@@ -62,6 +124,74 @@ def upload_media(incident_id):
 
     return jsonify({"msg": f"File type not allowed. Allowed: {ALLOWED_EXTENSIONS}"}), 400
 
+# ---------------------
+# Upload several media files to an incident in one request
+# POST /api/v1/media/<incident_id>/upload/batch
+# ---------------------
+@media_bp.route("/<int:incident_id>/upload/batch", methods=["POST"])
+@jwt_required()
+@idempotent
+def upload_media_batch(incident_id):
+    user_id = int(get_jwt_identity())
+    incident = Incident.query.get_or_404(incident_id)
+
+    # Check ownership or admin
+    if incident.created_by != user_id and not user_is_admin(user_id):
+        return jsonify({"msg": "Unauthorized"}), 403
+
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"msg": "No files part"}), 400
+
+    max_files = current_app.config.get("MEDIA_BATCH_MAX_FILES", 10)
+    if len(files) > max_files:
+        return jsonify({"msg": f"Too many files. Maximum per batch: {max_files}"}), 400
+
+    results = []
+    saved = []  # (result, media) pairs for files written to disk
+    for file in files:
+        if file.filename == "":
+            results.append({"filename": "", "status": "rejected", "msg": "No selected file"})
+            continue
+        if not allowed_file(file.filename):
+            results.append({
+                "filename": file.filename,
+                "status": "rejected",
+                "msg": f"File type not allowed. Allowed: {ALLOWED_EXTENSIONS}"
+            })
+            continue
+
+        filename, file_url = save_upload(file)
+        media = new_media(filename, file_url, incident.id, user_id)
+        db.session.add(media)
+        result = {"filename": file.filename, "status": "uploaded", "file_url": file_url}
+        results.append(result)
+        saved.append((result, media))
+
+    if not saved:
+        return jsonify({"msg": "No files uploaded", "uploaded": 0, "results": results}), 400
+
+    # All Media rows go in with a single commit
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for _, media in saved:
+            file_path = os.path.join(get_upload_folder(), media.filename)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return jsonify({"msg": "Failed to save uploaded files"}), 500
+
+    for result, media in saved:
+        result["media_id"] = media.id
+    schedule_metadata_extraction([media.id for _, media in saved], get_upload_folder())
+
+    return jsonify({
+        "msg": f"{len(saved)} of {len(files)} files uploaded successfully",
+        "uploaded": len(saved),
+        "results": results
+    }), 200
+
 # ---------------------
 # List all media for a specific incident
 # GET /api/v1/media/incident/<incident_id>
@@ -73,19 +203,11 @@ def list_incident_media(incident_id):
     incident = Incident.query.get_or_404(incident_id)
 
     # Optional: enforce ownership or admin
-    user = User.query.get(user_id)
-    if incident.created_by != user_id and user.role != "admin":
+    if incident.created_by != user_id and not user_is_admin(user_id):
         return jsonify({"msg": "Unauthorized"}), 403
 
     media_list = Media.query.filter_by(incident_id=incident.id).all()
-    result = [
-        {
-            "id": m.id,
-            "filename": m.filename,
-            "file_url": m.file_url,
-            "uploaded_by": m.uploaded_by
-        } for m in media_list
-    ]
+    result = [serialize_media(m) for m in media_list]
     return jsonify(result), 200
 
 # ---------------------
@@ -94,13 +216,29 @@ def list_incident_media(incident_id):
 # ---------------------
 @media_bp.route("/uploads/<filename>", methods=["GET"])
 def serve_file(filename):
-    upload_folder = os.path.join(current_app.root_path, "uploads")
+    upload_folder = get_upload_folder()
     file_path = os.path.join(upload_folder, filename)
 
     if not os.path.exists(file_path):
         return jsonify({"msg": "File not found"}), 404
 
-    return send_from_directory(upload_folder, filename)
+    # Serve a WebP/AVIF rendition when the client asks for one
+    rendition_format = negotiate_format(request.accept_mimetypes, filename)
+    if rendition_format:
+        try:
+            rendition = get_rendition(
+                upload_folder, filename, rendition_format,
+                quality=current_app.config.get("IMAGE_RENDITION_QUALITY", 75)
+            )
+            response = send_from_directory(upload_folder, rendition, mimetype=rendition_format[0])
+            response.vary.add("Accept")
+            return response
+        except Exception:
+            current_app.logger.exception("Rendition failed for %s", filename)
+
+    response = send_from_directory(upload_folder, filename)
+    response.vary.add("Accept")
+    return response
 
 # ---------------------
 # Delete media
@@ -111,19 +249,20 @@ def serve_file(filename):
 def delete_media(media_id):
     user_id = int(get_jwt_identity())  # ✅ cast to int
     media = Media.query.get_or_404(media_id)
-    user = User.query.get(user_id)
 
     # Only uploader or admin can delete
-    if media.uploaded_by != user_id and user.role != "admin":
+    if media.uploaded_by != user_id and not user_is_admin(user_id):
         return jsonify({"msg": "Unauthorized"}), 403
 
     # Remove file from filesystem
-    file_path = os.path.join(current_app.root_path, "uploads", media.filename)
+    file_path = os.path.join(get_upload_folder(), media.filename)
     if os.path.exists(file_path):
         os.remove(file_path)
+    remove_renditions(get_upload_folder(), media.filename)
 
     db.session.delete(media)
     db.session.commit()
+    similarity_index.discard(media_id)
 
     return jsonify({"msg": "Media deleted successfully"}), 200
 
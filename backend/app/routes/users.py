@@ -1,13 +1,32 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash
 from app.extensions import db
 from app.models import User, RewardRedemption
+from app.utils.user_cache import get_cached_user, invalidate_cached_user
+from app.routes.admin import admin_required
+from app.utils.audit import audit, audit_many
+from app.utils.token_revocation import revoke_user_tokens, revoke_users_tokens
+from app.utils.points import apply_points, apply_points_bulk
+from app.utils.idempotency import idempotent
+from app.utils.leaderboard import get_leaderboard
+from app.utils.pagination import (
+    NULL_DATETIME, decode_cursor, encode_cursor, estimate_count, keyset_filter, keyset_page, parse_limit, sort_key,
+)
 
 users_bp = Blueprint("users_bp", __name__, url_prefix="/api/v1/users")
 
 POINTS_TO_AIRTIME_RATE = 5  # 1 point = 5 KES
 
+MAX_USERS_PAGE_SIZE = 200
+MAX_REDEMPTIONS_PAGE_SIZE = 200
+MAX_BULK_IDS = 5000
+# Nullable columns sort on the same COALESCE as their index, so NULL rows aren't skipped between pages
+USER_SORT_COLUMNS = {
+    "created_at": sort_key(User.created_at, NULL_DATETIME),
+    "name": User.name,
+    "points": sort_key(User.points, 0),
+}
+
 # ---------------------
 # Get current user's points
 # ---------------------
@@ -28,6 +47,7 @@ def get_points():
 # ---------------------
 @users_bp.route("/redeem", methods=["POST"], strict_slashes=False)
 @jwt_required()
+@idempotent
 def redeem_points():
     data = request.get_json()
     redeem_points = data.get("points")
@@ -36,15 +56,12 @@ def redeem_points():
     
     if not redeem_points:
         return jsonify({"message": "Points are required"}), 400
+    if not isinstance(redeem_points, int) or redeem_points < 0:
+        return jsonify({"message": "Points must be a positive whole number"}), 400
 
     user_id = get_jwt_identity()
     user = User.query.get_or_404(user_id)
 
-    if user.points < redeem_points:
-        return jsonify({"message": "Insufficient points"}), 400
-
-    user.points -= redeem_points
-    
     # Create redemption record
     redemption = RewardRedemption(
         user_id=user.id,
@@ -54,6 +71,13 @@ def redeem_points():
         status="completed"
     )
     db.session.add(redemption)
+    db.session.flush()
+
+    # Debit atomically; fails instead of overdrawing when requests race
+    points_remaining = apply_points(user.id, -redeem_points, "redemption", redemption_id=redemption.id)
+    if points_remaining is None:
+        db.session.rollback()
+        return jsonify({"message": "Insufficient points"}), 400
     db.session.commit()
 
     # Auto-calculate airtime if reward is "airtime"
@@ -68,7 +92,7 @@ def redeem_points():
     return jsonify({
         "message": msg, 
         "msg": msg,  # Backward compatibility
-        "points_remaining": user.points,
+        "points_remaining": points_remaining,
         "success": True,
         "redemption_id": redemption.id
     })
@@ -79,26 +103,58 @@ def redeem_points():
 # ---------------------
 @users_bp.route("/leaderboard", methods=["GET"])
 def leaderboard():
-    top_n = int(request.args.get("top", 10))
-    users = User.query.order_by(User.points.desc()).limit(top_n).all()
-    result = [
-        {
-            "id": u.id,
-            "name": u.name,
-            "points": u.points
-        } for u in users
-    ]
-    return jsonify(result)
+    top_n = max(int(request.args.get("top", 10)), 0)
+    return jsonify(get_leaderboard().top_users(top_n))
 
 
 # ---------------------
-# List all users (Admin only)
+# Leaderboard: current user's rank
+# GET /api/v1/users/leaderboard/me
+# ---------------------
+@users_bp.route("/leaderboard/me", methods=["GET"])
+@jwt_required()
+def my_rank():
+    user = User.query.get_or_404(int(get_jwt_identity()))
+    points = user.points or 0
+    return jsonify({
+        "id": user.id,
+        "name": user.name,
+        "points": points,
+        "rank": get_leaderboard().rank(points)
+    })
+
+
+# ---------------------
+# Helper: SQL conditions for the directory filters (q, role, status)
+# ---------------------
+def user_filters(params):
+    filters = []
+    search = (params.get("q") or "").strip().lower()
+    if search:
+        pattern = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        filters.append(db.or_(
+            db.func.lower(User.name).like(pattern, escape="\\"),
+            db.func.lower(User.email).like(pattern, escape="\\"),
+            User.phone.like(pattern, escape="\\"),
+        ))
+    if params.get("role"):
+        filters.append(User.role == params["role"])
+    if params.get("status"):
+        filters.append(User.status == params["status"])
+    return filters
+
+
+# ---------------------
+# List users (Admin only), filtered and sorted in SQL, one page at a time
+# GET /api/v1/users?q=jan&role=user&status=active&sort=-points&limit=50&cursor=<next_cursor>
+# q matches a name, email or phone prefix; sort is created_at, name or points
+# (prefix "-" for descending). The next page's cursor is in X-Next-Cursor.
 # ---------------------
 @users_bp.route("/", methods=["GET"])
 @jwt_required()
 def list_users():
     current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_cached_user(current_user_id)
     
     if not current_user:
         return jsonify({"msg": "User not found"}), 404
@@ -106,8 +162,30 @@ def list_users():
     if current_user.role != "admin":
         return jsonify({"msg": "Admins only"}), 403
 
-    users = User.query.all()
-    return jsonify([
+    try:
+        limit = parse_limit(current_app.config.get("USERS_PAGE_SIZE", 50), MAX_USERS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    sort = request.args.get("sort", "-created_at")
+    descending = sort.startswith("-")
+    sort_column = USER_SORT_COLUMNS.get(sort.lstrip("-"))
+    if sort_column is None:
+        return jsonify({"msg": f"sort must be one of: {', '.join(USER_SORT_COLUMNS)}"}), 400
+
+    query = User.query.filter(*user_filters(request.args))
+    total, exact = estimate_count(query)
+
+    keys = [(sort_column, descending), (User.id, descending)]
+    cursor = request.args.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor, [sort_column, User.id])
+        if not position:
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(keys, position))
+    users, next_cursor = keyset_page(query, keys, limit)
+
+    response = jsonify([
         {
             "id": u.id,
             "name": u.name,
@@ -122,6 +200,12 @@ def list_users():
             "created_at": u.created_at.isoformat() if u.created_at else None
         } for u in users
     ])
+    response.headers["X-Total-Count"] = str(total)
+    if not exact:
+        response.headers["X-Total-Count-Estimated"] = "true"
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 # ---------------------
@@ -163,7 +247,7 @@ def get_user(user_id):
     if not current_user_id:
         return jsonify({"message": "Authentication required"}), 401
         
-    current_user = User.query.get(current_user_id)
+    current_user = get_cached_user(current_user_id)
     if not current_user:
         return jsonify({"message": "User not found"}), 404
 
@@ -202,7 +286,7 @@ def edit_user(user_id):
     if not current_user_id:
         return jsonify({"message": "Authentication required"}), 401
         
-    current_user = User.query.get(current_user_id)
+    current_user = get_cached_user(current_user_id)
     if not current_user:
         return jsonify({"message": "User not found"}), 404
 
@@ -228,10 +312,17 @@ def edit_user(user_id):
             return jsonify({"msg": "Invalid role"}), 400
         user.role = data["role"]
     if "points" in data:
-        user.points = data["points"]
+        if not isinstance(data["points"], int) or isinstance(data["points"], bool):
+            return jsonify({"msg": "Points must be a whole number"}), 400
+        # Recorded as a ledger adjustment rather than overwriting the balance
+        delta = data["points"] - (user.points or 0)
+        if delta and apply_points(user.id, delta, "admin_adjustment") is None:
+            return jsonify({"msg": "Points cannot be negative"}), 400
     if "status" in data:
         if data["status"] not in ["active", "suspended", "pending"]:
             return jsonify({"msg": "Invalid status"}), 400
+        if data["status"] == "suspended" and user.status != "suspended":
+            revoke_user_tokens(user.id)
         user.status = data["status"]
     if "location" in data:
         user.location = data["location"]
@@ -240,9 +331,12 @@ def edit_user(user_id):
     if "longitude" in data:
         user.longitude = data["longitude"]
     if "password" in data:
-        user.password_hash = generate_password_hash(data["password"])
+        user.password = data["password"]
 
     db.session.commit()
+    invalidate_cached_user(user.id)
+    get_leaderboard().update(user.id, user.name, user.points)
+    audit("user.edit", "user", user.id, fields=sorted(data))
     return jsonify({"msg": "User updated successfully"}), 200
 
 
@@ -261,7 +355,7 @@ def delete_user(user_id):
     if not current_user_id:
         return jsonify({"message": "Authentication required"}), 401
         
-    current_user = User.query.get(current_user_id)
+    current_user = get_cached_user(current_user_id)
     if not current_user:
         return jsonify({"message": "User not found"}), 404
 
@@ -273,8 +367,13 @@ def delete_user(user_id):
         return jsonify({"msg": "Cannot delete your own account"}), 400
 
     user = User.query.get_or_404(user_id)
+    email = user.email
+    revoke_user_tokens(user.id)
     db.session.delete(user)
     db.session.commit()
+    invalidate_cached_user(user_id)
+    get_leaderboard().remove(user_id)
+    audit("user.delete", "user", user_id, email=email)
 
     return jsonify({"msg": "User deleted successfully"}), 200
 
@@ -294,7 +393,7 @@ def update_user_status(user_id):
     if not current_user_id:
         return jsonify({"message": "Authentication required"}), 401
         
-    current_user = User.query.get(current_user_id)
+    current_user = get_cached_user(current_user_id)
     if not current_user:
         return jsonify({"message": "User not found"}), 404
 
@@ -308,21 +407,167 @@ def update_user_status(user_id):
     if new_status not in ["active", "suspended", "pending"]:
         return jsonify({"msg": "Invalid status"}), 400
     
+    # Suspension kicks the user out of every session immediately
+    if new_status == "suspended" and user.status != "suspended":
+        revoke_user_tokens(user.id)
+    old_status = user.status
     user.status = new_status
     db.session.commit()
+    invalidate_cached_user(user.id)
+    audit("user.status", "user", user.id, old=old_status, new=new_status)
     
     return jsonify({"msg": f"User status updated to {new_status}"}), 200
 
 
 # ---------------------
-# Get user's redemption history
-# GET /api/v1/users/redemptions
+# Helper: users targeted by a bulk operation, from {"ids": [...]} or {"filter": {...}}
+# Returns (conditions, error message)
+# ---------------------
+def bulk_selection(data):
+    ids = data.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+            return None, "ids must be a non-empty list of user ids"
+        if len(ids) > MAX_BULK_IDS:
+            return None, f"At most {MAX_BULK_IDS} ids per request"
+        return [User.id.in_(ids)], None
+
+    filters = user_filters(data.get("filter") or {})
+    if not filters:
+        return None, "Provide ids or a filter (q, role, status)"
+    return filters, None
+
+
+def audit_bulk(action, data, user_ids, **details):
+    """One audit row per user changed, so the user's history shows it; all rows share one queue entry."""
+    selection = {"filter": data.get("filter")} if data.get("ids") is None else {}
+    audit_many(action, "user", user_ids, updated=len(user_ids), **selection, **details)
+
+
+def bulk_update_column(column, value, default, filters):
+    """Set column to value for every matching user in one UPDATE. Returns (matched, updated ids)."""
+    matched = db.session.query(db.func.count(User.id)).filter(*filters).scalar()
+    user_ids = db.session.execute(
+        db.update(User)
+        .where(*filters, db.func.coalesce(column, default) != value)
+        .values({column: value})
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    return matched, user_ids
+
+
+# ---------------------
+# Admin: Bulk status change
+# PATCH /api/v1/users/bulk/status {"status": "suspended", "ids": [1, 2]} or {"status": ..., "filter": {"q": "spam"}}
+# ---------------------
+@users_bp.route("/bulk/status", methods=["PATCH", "OPTIONS"])
+@admin_required
+def bulk_update_status():
+    data = request.get_json() or {}
+    new_status = data.get("status")
+    if new_status not in ["active", "suspended", "pending"]:
+        return jsonify({"msg": "Invalid status"}), 400
+    filters, error = bulk_selection(data)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    # Admins can't lock themselves out
+    filters.append(User.id != int(get_jwt_identity()))
+    matched, user_ids = bulk_update_column(User.status, new_status, "active", filters)
+    if new_status == "suspended":
+        revoke_users_tokens(user_ids)
+    db.session.commit()
+    for user_id in user_ids:
+        invalidate_cached_user(user_id)
+    audit_bulk("user.status", data, user_ids, new=new_status)
+
+    return jsonify({"msg": f"{len(user_ids)} users set to {new_status}", "matched": matched, "updated": len(user_ids)}), 200
+
+
+# ---------------------
+# Admin: Bulk role change
+# PATCH /api/v1/users/bulk/role {"role": "user", "ids": [1, 2]} or {"role": ..., "filter": {...}}
+# ---------------------
+@users_bp.route("/bulk/role", methods=["PATCH", "OPTIONS"])
+@admin_required
+def bulk_update_role():
+    data = request.get_json() or {}
+    new_role = data.get("role")
+    if new_role not in ["user", "admin", "moderator"]:
+        return jsonify({"msg": "Invalid role"}), 400
+    filters, error = bulk_selection(data)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    filters.append(User.id != int(get_jwt_identity()))
+    matched, user_ids = bulk_update_column(User.role, new_role, "user", filters)
+    db.session.commit()
+    for user_id in user_ids:
+        invalidate_cached_user(user_id)
+    audit_bulk("user.role", data, user_ids, new=new_role)
+
+    return jsonify({"msg": f"{len(user_ids)} users set to {new_role}", "matched": matched, "updated": len(user_ids)}), 200
+
+
+# ---------------------
+# Admin: Bulk points adjustment (recorded in the ledger)
+# POST /api/v1/users/bulk/points {"delta": 50, "ids": [1, 2]} or {"delta": ..., "filter": {...}}
+# Users whose balance would go negative are skipped
+# ---------------------
+@users_bp.route("/bulk/points", methods=["POST", "OPTIONS"])
+@admin_required
+def bulk_adjust_points():
+    data = request.get_json() or {}
+    delta = data.get("delta")
+    if not isinstance(delta, int) or isinstance(delta, bool) or delta == 0:
+        return jsonify({"msg": "delta must be a non-zero whole number"}), 400
+    filters, error = bulk_selection(data)
+    if error:
+        return jsonify({"msg": error}), 400
+
+    matched = db.session.query(db.func.count(User.id)).filter(*filters).scalar()
+    user_ids = apply_points_bulk(filters, delta, "admin_adjustment")
+    db.session.commit()
+    audit_bulk("user.points", data, user_ids, delta=delta)
+
+    return jsonify({
+        "msg": f"Adjusted points for {len(user_ids)} users",
+        "matched": matched,
+        "updated": len(user_ids),
+        "skipped": matched - len(user_ids)
+    }), 200
+
+
+# ---------------------
+# Get user's redemption history, newest first, one page at a time
+# GET /api/v1/users/redemptions?limit=50&cursor=<next_cursor>
+# The next page's cursor is returned in the X-Next-Cursor header
 # ---------------------
 @users_bp.route("/redemptions", methods=["GET"], strict_slashes=False)
 @jwt_required()
 def get_user_redemptions():
-    user_id = get_jwt_identity()
-    redemptions = RewardRedemption.query.filter_by(user_id=user_id).order_by(RewardRedemption.redeemed_at.desc()).all()
+    user_id = int(get_jwt_identity())
+    try:
+        limit = parse_limit(current_app.config.get("REDEMPTIONS_PAGE_SIZE", 50), MAX_REDEMPTIONS_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"msg": "limit must be an integer"}), 400
+
+    query = RewardRedemption.query.filter_by(user_id=user_id)
+    total, exact = estimate_count(query)
+
+    keys = [(RewardRedemption.redeemed_at, True), (RewardRedemption.id, True)]
+    cursor = request.args.get("cursor")
+    if cursor:
+        position = decode_cursor(cursor, [RewardRedemption.redeemed_at, RewardRedemption.id])
+        if not position:
+            return jsonify({"msg": "Invalid cursor"}), 400
+        query = query.filter(keyset_filter(keys, position))
+
+    # Newest first; fetch one extra row to know whether another page exists
+    redemptions = query.order_by(RewardRedemption.redeemed_at.desc(), RewardRedemption.id.desc()).limit(limit + 1).all()
+    has_more = len(redemptions) > limit
+    redemptions = redemptions[:limit]
     
     result = [
         {
@@ -335,7 +580,48 @@ def get_user_redemptions():
         } for r in redemptions
     ]
     
-    return jsonify(result)
+    response = jsonify(result)
+    response.headers["X-Total-Count"] = str(total)
+    if not exact:
+        response.headers["X-Total-Count-Estimated"] = "true"
+    if has_more:
+        response.headers["X-Next-Cursor"] = encode_cursor([redemptions[-1].redeemed_at, redemptions[-1].id])
+    return response
+
+
+# ---------------------
+# Current user's points spent per reward
+# GET /api/v1/users/redemptions/summary
+# ---------------------
+@users_bp.route("/redemptions/summary", methods=["GET"])
+@jwt_required()
+def get_user_redemption_summary():
+    user_id = int(get_jwt_identity())
+    rows = (
+        db.session.query(
+            RewardRedemption.reward_name,
+            db.func.count(RewardRedemption.id),
+            db.func.sum(RewardRedemption.points_spent),
+            db.func.max(RewardRedemption.redeemed_at),
+        )
+        .filter(RewardRedemption.user_id == user_id)
+        .group_by(RewardRedemption.reward_name)
+        .order_by(db.func.sum(RewardRedemption.points_spent).desc())
+        .all()
+    )
+    by_reward = [
+        {
+            "reward_name": name,
+            "redemptions": count,
+            "points_spent": points or 0,
+            "last_redeemed_at": last.isoformat() if last else None
+        } for name, count, points, last in rows
+    ]
+    return jsonify({
+        "redemptions": sum(r["redemptions"] for r in by_reward),
+        "points_spent": sum(r["points_spent"] for r in by_reward),
+        "by_reward": by_reward
+    })
 
 
 
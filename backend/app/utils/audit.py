@@ -0,0 +1,124 @@
+import atexit
+import threading
+from datetime import datetime
+from queue import Empty, Full, Queue
+
+from flask import current_app, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import AuditLog
+
+_writer_lock = threading.Lock()
+
+
+# ---------------------
+# Enqueue (called from routes after their commit)
+# ---------------------
+def audit(action, target_type, target_id=None, **details):
+    """Record an admin action. Only queues it; the writer thread inserts it later."""
+    audit_many(action, target_type, [target_id], **details)
+
+
+def audit_many(action, target_type, target_ids, **details):
+    """Record one action on many targets: a row per target, queued as a single entry."""
+    event = {
+        "actor_id": None,
+        "action": action,
+        "target_type": target_type,
+        "target_id": None,
+        "details": details or None,
+        "ip_address": None,
+        "created_at": datetime.utcnow(),
+    }
+    if has_request_context():
+        identity = get_jwt_identity()
+        event["actor_id"] = int(identity) if identity else None
+        event["ip_address"] = request.remote_addr
+    events = [dict(event, target_id=target_id) for target_id in target_ids]
+    if events:
+        get_audit_writer().enqueue_many(events)
+
+
+# ---------------------
+# Background writer: one multi-row INSERT per batch
+# ---------------------
+class AuditWriter:
+    def __init__(self, app):
+        self.app = app
+        self.batch_size = app.config.get("AUDIT_BATCH_SIZE", 200)
+        self.interval = app.config.get("AUDIT_FLUSH_INTERVAL", 2)
+        self.queue = Queue(app.config.get("AUDIT_QUEUE_SIZE", 10000))
+        self.write_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        run_thread = app.config.get("AUDIT_LOG_THREAD")
+        if run_thread is None:
+            run_thread = not app.testing
+        if run_thread:
+            self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self.thread.start()
+            # The thread is a daemon; write what it hadn't picked up yet on a clean shutdown
+            atexit.register(self.stop)
+
+    def enqueue(self, event):
+        self.enqueue_many([event])
+
+    def enqueue_many(self, events):
+        """Queue events as one entry; they stay together and land in one INSERT."""
+        try:
+            self.queue.put_nowait(events)
+        except Full:
+            print(f"[ERROR] Audit queue full, dropping {events[0]['action']} on {len(events)} {events[0]['target_type']}")
+
+    def _take(self, block):
+        batch = []
+        try:
+            batch.extend(self.queue.get(timeout=self.interval) if block else self.queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.extend(self.queue.get_nowait())
+        except Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        with self.write_lock, self.app.app_context():
+            try:
+                db.session.execute(insert(AuditLog), batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Audit writer dropped {len(batch)} events: {e}")
+
+    def flush(self):
+        """Write everything queued so far, in the caller's thread."""
+        while batch := self._take(block=False):
+            self._write(batch)
+
+    def stop(self):
+        """Stop the writer thread, then write whatever is still queued."""
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join(self.interval + 5)
+            self.thread = None
+            atexit.unregister(self.stop)
+        self.flush()
+
+    def _run(self):
+        while not self.stopping.is_set():
+            batch = self._take(block=True)
+            if batch:
+                self._write(batch)
+
+
+def get_audit_writer():
+    """This app's writer, started on first use (after gunicorn has forked)."""
+    writer = current_app.extensions.get("audit_writer")
+    if writer is None:
+        with _writer_lock:
+            writer = current_app.extensions.get("audit_writer")
+            if writer is None:
+                writer = AuditWriter(current_app._get_current_object())
+                current_app.extensions["audit_writer"] = writer
+    return writer
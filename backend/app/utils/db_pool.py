@@ -0,0 +1,104 @@
+import os
+import time
+from functools import wraps
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+
+# ---------------------
+# Per-engine pool counters, collected from pool events
+# ---------------------
+class PoolMetrics:
+    """Counters for one engine's connection pool, in this worker process.
+
+    Wait time covers pool.connect(): queueing for a free connection, opening
+    a new one and the pre-ping, i.e. how long a request was held up.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.lock = Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+        pool = engine.pool
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "invalidate", self._on_invalidate)
+        event.listen(pool, "soft_invalidate", self._on_invalidate)
+        pool.connect = self._timed(pool.connect)
+
+    def _timed(self, connect):
+        @wraps(connect)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return connect(*args, **kwargs)
+            except PoolTimeout:
+                with self.lock:
+                    self.timeouts += 1
+                raise
+            finally:
+                waited = time.perf_counter() - started
+                with self.lock:
+                    self.waits += 1
+                    self.wait_total += waited
+                    self.wait_max = max(self.wait_max, waited)
+        return wrapper
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self.lock:
+            self.checkouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self.lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self.lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        pool = self.engine.pool
+        with self.lock:
+            result = {
+                "pool": type(pool).__name__,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+        # QueuePool reports its live state; Static/NullPool have nothing to report
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, name):
+                result[name] = getattr(pool, name)()
+        if hasattr(pool, "_max_overflow"):
+            result["max_overflow"] = pool._max_overflow
+        return result
+
+
+def init_pool_metrics(app, db):
+    """Attach counters to every engine (the default one, any binds and read replicas)."""
+    with app.app_context():
+        engines = {bind_key or "default": engine for bind_key, engine in db.engines.items()}
+    router = app.extensions.get("db_router")
+    if router:
+        engines.update(router.engines)
+    app.extensions["pool_metrics"] = {name: PoolMetrics(engine) for name, engine in engines.items()}
+
+
+def pool_metrics(app):
+    """This worker's pool metrics, keyed by bind."""
+    return {
+        "worker_pid": os.getpid(),
+        "binds": {name: metrics.snapshot() for name, metrics in app.extensions.get("pool_metrics", {}).items()},
+    }
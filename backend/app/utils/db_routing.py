@@ -0,0 +1,197 @@
+import random
+import time
+from threading import Lock
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+READ_METHODS = ("GET", "HEAD")
+# Read-your-writes token: the server time until which this client reads from the
+# primary. Set on responses to writes; the SPA sends it back on later requests.
+STICKY_HEADER = "X-DB-Primary-Until"
+PRUNE_EVERY = 1000  # marked writes between sweeps of expired sticky entries
+
+
+# ---------------------
+# Session: read-only requests go to a replica, everything else to the primary
+# ---------------------
+class RoutingSession(Session):
+    """db.session class that sends SELECTs in GET/HEAD requests to a replica.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary, and once
+    a request has written, the rest of its reads do too. A read that fails on
+    the replica (a recovery conflict on a hot standby, a dropped connection)
+    is run again on the primary, as are the request's later reads.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        self.info["db_on_replica"] = False
+        if bind is None:
+            if self._flushing or getattr(clause, "is_dml", False):
+                self.info["db_wrote"] = True
+            elif (not self.info.get("db_wrote") and not self.info.get("db_replica_failed")
+                  and has_request_context() and g.get("db_read_replica")):
+                engine = current_app.extensions["db_router"].replica()
+                if engine is not None:
+                    self.info["db_on_replica"] = True
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        try:
+            return super().execute(*args, **kwargs)
+        except DBAPIError as e:
+            if not self.info.get("db_on_replica"):
+                raise
+            print(f"[ERROR] Read replica query failed, retrying on the primary: {e.orig}")
+            self.info["db_replica_failed"] = True
+            return super().execute(*args, **kwargs)
+
+
+# ---------------------
+# Replica health and read-your-writes stickiness (per worker)
+# ---------------------
+class ReplicaRouter:
+    def __init__(self, app, engines):
+        self.engines = engines  # bind key -> engine
+        self.check_interval = app.config.get("DB_REPLICA_CHECK_INTERVAL", 30)
+        self.sticky_seconds = app.config.get("DB_REPLICA_STICKY_SECONDS", 5)
+        self.checked_until = {}  # bind key -> monotonic time the last check is good for
+        self.down = set()
+        self.sticky = {}  # client key -> monotonic time reads may use a replica again
+        self.writes = 0
+        self.lock = Lock()
+        self.check_locks = {key: Lock() for key in engines}  # one ping per replica at a time
+        for key, engine in engines.items():
+            event.listen(engine, "handle_error", self._on_error(key))
+
+    def _on_error(self, key):
+        def handle_error(context):
+            if context.is_disconnect:
+                self._mark_down(key, context.original_exception)
+        return handle_error
+
+    def _mark_down(self, key, error):
+        print(f"[ERROR] Read replica {key} unavailable, using the primary: {error}")
+        with self.lock:
+            self.down.add(key)
+            self.checked_until[key] = time.monotonic() + self.check_interval
+
+    def _check(self, key):
+        """Ping a replica at most once per check interval.
+
+        Only one request pings a given replica; the others use the last result
+        instead of queueing behind it. Engines carry a connect timeout, so a
+        replica that doesn't answer holds up that one request for a bounded time.
+        """
+        if time.monotonic() < self.checked_until.get(key, 0):
+            return key not in self.down
+        check_lock = self.check_locks[key]
+        if not check_lock.acquire(blocking=False):
+            return key not in self.down
+        try:
+            if time.monotonic() < self.checked_until.get(key, 0):  # another request just checked
+                return key not in self.down
+            with self.engines[key].connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+        except Exception as e:
+            self._mark_down(key, e)
+            return False
+        finally:
+            check_lock.release()
+        with self.lock:
+            self.down.discard(key)
+            self.checked_until[key] = time.monotonic() + self.check_interval
+        return True
+
+    def replica(self):
+        """A healthy replica engine, or None to fall back to the primary."""
+        healthy = [key for key in self.engines if self._check(key)]
+        return self.engines[random.choice(healthy)] if healthy else None
+
+    def mark_write(self, client):
+        now = time.monotonic()
+        with self.lock:
+            self.sticky[client] = now + self.sticky_seconds
+            self.writes += 1
+            if self.writes % PRUNE_EVERY == 0:
+                self.sticky = {k: until for k, until in self.sticky.items() if until > now}
+
+    def is_sticky(self, client):
+        return self.sticky.get(client, 0) > time.monotonic()
+
+    def sticky_token(self):
+        return f"{time.time() + self.sticky_seconds:.3f}"
+
+    def token_is_sticky(self, token):
+        """Whether a token sent back by the client still pins it to the primary.
+
+        Tokens further ahead than sticky_seconds didn't come from us and are ignored.
+        """
+        try:
+            until = float(token)
+        except (TypeError, ValueError):
+            return False
+        now = time.time()
+        return now < until <= now + self.sticky_seconds
+
+
+def client_key():
+    """The JWT user if the request carries a valid token, else the client IP."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f"user:{identity}" if identity else f"ip:{request.remote_addr}"
+
+
+def replica_engine(url, options, connect_timeout):
+    if make_url(url).get_backend_name() == "postgresql":
+        connect_args = {**options.get("connect_args", {}), "connect_timeout": connect_timeout}
+        options = {**options, "connect_args": connect_args}
+    return create_engine(url, **options)
+
+
+def init_replica_routing(app, db):
+    """Route reads to the DB_REPLICA_URLS databases; a no-op without replicas.
+
+    Only then does db.session become a RoutingSession. Replica engines are kept
+    out of SQLALCHEMY_BINDS so create_all, migrations and bind_key lookups only
+    ever see the primary.
+    """
+    urls = app.config.get("DB_REPLICA_URLS") or []
+    if not urls:
+        return
+    # db is created at import time, before any config is read, so the session
+    # class is switched here. RoutingSession only routes for an app with a router.
+    db.session.session_factory.class_ = RoutingSession
+
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    connect_timeout = app.config.get("DB_REPLICA_CONNECT_TIMEOUT", 2)
+    router = ReplicaRouter(app, {
+        f"replica_{i}": replica_engine(url, options, connect_timeout) for i, url in enumerate(urls, 1)
+    })
+    app.extensions["db_router"] = router
+
+    @app.before_request
+    def choose_database():
+        g.db_read_replica = False
+        for flag in ("db_wrote", "db_on_replica", "db_replica_failed"):
+            db.session.info.pop(flag, None)
+        # A client that just wrote reads from the primary until the replicas have caught up.
+        # The SPA echoes the STICKY_HEADER token, which holds across gunicorn workers and
+        # hosts; the in-process map covers clients that don't send it back.
+        if request.method in READ_METHODS and not router.token_is_sticky(request.headers.get(STICKY_HEADER)):
+            g.db_read_replica = not router.is_sticky(client_key())
+
+    @app.after_request
+    def remember_write(response):
+        if db.session.info.get("db_wrote") and response.status_code < 400:
+            router.mark_write(client_key())
+            response.headers[STICKY_HEADER] = router.sticky_token()
+        return response
@@ -0,0 +1,187 @@
+import time
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from flask_mail import Message
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import db, mail
+from app.models import EmailOutbox
+
+outbox_cli = AppGroup("outbox", help="Outgoing email queue.")
+
+_sender_lock = Lock()
+
+
+# ---------------------
+# Enqueue (called from routes; the caller commits)
+# ---------------------
+def queue_email(recipient, subject, body=None, html=None):
+    """Add an email to the outbox. It is sent by the background sender after the caller commits."""
+    email = EmailOutbox(recipient=recipient, subject=subject, body=body, html=html)
+    db.session.add(email)
+    sender = ensure_sender_running()
+    if sender is not None:
+        db.session.info["email_outbox_sender"] = sender
+    return email
+
+
+# Wake the sender once the row is visible to it, not before
+@event.listens_for(Session, "after_commit")
+def wake_sender_after_commit(session):
+    sender = session.info.pop("email_outbox_sender", None)
+    if sender is not None:
+        sender.wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_sender_after_rollback(session):
+    session.info.pop("email_outbox_sender", None)
+
+
+# ---------------------
+# Sending
+# ---------------------
+def _claim_batch(batch_size, lease):
+    """Atomically claim due messages so several workers never send the same one."""
+    now = datetime.utcnow()
+    due = (
+        db.session.query(EmailOutbox.id)
+        .filter(EmailOutbox.status.in_(["pending", "sending"]), EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(batch_size)
+        .all()
+    )
+    claimed = []
+    for (email_id,) in due:
+        # "sending" rows whose lease ran out belonged to a worker that died mid-batch
+        updated = (
+            EmailOutbox.query
+            .filter(EmailOutbox.id == email_id, EmailOutbox.next_attempt_at <= now,
+                    EmailOutbox.status.in_(["pending", "sending"]))
+            .update({"status": "sending", "next_attempt_at": now + lease}, synchronize_session=False)
+        )
+        if updated:
+            claimed.append(email_id)
+    db.session.commit()
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all() if claimed else []
+
+
+def _record_failure(email, error, config):
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    if email.attempts >= config.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5):
+        email.status = "failed"
+    else:
+        delay = config.get("EMAIL_OUTBOX_RETRY_BASE", 30) * 2 ** (email.attempts - 1)
+        email.status = "pending"
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=min(delay, 3600))
+
+
+def send_pending():
+    """Drain due messages over one reused SMTP connection. Returns (sent, failed_attempts)."""
+    config = current_app.config
+    batch_size = config.get("EMAIL_OUTBOX_BATCH_SIZE", 50)
+    lease = timedelta(seconds=config.get("EMAIL_OUTBOX_LEASE", 300))
+    sent = failed = 0
+    connection = None
+
+    try:
+        while True:
+            batch = _claim_batch(batch_size, lease)
+            if not batch:
+                break
+
+            for email in batch:
+                try:
+                    if connection is None:
+                        connection = mail.connect()
+                        connection.__enter__()
+                    connection.send(Message(
+                        subject=email.subject, recipients=[email.recipient], body=email.body, html=email.html
+                    ))
+                    email.status = "sent"
+                    email.sent_at = datetime.utcnow()
+                    email.attempts += 1
+                    sent += 1
+                except Exception as e:
+                    # Drop the connection; the next message reconnects
+                    if connection is not None:
+                        try:
+                            connection.__exit__(None, None, None)
+                        except Exception:
+                            pass
+                        connection = None
+                    _record_failure(email, e, config)
+                    failed += 1
+            db.session.commit()
+    finally:
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    return sent, failed
+
+
+# ---------------------
+# Background sender thread
+# ---------------------
+class OutboxSender(Thread):
+    def __init__(self, app):
+        super().__init__(name="email-outbox", daemon=True)
+        self.app = app
+        self.wakeup = Event()
+
+    def run(self):
+        interval = self.app.config.get("EMAIL_OUTBOX_POLL_INTERVAL", 5)
+        while True:
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            with self.app.app_context():
+                try:
+                    send_pending()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[ERROR] Email outbox sender: {e}")
+
+
+def ensure_sender_running():
+    """Start this process's sender thread on first use (after gunicorn has forked); returns it."""
+    if not current_app.config.get("EMAIL_OUTBOX_THREAD", True):
+        return None
+
+    app = current_app._get_current_object()
+    with _sender_lock:
+        sender = app.extensions.get("email_outbox_sender")
+        if sender is None or not sender.is_alive():
+            sender = OutboxSender(app)
+            app.extensions["email_outbox_sender"] = sender
+            sender.start()
+    return sender
+
+
+# ---------------------
+# CLI: run the sender as its own process instead of (or as well as) the thread
+# ---------------------
+@outbox_cli.command("send")
+def send_command():
+    """Send every due message once and exit."""
+    sent, failed = send_pending()
+    click.echo(f"Sent {sent} emails, {failed} failed attempts")
+
+
+@outbox_cli.command("worker")
+@click.option("--interval", default=5, show_default=True, help="Seconds between polls.")
+def worker_command(interval):
+    """Keep sending queued emails until interrupted."""
+    while True:
+        sent, failed = send_pending()
+        if sent or failed:
+            click.echo(f"Sent {sent} emails, {failed} failed attempts")
+        time.sleep(interval)
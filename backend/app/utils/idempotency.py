@@ -0,0 +1,139 @@
+import hashlib
+import itertools
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+EVICT_EVERY = 500  # claims between sweeps of expired keys
+
+_claims = itertools.count(1)
+_keys = IdempotencyKey.__table__
+
+
+# ---------------------
+# Request fingerprint: a key may only be replayed for the same request
+# ---------------------
+def request_fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.full_path}".encode())
+    if request.mimetype in ("multipart/form-data", "application/x-www-form-urlencoded"):
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"\0{name}={value}".encode())
+        for name, file in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+            digest.update(f"\0{name}:{file.filename}\0".encode())
+            for chunk in iter(lambda: file.stream.read(65536), b""):
+                digest.update(chunk)
+            file.stream.seek(0)
+    else:
+        digest.update(b"\0" + request.get_data())
+    return digest.hexdigest()
+
+
+# ---------------------
+# Key bookkeeping. Uses its own connection so it never commits (or is
+# rolled back with) the route's session.
+# ---------------------
+def _find(conn, scope, key):
+    return conn.execute(select(_keys).where(_keys.c.scope == scope, _keys.c.key == key)).first()
+
+
+def _claim(scope, key, fingerprint):
+    """Record the key as in progress. Returns (claimed, existing row)."""
+    config = current_app.config
+    now = datetime.utcnow()
+    lock_timeout = timedelta(seconds=config.get("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+
+    if next(_claims) % EVICT_EVERY == 0:
+        with db.engine.begin() as conn:
+            conn.execute(delete(_keys).where(_keys.c.expires_at <= now))
+
+    try:
+        with db.engine.begin() as conn:
+            row = _find(conn, scope, key)
+            if row is not None:
+                # An expired key, or one whose request died mid-way, can be reused
+                if row.expires_at > now and not (row.status == "pending" and row.created_at <= now - lock_timeout):
+                    return False, row
+                conn.execute(delete(_keys).where(_keys.c.id == row.id))
+            conn.execute(insert(_keys).values(
+                scope=scope, key=key, fingerprint=fingerprint, status="pending", created_at=now,
+                expires_at=now + timedelta(seconds=config.get("IDEMPOTENCY_TTL", 86400)),
+            ))
+            return True, None
+    except IntegrityError:
+        # A concurrent request with the same key got there first
+        with db.engine.connect() as conn:
+            return False, _find(conn, scope, key)
+
+
+def _store(scope, key, response):
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(_keys)
+            .where(_keys.c.scope == scope, _keys.c.key == key)
+            .values(status="completed", response_status=response.status_code,
+                    response_body=response.get_data(as_text=True), content_type=response.content_type)
+        )
+
+
+def _release(scope, key):
+    with db.engine.begin() as conn:
+        conn.execute(delete(_keys).where(_keys.c.scope == scope, _keys.c.key == key, _keys.c.status == "pending"))
+
+
+def _replay(row, fingerprint):
+    if row is not None and row.fingerprint != fingerprint:
+        return jsonify({"message": "This Idempotency-Key was already used for a different request"}), 422
+    if row is None or row.status != "completed":
+        response = jsonify({"message": "A request with this Idempotency-Key is still being processed"})
+        response.headers["Retry-After"] = "1"
+        return response, 409
+
+    response = Response(row.response_body, status=row.response_status, content_type=row.content_type)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+# ---------------------
+# Decorator
+# ---------------------
+def idempotent(fn):
+    """Replay the stored response when a request is retried with the same Idempotency-Key.
+
+    Keys are scoped to the JWT user (apply below @jwt_required) or client IP.
+    Server errors and 429s are not stored, so those can be retried for real.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key or request.method == "OPTIONS":
+            return fn(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"message": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        identity = get_jwt_identity()
+        scope = f"user:{identity}" if identity else f"ip:{request.remote_addr}"
+        fingerprint = request_fingerprint()
+        claimed, existing = _claim(scope, key, fingerprint)
+        if not claimed:
+            return _replay(existing, fingerprint)
+
+        try:
+            response = make_response(fn(*args, **kwargs))
+        except Exception:
+            _release(scope, key)
+            raise
+
+        if response.status_code >= 500 or response.status_code == 429:
+            _release(scope, key)
+        else:
+            _store(scope, key, response)
+        return response
+    return wrapper
@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it originals are always served
+    Image = None
+
+RENDITION_DIR = ".renditions"  # inside the uploads folder, next to the originals
+
+# Preferred first; each entry is (MIME type, file extension, Pillow format)
+RENDITION_FORMATS = [
+    ("image/avif", "avif", "AVIF"),
+    ("image/webp", "webp", "WEBP"),
+]
+
+# GIFs are left alone so animations survive
+CONVERTIBLE_EXTENSIONS = {"png", "jpg", "jpeg"}
+
+
+def negotiate_format(accept, filename):
+    """Pick the best rendition format the client explicitly accepts, or None.
+
+    Only exact MIME types count: browsers send */* too, and that alone doesn't
+    mean they can decode AVIF.
+    """
+    if Image is None or filename.rsplit(".", 1)[-1].lower() not in CONVERTIBLE_EXTENSIONS:
+        return None
+
+    accepted = {value for value, quality in accept if quality > 0}
+    for mimetype, ext, pil_format in RENDITION_FORMATS:
+        if mimetype in accepted and features.check(ext):
+            return mimetype, ext, pil_format
+    return None
+
+
+def rendition_name(filename, ext):
+    return os.path.join(RENDITION_DIR, f"{filename}.{ext}")
+
+
+def get_rendition(upload_folder, filename, rendition_format, quality=75):
+    """Return the rendition path (relative to upload_folder), encoding it on first request."""
+    _, ext, pil_format = rendition_format
+    name = rendition_name(filename, ext)
+    path = os.path.join(upload_folder, name)
+    if os.path.exists(path):
+        return name
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with Image.open(os.path.join(upload_folder, filename)) as img:
+        # Renditions drop EXIF, so bake the orientation into the pixels
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            # Palette images (P, PA) keep their transparency in a "transparency" key, not an alpha band
+            has_alpha = "A" in img.getbands() or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+
+        # Write to a temp file and rename so concurrent requests never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=f".{ext}.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, format=pil_format, quality=quality)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+    return name
+
+
+def remove_renditions(upload_folder, filename):
+    for _, ext, _ in RENDITION_FORMATS:
+        path = os.path.join(upload_folder, rendition_name(filename, ext))
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,169 @@
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+
+from app.extensions import db
+from app.models import Media
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it no hashes are computed
+    Image = None
+
+HASH_SIZE = 8  # 8x8 difference hash -> 64 bits
+
+# updated_at is stamped at flush time, before commit, so each sync re-reads a
+# small overlap window to catch rows that committed late
+SYNC_OVERLAP = timedelta(seconds=60)
+# Deleted media leave no row to sync from; a periodic full reload drops them
+REBUILD_INTERVAL = 600  # seconds
+# Lookups query Media for new hashes at most this often; this worker's own
+# uploads and deletes are pushed into the index straight away
+SYNC_INTERVAL = 10  # seconds
+
+
+# ---------------------
+# Perceptual hashing
+# ---------------------
+def compute_dhash(file_path):
+    """Return the 64-bit difference hash of an image as a 16-char hex string.
+
+    Resizing and recompression barely change the hash, so near-identical
+    photos end up a few bits apart.
+    """
+    if Image is None:
+        return None
+
+    with Image.open(file_path) as img:
+        pixels = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).tobytes()
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:016x}"
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+# ---------------------
+# BK-tree over hamming distance
+# ---------------------
+class BKTree:
+    """Metric tree giving sub-linear "all hashes within distance d" lookups."""
+
+    def __init__(self):
+        self.root = None  # [hash, item_ids, {distance: child}]
+
+    def add(self, value, item_id):
+        if self.root is None:
+            self.root = [value, [item_id], {}]
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item_id], {}]
+                return
+            node = child
+
+    def remove(self, value, item_id):
+        """Drop item_id from value's node; the node stays as a routing point for its children."""
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                if item_id in node[1]:
+                    node[1].remove(item_id)
+                return
+            node = node[2].get(distance)
+
+    def search(self, value, max_distance):
+        """Return (distance, item_id) pairs within max_distance of value, nearest first."""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item_id) for item_id in node[1])
+            # Triangle inequality: only children in [d - max, d + max] can match
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(results)
+
+
+class SimilarityIndex:
+    """Per-process BK-tree of image hashes, topped up incrementally from the Media table."""
+
+    def __init__(self):
+        self.tree = BKTree()
+        self.indexed = {}  # media_id -> hash value
+        self.synced_at = None
+        self.next_sync = 0
+        self.next_rebuild = 0
+        self.lock = Lock()
+
+    def sync(self):
+        """Load hashes written since the last sync (by this or any other worker).
+
+        A re-hashed image moves to its new hash; everything is reloaded every
+        REBUILD_INTERVAL so media deleted by other workers drop out.
+        """
+        now = time.monotonic()
+        rebuild = self.synced_at is None or now >= self.next_rebuild
+        if not rebuild and now < self.next_sync:
+            return
+        query = db.session.query(Media.id, Media.phash).filter(Media.phash.isnot(None))
+        if not rebuild:
+            query = query.filter(Media.updated_at >= self.synced_at)
+
+        with self.lock:
+            synced_at = datetime.utcnow() - SYNC_OVERLAP
+            if rebuild:
+                self.tree = BKTree()
+                self.indexed = {}
+                self.next_rebuild = time.monotonic() + REBUILD_INTERVAL
+            for media_id, phash in query.execution_options(yield_per=1000):
+                self._put(media_id, int(phash, 16))
+            self.synced_at = synced_at
+            self.next_sync = time.monotonic() + SYNC_INTERVAL
+
+    def update(self, media_id, phash):
+        """Index a hash computed in this worker without waiting for the next sync."""
+        with self.lock:
+            self._put(media_id, int(phash, 16))
+
+    def _put(self, media_id, value):
+        """Index media_id under value, moving it if its hash changed. Caller holds the lock."""
+        old = self.indexed.get(media_id)
+        if old == value:
+            return
+        if old is not None:
+            self.tree.remove(old, media_id)
+        self.tree.add(value, media_id)
+        self.indexed[media_id] = value
+
+    def discard(self, media_id):
+        """Forget a deleted media item right away in this worker."""
+        with self.lock:
+            value = self.indexed.pop(media_id, None)
+            if value is not None:
+                self.tree.remove(value, media_id)
+
+    def similar(self, phash, max_distance):
+        self.sync()
+        with self.lock:
+            return self.tree.search(int(phash, 16), max_distance)
+
+
+similarity_index = SimilarityIndex()
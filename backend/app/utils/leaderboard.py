@@ -0,0 +1,147 @@
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import PointsTransaction, User
+
+# Ledger rows are stamped before commit; re-read a little overlap on each sync
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+# ---------------------
+# Rank index: users sorted by (-points, id)
+# ---------------------
+class Leaderboard:
+    """In-process rank index kept current from the points ledger.
+
+    ranking is a sorted list of (-points, user_id), so a rank is one bisect
+    (O(log n)) and the top K is a slice. The serialized top K is cached and
+    only rebuilt when a change lands inside it.
+
+    Moving a user is O(n): the bisect is cheap but the list insert/delete
+    shifts every entry after it. That is one pointer memmove, a few
+    microseconds at 100k users, and a sync only moves the users whose points
+    changed. The periodic rebuild reads every user and sorts, O(n log n), once
+    per LEADERBOARD_REBUILD_INTERVAL. Past a few hundred thousand users this
+    wants a balanced tree or the database's own index instead.
+    """
+
+    def __init__(self, config):
+        self.cache_size = config.get("LEADERBOARD_CACHE_SIZE", 100)
+        self.sync_interval = config.get("LEADERBOARD_SYNC_INTERVAL", 5)
+        self.rebuild_interval = config.get("LEADERBOARD_REBUILD_INTERVAL", 600)
+        self.ranking = []
+        self.users = {}  # user_id -> (name, points)
+        self.max_user_id = 0  # newer users are picked up on the next sync
+        self.top = None
+        self.synced_at = None
+        self.next_sync = 0
+        self.next_rebuild = 0
+        self.lock = Lock()
+
+    # -- maintenance --
+    def sync(self):
+        """Apply ledger changes since the last sync; rebuild from scratch now and then."""
+        now = time.monotonic()
+        if now < self.next_sync:
+            return
+
+        with self.lock:
+            if now < self.next_sync:
+                return
+            db_now = datetime.utcnow()
+            if now >= self.next_rebuild or self.synced_at is None:
+                rows = db.session.query(User.id, User.name, User.points).all()
+                self.users = {user_id: (name, points or 0) for user_id, name, points in rows}
+                self.ranking = sorted((-points, user_id) for user_id, (_, points) in self.users.items())
+                self.max_user_id = max(self.users, default=0)
+                self.top = None
+                self.next_rebuild = now + self.rebuild_interval
+            else:
+                changed = (
+                    db.session.query(PointsTransaction.user_id)
+                    .filter(PointsTransaction.created_at >= self.synced_at - SYNC_OVERLAP)
+                    .distinct()
+                )
+                # Plus users who signed up since (on any worker) and have no ledger rows yet
+                rows = (
+                    db.session.query(User.id, User.name, User.points)
+                    .filter(db.or_(User.id.in_(changed), User.id > self.max_user_id))
+                    .all()
+                )
+                for user_id, name, points in rows:
+                    self._set(user_id, name, points or 0)
+            self.synced_at = db_now
+            self.next_sync = now + self.sync_interval
+
+    def _set(self, user_id, name, points):
+        old = self.users.get(user_id)
+        if old == (name, points):
+            return
+        keys = [(-points, user_id)]
+        if old:
+            keys.append((-old[1], user_id))
+            self._discard(keys[1])
+        insort(self.ranking, keys[0])
+        self.users[user_id] = (name, points)
+        self.max_user_id = max(self.max_user_id, user_id)
+        self._touched(keys)
+
+    def _discard(self, key):
+        i = bisect_left(self.ranking, key)
+        if i < len(self.ranking) and self.ranking[i] == key:
+            del self.ranking[i]
+
+    def _touched(self, keys):
+        """Drop the cached top K if the old or new position falls inside it."""
+        if self.top is None:
+            return
+        if len(self.ranking) <= self.cache_size or any(k <= self.ranking[self.cache_size - 1] for k in keys):
+            self.top = None
+
+    def update(self, user_id, name, points):
+        """Apply a committed change right away instead of waiting for the next sync."""
+        with self.lock:
+            if self.synced_at is not None:  # otherwise the first read loads it anyway
+                self._set(user_id, name, points or 0)
+
+    def remove(self, user_id):
+        with self.lock:
+            old = self.users.pop(user_id, None)
+            if old:
+                self._discard((-old[1], user_id))
+                self.top = None
+
+    def mark_stale(self):
+        """Sync on the next read (after the caller's transaction has committed)."""
+        self.next_sync = 0
+
+    # -- queries --
+    def top_users(self, n):
+        self.sync()
+        with self.lock:
+            if n > self.cache_size:
+                return [self._entry(user_id) for _, user_id in self.ranking[:n]]
+            if self.top is None:
+                self.top = [self._entry(user_id) for _, user_id in self.ranking[:self.cache_size]]
+            return self.top[:n]
+
+    def rank(self, points):
+        """1 + the number of users with strictly more points (ties share a rank)."""
+        self.sync()
+        return bisect_left(self.ranking, (-points,)) + 1
+
+    def _entry(self, user_id):
+        name, points = self.users[user_id]
+        return {"id": user_id, "name": name, "points": points}
+
+
+def get_leaderboard():
+    leaderboard = current_app.extensions.get("leaderboard")
+    if leaderboard is None:
+        leaderboard = current_app.extensions.setdefault("leaderboard", Leaderboard(current_app.config))
+    return leaderboard
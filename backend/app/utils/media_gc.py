@@ -0,0 +1,188 @@
+import heapq
+import os
+import shutil
+import tempfile
+import time
+
+import click
+from flask.cli import AppGroup
+
+from app.extensions import db
+from app.models import Media
+from app.routes.media import get_upload_folder
+from app.utils.media_metadata import store_metadata
+from app.utils.image_renditions import remove_renditions
+
+QUARANTINE_DIR = ".quarantine"
+
+media_cli = AppGroup("media", help="Media storage maintenance.")
+
+
+# ---------------------
+# Sorted streams of stored and referenced filenames
+# ---------------------
+def iter_storage_sorted(upload_folder, chunk_size=10000):
+    """Yield filenames in the uploads folder in sorted order.
+
+    Listings larger than chunk_size are sorted in runs spilled to temp files
+    and k-way merged, so memory stays bounded by chunk_size names.
+    """
+    runs = []
+    names = []
+    with os.scandir(upload_folder) as entries:
+        for entry in entries:
+            if not entry.is_file() or "\n" in entry.name:
+                continue
+            names.append(entry.name)
+            if len(names) >= chunk_size:
+                runs.append(_spill_run(names))
+                names = []
+
+    if not runs:
+        yield from sorted(names)
+        return
+
+    if names:
+        runs.append(_spill_run(names))
+    try:
+        yield from heapq.merge(*((line.rstrip("\n") for line in run) for run in runs))
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _spill_run(names):
+    run = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+    run.writelines(f"{name}\n" for name in sorted(names))
+    run.seek(0)
+    return run
+
+
+def iter_referenced_sorted(batch_size=1000):
+    """Yield every Media.filename in the same byte order Python uses for str sorting."""
+    column = Media.filename
+    if db.engine.dialect.name == "postgresql":
+        column = column.collate("C")
+    query = db.session.query(Media.filename).order_by(column).execution_options(yield_per=batch_size)
+    for (filename,) in query:
+        yield filename
+
+
+def merge_orphans(stored, referenced, stats):
+    """Merge two sorted filename streams and yield stored files with no Media row."""
+    referenced = iter(referenced)
+    current = next(referenced, None)
+    for name in stored:
+        stats["scanned"] += 1
+        while current is not None and current < name:
+            stats["missing_files"] += 1  # Media row whose file is gone
+            current = next(referenced, None)
+        if current == name:
+            while current == name:
+                current = next(referenced, None)
+            continue
+        yield name
+
+    while current is not None:
+        stats["missing_files"] += 1
+        current = next(referenced, None)
+
+
+# ---------------------
+# Garbage collection
+# ---------------------
+def collect_orphans(upload_folder, mode="dry-run", batch_size=500, min_age=3600, chunk_size=10000):
+    """Find uploads no Media row points to and delete or quarantine them in batches.
+
+    mode is one of "dry-run", "quarantine" or "delete". Files younger than
+    min_age seconds are skipped so uploads whose row isn't committed yet survive.
+    """
+    stats = {"scanned": 0, "orphans": 0, "skipped_recent": 0, "removed": 0, "missing_files": 0}
+    cutoff = time.time() - min_age
+    batch = []
+
+    orphans = merge_orphans(iter_storage_sorted(upload_folder, chunk_size), iter_referenced_sorted(), stats)
+    for name in orphans:
+        try:
+            if os.stat(os.path.join(upload_folder, name)).st_mtime > cutoff:
+                stats["skipped_recent"] += 1
+                continue
+        except FileNotFoundError:
+            continue
+
+        stats["orphans"] += 1
+        batch.append(name)
+        if len(batch) >= batch_size:
+            stats["removed"] += _process_batch(upload_folder, batch, mode)
+            batch = []
+
+    if batch:
+        stats["removed"] += _process_batch(upload_folder, batch, mode)
+    return stats
+
+
+def _process_batch(upload_folder, batch, mode):
+    if mode == "dry-run":
+        for name in batch:
+            click.echo(f"[media gc] would remove {name}")
+        return 0
+
+    quarantine = os.path.join(upload_folder, QUARANTINE_DIR)
+    if mode == "quarantine":
+        os.makedirs(quarantine, exist_ok=True)
+
+    removed = 0
+    for name in batch:
+        path = os.path.join(upload_folder, name)
+        try:
+            if mode == "quarantine":
+                shutil.move(path, _quarantine_path(quarantine, name))
+            else:
+                os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        remove_renditions(upload_folder, name)  # cached renditions are cheap to regenerate
+    return removed
+
+
+def _quarantine_path(quarantine, name):
+    """Where to move name, suffixed with a timestamp if an earlier run left a file of that name."""
+    target = os.path.join(quarantine, name)
+    stem, ext = os.path.splitext(name)
+    suffix = time.strftime("%Y%m%d%H%M%S")
+    n = 0
+    while os.path.exists(target):
+        n += 1
+        target = os.path.join(quarantine, f"{stem}.{suffix}{f'-{n}' if n > 1 else ''}{ext}")
+    return target
+
+
+@media_cli.command("gc")
+@click.option("--mode", type=click.Choice(["dry-run", "quarantine", "delete"]), default="dry-run",
+              show_default=True, help="What to do with orphaned files.")
+@click.option("--batch-size", default=500, show_default=True, help="Files handled per batch.")
+@click.option("--min-age", default=3600, show_default=True, help="Skip files modified in the last N seconds.")
+def gc_command(mode, batch_size, min_age):
+    """Remove uploaded files that no Media row references."""
+    stats = collect_orphans(get_upload_folder(), mode=mode, batch_size=batch_size, min_age=min_age)
+    click.echo(
+        f"Scanned {stats['scanned']} files: {stats['orphans']} orphaned, "
+        f"{stats['removed']} {'quarantined' if mode == 'quarantine' else 'deleted'}, "
+        f"{stats['skipped_recent']} too recent, {stats['missing_files']} Media rows missing their file"
+    )
+
+
+@media_cli.command("backfill")
+@click.option("--all", "include_done", is_flag=True, help="Also re-process media whose metadata is already extracted.")
+def backfill_command(include_done):
+    """Extract metadata and perceptual hashes for media uploaded before extraction existed."""
+    query = db.session.query(Media.id)
+    if not include_done:
+        query = query.filter(db.or_(Media.metadata_status.is_(None), Media.metadata_status != "done"))
+
+    media_ids = [media_id for (media_id,) in query.order_by(Media.id)]
+    upload_folder = get_upload_folder()
+    for media_id in media_ids:
+        store_metadata(media_id, upload_folder)
+    click.echo(f"Processed {len(media_ids)} media files")
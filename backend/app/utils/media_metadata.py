@@ -0,0 +1,199 @@
+import mimetypes
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import Media
+from app.utils.image_similarity import compute_dhash, similarity_index
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; images then only get size and MIME type
+    Image = None
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+MP4_EXTENSIONS = {"mp4", "mov"}
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+EXIF_DATETIME = 306
+EXIF_DATETIME_ORIGINAL = 36867
+
+# MP4/MOV container atoms we descend into while looking for headers
+MP4_CONTAINER_ATOMS = {b"moov", b"trak"}
+
+_executor = None
+_executor_lock = Lock()
+
+
+# ---------------------
+# Metadata extraction
+# ---------------------
+def extract_metadata(file_path):
+    """Read size, MIME type, dimensions, duration, EXIF time/GPS and a perceptual hash from a stored file."""
+    ext = file_path.rsplit(".", 1)[-1].lower()
+    metadata = {
+        "file_size": os.path.getsize(file_path),
+        "mime_type": mimetypes.guess_type(file_path)[0],
+    }
+
+    if ext in IMAGE_EXTENSIONS:
+        metadata.update(_image_metadata(file_path))
+    elif ext in MP4_EXTENSIONS:
+        metadata.update(_mp4_metadata(file_path))
+    elif ext == "avi":
+        metadata.update(_avi_metadata(file_path))
+
+    return metadata
+
+
+def _image_metadata(file_path):
+    if Image is None:
+        return {}
+
+    with Image.open(file_path) as img:
+        metadata = {"width": img.width, "height": img.height}
+        exif = img.getexif()
+    metadata["phash"] = compute_dhash(file_path)
+
+    taken_at = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+    if taken_at:
+        try:
+            metadata["taken_at"] = datetime.strptime(str(taken_at).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            pass
+
+    gps = exif.get_ifd(GPS_IFD)
+    if gps.get(2) and gps.get(4):
+        metadata["gps_latitude"] = _gps_to_degrees(gps[2], gps.get(1))
+        metadata["gps_longitude"] = _gps_to_degrees(gps[4], gps.get(3))
+
+    return metadata
+
+
+def _gps_to_degrees(value, ref):
+    degrees, minutes, seconds = (float(v) for v in value)
+    result = degrees + minutes / 60 + seconds / 3600
+    return -result if ref in ("S", "W") else result
+
+
+def _read_atoms(f, end):
+    """Yield (type, payload_start, payload_end) for each atom between the current offset and end."""
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        size, atom_type = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - start
+        if size < header:
+            return
+        yield atom_type, start + header, start + size
+        f.seek(start + size)
+
+
+def _mp4_metadata(file_path):
+    metadata = {}
+    with open(file_path, "rb") as f:
+        _walk_mp4(f, os.path.getsize(file_path), metadata)
+    return metadata
+
+
+def _walk_mp4(f, end, metadata):
+    for atom_type, payload_start, payload_end in _read_atoms(f, end):
+        if atom_type in MP4_CONTAINER_ATOMS:
+            _walk_mp4(f, payload_end, metadata)
+        elif atom_type == b"mvhd":
+            version = f.read(4)[0]
+            if version == 1:
+                f.seek(16, os.SEEK_CUR)
+                timescale, duration = struct.unpack(">IQ", f.read(12))
+            else:
+                f.seek(8, os.SEEK_CUR)
+                timescale, duration = struct.unpack(">II", f.read(8))
+            if timescale:
+                metadata["duration"] = duration / timescale
+        elif atom_type == b"tkhd" and "width" not in metadata:
+            version = f.read(4)[0]
+            f.seek(payload_start + (88 if version == 1 else 76))
+            width, height = struct.unpack(">II", f.read(8))
+            # Audio tracks report 0x0; dimensions are 16.16 fixed point
+            if width and height:
+                metadata["width"] = width >> 16
+                metadata["height"] = height >> 16
+        f.seek(payload_end)
+
+
+def _avi_metadata(file_path):
+    with open(file_path, "rb") as f:
+        header = f.read(256)
+
+    offset = header.find(b"avih")
+    if not header.startswith(b"RIFF") or offset < 0 or len(header) < offset + 48:
+        return {}
+
+    # avih: usec per frame, max bytes/sec, padding, flags, total frames,
+    # initial frames, streams, suggested buffer size, width, height
+    fields = struct.unpack("<10I", header[offset + 8:offset + 48])
+    metadata = {"width": fields[8], "height": fields[9]}
+    if fields[0]:
+        metadata["duration"] = fields[0] * fields[4] / 1_000_000
+    return metadata
+
+
+# ---------------------
+# Background worker pool
+# ---------------------
+def get_executor(max_workers):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="media-metadata")
+    return _executor
+
+
+def schedule_metadata_extraction(media_ids, upload_folder):
+    """Queue metadata extraction for freshly uploaded media.
+
+    Runs inline when MEDIA_METADATA_WORKERS is 0 (handy for tests and local dev).
+    """
+    app = current_app._get_current_object()
+    workers = app.config.get("MEDIA_METADATA_WORKERS", 2)
+    if workers <= 0:
+        for media_id in media_ids:
+            store_metadata(media_id, upload_folder)
+        return
+
+    executor = get_executor(workers)
+    for media_id in media_ids:
+        executor.submit(_run_in_app_context, app, media_id, upload_folder)
+
+
+def _run_in_app_context(app, media_id, upload_folder):
+    with app.app_context():
+        store_metadata(media_id, upload_folder)
+
+
+def store_metadata(media_id, upload_folder):
+    media = db.session.get(Media, media_id)
+    if not media:
+        return
+
+    try:
+        for key, value in extract_metadata(os.path.join(upload_folder, media.filename)).items():
+            setattr(media, key, value)
+        media.metadata_status = "done"
+    except Exception as e:
+        print(f"[ERROR] Metadata extraction failed for media {media_id}: {e}")
+        media.metadata_status = "failed"
+
+    db.session.commit()
+    if media.phash:
+        similarity_index.update(media.id, media.phash)
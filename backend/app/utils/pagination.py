@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request
+
+from app.extensions import db
+
+NULL_DATETIME = datetime(1970, 1, 1)  # where NULL timestamps sort in a sort_key()
+
+
+# ---------------------
+# Cursors: the sort-key values of the last row returned
+# ---------------------
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, columns):
+    """Values matching columns from a cursor, or None if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [
+            datetime.fromisoformat(v) if v is not None and isinstance(c.type, db.DateTime) else v
+            for c, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def sort_key(column, null_value):
+    """column with NULL read as null_value, for sorting on a nullable column.
+
+    NULL fails every comparison, so a keyset filter on the bare column would
+    skip those rows. null_value is inlined rather than bound, so the
+    expression matches the index built on it.
+    """
+    return db.func.coalesce(column, db.literal(null_value, column.type, literal_execute=True))
+
+
+def keyset_filter(keys, values):
+    """Rows strictly after values in the order given by keys, a list of (column, descending).
+
+    Same-direction keys use a row-value comparison, which Postgres and SQLite
+    can satisfy from a composite index; mixed directions expand to OR terms.
+    """
+    if len({descending for _, descending in keys}) == 1:
+        columns, row = db.tuple_(*[c for c, _ in keys]), db.tuple_(*values)
+        return columns < row if keys[0][1] else columns > row
+
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [c == v for (c, _), v in zip(keys[:i], values[:i])]
+        clauses.append(db.and_(*equal, column < values[i] if descending else column > values[i]))
+    return db.or_(*clauses)
+
+
+def keyset_page(query, keys, limit):
+    """(rows, next_cursor) for one page of query in keys order; next_cursor is None on the last page.
+
+    The sort-key values are selected with each row, so the cursor carries what
+    the database compared, coalesced NULLs included.
+    """
+    order = [column.desc() if descending else column.asc() for column, descending in keys]
+    # Fetch one extra row to know whether another page exists
+    rows = query.add_columns(*[column for column, _ in keys]).order_by(*order).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1][1:]) if len(rows) > limit else None
+    return [row[0] for row in rows[:limit]], next_cursor
+
+
+# ---------------------
+# Totals without COUNT(*) over the whole result
+# ---------------------
+def estimate_count(query):
+    """(count, exact) for a filtered, unordered query.
+
+    Counts at most PAGINATION_EXACT_COUNT_LIMIT rows. Past that, Postgres
+    reports the planner's row estimate and other databases report the cap.
+    """
+    cap = current_app.config.get("PAGINATION_EXACT_COUNT_LIMIT", 10000)
+    count = db.session.query(db.func.count()).select_from(query.limit(cap + 1).subquery()).scalar()
+    if count <= cap:
+        return count, True
+
+    bind = db.session.get_bind()
+    if bind.dialect.name == "postgresql":
+        compiled = query.statement.compile(dialect=bind.dialect)
+        plan = db.session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+        return max(int(plan[0]["Plan"]["Plan Rows"]), cap), False
+    return cap, False
+
+
+def parse_limit(default, maximum):
+    """The ?limit= argument clamped to 1..maximum; raises ValueError if it isn't a number."""
+    return max(1, min(int(request.args.get("limit", default)), maximum))
@@ -0,0 +1,99 @@
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, insert, select, update
+
+from app.extensions import db
+from app.models import PointsTransaction, User
+from app.utils.leaderboard import get_leaderboard
+
+points_cli = AppGroup("points", help="Points ledger maintenance.")
+
+INCIDENT_APPROVED_POINTS = 10
+
+
+# ---------------------
+# Balance changes (callers commit)
+# ---------------------
+def apply_points(user_id, delta, reason, incident_id=None, redemption_id=None):
+    """Add delta to a user's balance and record it in the ledger.
+
+    The balance is changed with a single conditional UPDATE, so concurrent
+    requests can't lose each other's updates or overdraw the account.
+    Returns the new balance, or None if it would go below zero.
+    """
+    balance = func.coalesce(User.points, 0)
+    new_balance = db.session.execute(
+        update(User)
+        .where(User.id == user_id, balance + delta >= 0)
+        .values(points=balance + delta)
+        .returning(User.points)
+    ).scalar()
+    if new_balance is None:
+        return None
+
+    db.session.add(PointsTransaction(
+        user_id=user_id, delta=delta, reason=reason, incident_id=incident_id, redemption_id=redemption_id
+    ))
+    get_leaderboard().mark_stale()
+    return new_balance
+
+
+def apply_points_bulk(filters, delta, reason):
+    """apply_points for every user matching filters, as one UPDATE plus one batch insert.
+
+    Users whose balance would go below zero are left alone. Returns the ids updated.
+    """
+    balance = func.coalesce(User.points, 0)
+    user_ids = db.session.execute(
+        update(User)
+        .where(*filters, balance + delta >= 0)
+        .values(points=balance + delta)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if user_ids:
+        db.session.execute(insert(PointsTransaction), [
+            {"user_id": user_id, "delta": delta, "reason": reason, "created_at": datetime.utcnow()}
+            for user_id in user_ids
+        ])
+        get_leaderboard().mark_stale()
+    return user_ids
+
+
+# ---------------------
+# CLI: recompute balances from the ledger
+# ---------------------
+def ledger_totals():
+    return (
+        select(func.coalesce(func.sum(PointsTransaction.delta), 0))
+        .where(PointsTransaction.user_id == User.id)
+        .scalar_subquery()
+    )
+
+
+@points_cli.command("reconcile")
+@click.option("--fix", is_flag=True, help="Overwrite drifted balances with the ledger total.")
+def reconcile_command(fix):
+    """Report users whose balance differs from their ledger total."""
+    totals = ledger_totals()
+    drifted = (
+        db.session.query(User.id, User.points, totals)
+        .filter(func.coalesce(User.points, 0) != totals)
+        .order_by(User.id)
+        .all()
+    )
+    for user_id, points, total in drifted:
+        click.echo(f"user {user_id}: balance {points or 0}, ledger {total}")
+
+    if fix and drifted:
+        # One set-based UPDATE; the ledger total is recomputed inside the statement
+        db.session.execute(
+            update(User)
+            .where(func.coalesce(User.points, 0) != totals)
+            .values(points=totals)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    click.echo(f"{len(drifted)} drifted balances{' fixed' if fix and drifted else ''}")
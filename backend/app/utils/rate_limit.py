@@ -0,0 +1,200 @@
+import math
+import os
+import sqlite3
+import time
+from functools import wraps
+from threading import Lock, local
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limits(spec):
+    """Parse "10/minute;100/hour" into [(10, 60), (100, 3600)]."""
+    limits = []
+    for part in spec.split(";"):
+        count, period = part.strip().split("/")
+        limits.append((int(count), PERIODS[period.strip()]))
+    return limits
+
+
+def sliding_window(state, now, limit, window):
+    """Sliding-window counter over two fixed windows.
+
+    state is (window_start, current, previous). Returns (allowed, retry_after,
+    new_state); the previous window's count is weighted by how much of it
+    still overlaps the sliding window, so memory per key stays O(1).
+    """
+    window_start = math.floor(now / window) * window
+    stored_start, current, previous = state or (window_start, 0, 0)
+    if stored_start != window_start:
+        previous = current if stored_start == window_start - window else 0
+        current = 0
+
+    elapsed = now - window_start
+    estimated = previous * (window - elapsed) / window + current
+    if estimated + 1 > limit:
+        if previous and current < limit:
+            retry_after = (window - elapsed) - (limit - 1 - current) * window / previous
+        else:
+            retry_after = window - elapsed
+        return False, max(1, math.ceil(retry_after)), (window_start, current, previous)
+
+    return True, 0, (window_start, current + 1, previous)
+
+
+def check_all(results):
+    """(allowed, retry_after) for a request checked against several windows at once."""
+    rejected = [retry_after for _, _, allowed, retry_after, _ in results if not allowed]
+    return (False, max(rejected)) if rejected else (True, 0)
+
+
+# ---------------------
+# Backends
+# ---------------------
+class MemoryBackend:
+    """Per-process counters. Fine for one worker; each gunicorn worker counts separately."""
+
+    def __init__(self):
+        self.counters = {}  # key -> (window, (window_start, current, previous))
+        self.lock = Lock()
+        self.hits = 0
+
+    def hit(self, limits):
+        """Count one request against every (key, limit, window), or against none if any is full."""
+        now = time.time()
+        with self.lock:
+            results = []
+            for key, limit, window in limits:
+                state = self.counters.get(key)
+                results.append((key, window, *sliding_window(state[1] if state else None, now, limit, window)))
+            allowed, retry_after = check_all(results)
+            if allowed:
+                for key, window, _, _, new_state in results:
+                    self.counters[key] = (window, new_state)
+
+            self.hits += 1
+            if self.hits % 1000 == 0:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        stale = [k for k, (window, (start, _, _)) in self.counters.items() if start + 2 * window <= now]
+        for key in stale:
+            del self.counters[key]
+
+
+class SQLiteBackend:
+    """Counters in a local SQLite file shared by every gunicorn worker on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = local()
+        self.hits = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit ("
+                "key TEXT PRIMARY KEY, win INTEGER, window_start REAL, current INTEGER, previous INTEGER)"
+            )
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def hit(self, limits):
+        """Count one request against every (key, limit, window), or against none if any is full."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")  # serialize read-modify-write across workers
+        try:
+            results = []
+            for key, limit, window in limits:
+                row = conn.execute(
+                    "SELECT window_start, current, previous FROM rate_limit WHERE key = ?", (key,)
+                ).fetchone()
+                results.append((key, window, *sliding_window(row, now, limit, window)))
+            allowed, retry_after = check_all(results)
+            if allowed:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rate_limit (key, win, window_start, current, previous) VALUES (?, ?, ?, ?, ?)",
+                    [(key, window, *new_state) for key, window, _, _, new_state in results],
+                )
+            self.hits += 1
+            if self.hits % 1000 == 0:
+                conn.execute("DELETE FROM rate_limit WHERE window_start + 2 * win <= ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+def get_backend():
+    backend = current_app.extensions.get("rate_limiter")
+    if backend is None:
+        if current_app.config.get("RATE_LIMIT_BACKEND", "memory") == "sqlite":
+            backend = SQLiteBackend(current_app.config["RATE_LIMIT_SQLITE_PATH"])
+        else:
+            backend = MemoryBackend()
+        backend = current_app.extensions.setdefault("rate_limiter", backend)
+    return backend
+
+
+# ---------------------
+# Decorator
+# ---------------------
+def client_ip():
+    """Client address, honouring RATE_LIMIT_PROXY_HOPS trusted reverse proxies."""
+    hops = current_app.config.get("RATE_LIMIT_PROXY_HOPS", 0)
+    route = request.access_route
+    if hops and len(route) >= hops:
+        return route[-hops]
+    return request.remote_addr
+
+
+def request_email():
+    """Normalized "email" from the JSON body, or None."""
+    data = request.get_json(silent=True)
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def rate_limit(name, key="ip"):
+    """Throttle a route using the limits configured in RATE_LIMITS[name].
+
+    key is "ip", "user" or "email"; "user" falls back to the IP for anonymous
+    requests, so apply it below @jwt_required. "email" keys on the account named
+    in the JSON body and falls back to the IP when the body has none.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            spec = config.get("RATE_LIMITS", {}).get(name)
+            if request.method == "OPTIONS" or not spec or not config.get("RATE_LIMIT_ENABLED", True):
+                return fn(*args, **kwargs)
+
+            if key == "email":
+                email = request_email()
+                subject = f"email:{email}" if email else f"ip:{client_ip()}"
+            else:
+                identity = get_jwt_identity() if key == "user" else None
+                subject = f"user:{identity}" if identity else f"ip:{client_ip()}"
+            # Every window is checked before any is counted, so a rejected request uses no quota
+            allowed, retry_after = get_backend().hit(
+                [(f"{name}:{subject}:{window}", limit, window) for limit, window in parse_limits(spec)]
+            )
+            if not allowed:
+                response = jsonify({"message": "Too many requests, please slow down"})
+                response.headers["Retry-After"] = str(retry_after)
+                return response, 429
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,97 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+DEFAULT_PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+
+_pool = None
+_pool_slots = None
+_pool_lock = Lock()
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already waiting for the pool."""
+
+
+# ---------------------
+# Bounded process pool for password hashing
+# ---------------------
+def _pool_context():
+    # Forking a process that already runs the outbox/SMS/audit threads can copy a
+    # held lock into the child; start workers from a clean process instead.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _get_pool(config):
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            workers = config["PASSWORD_HASH_WORKERS"]
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+            if _pool_slots is None:
+                _pool_slots = BoundedSemaphore(config.get("PASSWORD_HASH_MAX_PENDING", workers * 4))
+    return _pool, _pool_slots
+
+
+def _discard_pool(pool):
+    """Drop a pool whose worker died, so the next call builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run(fn, *args):
+    """Run fn in the hashing pool, or inline when PASSWORD_HASH_WORKERS is 0."""
+    config = current_app.config
+    if config.get("PASSWORD_HASH_WORKERS", 0) <= 0:
+        return fn(*args)
+
+    pool, slots = _get_pool(config)
+    if not slots.acquire(timeout=config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 5)):
+        raise PasswordHasherBusy()
+    try:
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            print("[ERROR] Password hashing worker died, restarting the pool")
+            _discard_pool(pool)
+            pool, _ = _get_pool(config)
+            return pool.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def password_hash_method():
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_PASSWORD_HASH_METHOD)
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, password_hash_method())
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def canonical_method(method):
+    """A werkzeug method string with its defaults filled in, as it appears in stored hashes."""
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    if name == "pbkdf2":
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    return method
+
+
+def needs_rehash(password_hash):
+    """True when the stored hash was made with a different algorithm or cost than configured."""
+    return canonical_method(password_hash.split("$", 1)[0]) != canonical_method(password_hash_method())
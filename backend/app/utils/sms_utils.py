@@ -0,0 +1,295 @@
+import heapq
+import itertools
+import json
+import re
+import threading
+import time
+from collections import namedtuple
+from queue import Empty, Full, Queue
+from urllib import parse, request as urlrequest
+
+from flask import current_app
+
+SMSMessage = namedtuple("SMSMessage", ["phone", "text", "attempts"])
+
+_dispatcher_lock = threading.Lock()
+STOP_POLL = 0.5  # seconds an idle worker waits before checking whether stop() was called
+
+
+def normalize_phone(phone, country_code):
+    """E.164 form of a phone number: "0712 345 678" -> "+254712345678" for country_code "254"."""
+    digits = re.sub(r"[^\d+]", "", phone or "")
+    if digits.startswith("+"):
+        return "+" + digits[1:].replace("+", "")
+    if digits.startswith("00"):
+        return "+" + digits[2:]
+    if digits.startswith("0"):
+        return f"+{country_code}{digits[1:]}"
+    if digits.startswith(country_code):
+        return "+" + digits
+    return f"+{country_code}{digits}"
+
+
+# ---------------------
+# Providers
+# ---------------------
+class SMSProvider:
+    """Sends a batch of messages in as few upstream requests as the API allows.
+
+    Class attributes are the provider's own limits; SMS_PROVIDER_LIMITS can
+    override them per provider name.
+    """
+    batch_size = 100  # messages handed to send_batch at once
+    concurrency = 2  # batches in flight at the same time
+    rate_limit = 5.0  # send_batch calls per second
+
+    def __init__(self, config):
+        self.config = config
+
+    def send_batch(self, messages):
+        """Send messages; return the subset that failed and may be retried."""
+        raise NotImplementedError
+
+
+class NullSMSProvider(SMSProvider):
+    """Drops every message without logging it; the default until a real provider is set."""
+
+    def send_batch(self, messages):
+        return []
+
+
+class ConsoleSMSProvider(SMSProvider):
+    """Prints messages instead of sending them (local development)."""
+
+    def send_batch(self, messages):
+        for m in messages:
+            print(f"[SMS] to {m.phone}: {m.text}")
+        return []
+
+
+class FakeSMSProvider(SMSProvider):
+    """Records every batch in memory; tests read .batches and set .fail_numbers."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.batches = []
+        self.fail_numbers = set()
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self.lock:
+            self.batches.append(list(messages))
+        return [m for m in messages if m.phone in self.fail_numbers]
+
+    @property
+    def sent(self):
+        return [m for batch in self.batches for m in batch if m.phone not in self.fail_numbers]
+
+
+class AfricasTalkingProvider(SMSProvider):
+    """Africa's Talking bulk SMS: one request per distinct text, many recipients each."""
+    batch_size = 500
+    rate_limit = 10.0
+
+    def send_batch(self, messages):
+        config = self.config
+        host = "api.sandbox.africastalking.com" if config.get("AFRICASTALKING_SANDBOX") else "api.africastalking.com"
+        by_text = {}
+        for m in messages:
+            by_text.setdefault(m.text, []).append(m)
+
+        failed = []
+        for text, group in by_text.items():
+            form = {"username": config.get("AFRICASTALKING_USERNAME"), "to": ",".join(m.phone for m in group), "message": text}
+            if config.get("SMS_SENDER_ID"):
+                form["from"] = config["SMS_SENDER_ID"]
+            req = urlrequest.Request(
+                f"https://{host}/version1/messaging",
+                data=parse.urlencode(form).encode(),
+                headers={"apiKey": config.get("AFRICASTALKING_API_KEY") or "", "Accept": "application/json"},
+            )
+            try:
+                with urlrequest.urlopen(req, timeout=10) as response:
+                    recipients = json.load(response)["SMSMessageData"]["Recipients"]
+            except Exception as e:
+                print(f"[ERROR] SMS batch failed: {e}")
+                failed.extend(group)
+                continue
+
+            # Recipients come back in E.164; match them the same way send_sms queued them
+            country_code = config.get("SMS_COUNTRY_CODE", "254")
+            accepted = {normalize_phone(r["number"], country_code) for r in recipients if r.get("status") == "Success"}
+            failed.extend(m for m in group if normalize_phone(m.phone, country_code) not in accepted)
+        return failed
+
+
+PROVIDERS = {
+    "none": NullSMSProvider,
+    "console": ConsoleSMSProvider,
+    "fake": FakeSMSProvider,
+    "africastalking": AfricasTalkingProvider,
+}
+
+
+# ---------------------
+# Dispatcher: queue -> batches -> provider, within the provider's limits
+# ---------------------
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all worker threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SMSDispatcher:
+    def __init__(self, provider, batch_size, concurrency, rate_limit, batch_wait, max_attempts, queue_size,
+                 retry_backoff=30.0):
+        self.provider = provider
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.queue = Queue(queue_size)
+        self.limiter = RateLimiter(rate_limit)
+        self.stopping = threading.Event()
+        # Failed messages wait here (due time, seq, message) until their backoff has passed
+        self.retries = []
+        self.retry_seq = itertools.count()
+        self.retry_ready = threading.Condition()
+        self.retrier = threading.Thread(target=self._requeue_due, name="sms-retry", daemon=True)
+        self.retrier.start()
+        # Each worker has at most one batch in flight, so workers == concurrency
+        self.workers = [
+            threading.Thread(target=self._run, name=f"sms-{i}", daemon=True) for i in range(concurrency)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def enqueue(self, phone, text):
+        """Never blocks the caller; returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(SMSMessage(phone, text, 0))
+            return True
+        except Full:
+            print(f"[ERROR] SMS queue full, dropping message to {phone}")
+            return False
+
+    def flush(self):
+        """Block until every queued message has been handed to the provider."""
+        self.queue.join()
+
+    def stop(self, timeout=5):
+        """Stop the threads once the queue is drained; messages waiting for a retry are dropped."""
+        self.stopping.set()
+        with self.retry_ready:
+            self.retry_ready.notify_all()
+        for thread in [*self.workers, self.retrier]:
+            thread.join(timeout)
+
+    def _next_batch(self):
+        """The next batch, or None once stop() has been called and the queue is empty."""
+        while True:
+            try:
+                batch = [self.queue.get(timeout=STOP_POLL)]
+                break
+            except Empty:
+                if self.stopping.is_set():
+                    return None
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            try:
+                self.limiter.wait()
+                failed = self.provider.send_batch(batch)
+            except Exception as e:
+                print(f"[ERROR] SMS provider: {e}")
+                failed = batch
+
+            retried = 0
+            for m in failed:
+                if m.attempts + 1 < self.max_attempts and not self.stopping.is_set():
+                    self._retry_later(m)
+                    retried += 1
+                else:
+                    print(f"[ERROR] Giving up on SMS to {m.phone} after {self.max_attempts} attempts")
+            # A message waiting for a retry stays unfinished, so flush() also waits for it;
+            # _requeue_due marks it done once it is back on the queue
+            for _ in range(len(batch) - retried):
+                self.queue.task_done()
+
+    def _retry_later(self, message):
+        delay = self.retry_backoff * 2 ** message.attempts
+        with self.retry_ready:
+            heapq.heappush(self.retries, (time.monotonic() + delay, next(self.retry_seq), message))
+            self.retry_ready.notify()
+
+    def _requeue_due(self):
+        while True:
+            with self.retry_ready:
+                while not self.stopping.is_set() and (not self.retries or self.retries[0][0] > time.monotonic()):
+                    self.retry_ready.wait(self.retries[0][0] - time.monotonic() if self.retries else None)
+                if self.stopping.is_set():
+                    break
+                _, _, m = heapq.heappop(self.retries)
+            try:
+                self.queue.put_nowait(m._replace(attempts=m.attempts + 1))
+            except Full:
+                print(f"[ERROR] SMS queue full, dropping retry to {m.phone}")
+            self.queue.task_done()
+
+        with self.retry_ready:
+            if self.retries:
+                print(f"[ERROR] SMS dispatcher stopped, dropping {len(self.retries)} pending retries")
+            for _ in self.retries:
+                self.queue.task_done()
+            self.retries.clear()
+
+
+def get_dispatcher():
+    """This app's dispatcher for SMS_PROVIDER, started on first use (after gunicorn has forked)."""
+    dispatcher = current_app.extensions.get("sms_dispatcher")
+    if dispatcher is None:
+        config = current_app.config
+        name = config.get("SMS_PROVIDER", "none")
+        provider = PROVIDERS[name](config)
+        limits = config.get("SMS_PROVIDER_LIMITS", {}).get(name, {})
+        with _dispatcher_lock:
+            dispatcher = current_app.extensions.get("sms_dispatcher")
+            if dispatcher is None:
+                dispatcher = SMSDispatcher(
+                    provider,
+                    batch_size=limits.get("batch_size", provider.batch_size),
+                    concurrency=limits.get("concurrency", provider.concurrency),
+                    rate_limit=limits.get("rate_limit", provider.rate_limit),
+                    batch_wait=config.get("SMS_BATCH_WAIT", 0.5),
+                    max_attempts=config.get("SMS_MAX_ATTEMPTS", 3),
+                    retry_backoff=config.get("SMS_RETRY_BACKOFF", 30),
+                    queue_size=config.get("SMS_QUEUE_SIZE", 10000),
+                )
+                current_app.extensions["sms_dispatcher"] = dispatcher
+    return dispatcher
+
+
+def send_sms(phone, text):
+    """Queue an SMS for background delivery. Call after the triggering change commits."""
+    config = current_app.config
+    if not phone or not config.get("SMS_ENABLED", True) or config.get("SMS_PROVIDER", "none") == "none":
+        return False
+    return get_dispatcher().enqueue(normalize_phone(phone, config.get("SMS_COUNTRY_CODE", "254")), text)
@@ -0,0 +1,185 @@
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import current_app
+
+from app.extensions import db, jwt
+from app.models import RevokedToken
+
+# Revocation rows are stamped before commit; re-read a little overlap on each sync
+SYNC_OVERLAP = timedelta(seconds=30)
+EPOCH = datetime(1970, 1, 1)
+
+
+# ---------------------
+# Bloom filter
+# ---------------------
+class BloomFilter:
+    """Fixed-size bloom filter: no false negatives, tunable false-positive rate."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+# ---------------------
+# Revocation list: DB-backed, bloom filter in front
+# ---------------------
+def user_key(user_id):
+    """Key revoking every token issued to a user before the revocation time."""
+    return f"user:{user_id}"
+
+
+class RevocationList:
+    def __init__(self, config):
+        self.capacity = config.get("REVOCATION_BLOOM_CAPACITY", 100000)
+        self.error_rate = config.get("REVOCATION_BLOOM_ERROR_RATE", 0.001)
+        self.sync_interval = config.get("REVOCATION_SYNC_INTERVAL", 5)
+        self.rebuild_interval = config.get("REVOCATION_REBUILD_INTERVAL", 600)
+        self.bloom = None
+        self.synced_at = None
+        self.next_sync = 0
+        self.next_rebuild = 0
+        self.lock = Lock()
+
+    def sync(self):
+        """Pull new revocations from the database every REVOCATION_SYNC_INTERVAL seconds.
+
+        The filter is rebuilt from scratch every REVOCATION_REBUILD_INTERVAL so
+        expired entries stop taking up bits.
+        """
+        now = time.monotonic()
+        if now < self.next_sync:
+            return
+
+        with self.lock:
+            if now < self.next_sync:
+                return
+            db_now = datetime.utcnow()
+            query = db.session.query(RevokedToken.jti).filter(RevokedToken.expires_at > db_now)
+            if now >= self.next_rebuild or self.bloom is None:
+                bloom = BloomFilter(self.capacity, self.error_rate)
+                self.next_rebuild = now + self.rebuild_interval
+            else:
+                bloom = self.bloom
+                query = query.filter(RevokedToken.revoked_at >= self.synced_at - SYNC_OVERLAP)
+
+            for (key,) in query.execution_options(yield_per=1000):
+                bloom.add(key)
+            self.bloom = bloom
+            self.synced_at = db_now
+            self.next_sync = now + self.sync_interval
+
+    def add(self, key):
+        self.sync()
+        with self.lock:
+            self.bloom.add(key)
+
+    def is_revoked(self, payload):
+        self.sync()
+        keys = [key for key in (payload["jti"], user_key(payload["sub"])) if key in self.bloom]
+        if not keys:
+            return False  # the common case: no database round trip
+
+        for entry in RevokedToken.query.filter(RevokedToken.jti.in_(keys)).all():
+            if entry.jti == payload["jti"]:
+                return True
+            if issued_before(payload, entry.revoked_at):
+                return True
+        return False
+
+
+def issued_before(payload, revoked_at):
+    """Whether the token predates revoked_at, using the microsecond iat_us claim when present.
+
+    Older tokens only have iat in whole seconds; one from the revocation's own second
+    may be a re-login right after it (e.g. on reactivation), so only earlier seconds count.
+    """
+    if "iat_us" in payload:
+        return EPOCH + timedelta(microseconds=payload["iat_us"]) <= revoked_at
+    return datetime.utcfromtimestamp(payload["iat"]) < revoked_at.replace(microsecond=0)
+
+
+@jwt.additional_claims_loader
+def add_issue_time(identity):
+    return {"iat_us": int((datetime.utcnow() - EPOCH) / timedelta(microseconds=1))}
+
+
+def get_revocation_list():
+    revocations = current_app.extensions.get("token_revocation")
+    if revocations is None:
+        revocations = current_app.extensions.setdefault("token_revocation", RevocationList(current_app.config))
+    return revocations
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    return get_revocation_list().is_revoked(jwt_payload)
+
+
+# ---------------------
+# Revoking (callers commit)
+# ---------------------
+def _add_entry(key, user_id, token_type, expires_at):
+    entry = RevokedToken.query.filter_by(jti=key).first()
+    if entry:
+        entry.revoked_at = datetime.utcnow()
+        entry.expires_at = max(entry.expires_at, expires_at)
+    else:
+        db.session.add(RevokedToken(jti=key, user_id=user_id, token_type=token_type, expires_at=expires_at))
+    get_revocation_list().add(key)
+
+
+def revoke_token(jwt_payload):
+    """Revoke a single token by its jti."""
+    _add_entry(
+        jwt_payload["jti"],
+        int(jwt_payload["sub"]),
+        jwt_payload.get("type", "access"),
+        datetime.utcfromtimestamp(jwt_payload["exp"]) if "exp" in jwt_payload else datetime.utcnow() + timedelta(days=30),
+    )
+
+
+def revoke_user_tokens(user_id):
+    """Revoke every access and refresh token issued to a user so far."""
+    revoke_users_tokens([user_id])
+
+
+def revoke_users_tokens(user_ids):
+    """revoke_user_tokens for many users: one lookup, then a batch of inserts."""
+    now = datetime.utcnow()
+    lifetime = current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES") or timedelta(days=30)
+    keys = {user_key(user_id): int(user_id) for user_id in user_ids}
+    if not keys:
+        return
+
+    existing = RevokedToken.query.filter(RevokedToken.jti.in_(list(keys))).all()
+    for entry in existing:
+        entry.revoked_at = now
+        entry.expires_at = max(entry.expires_at, now + lifetime)
+    found = {entry.jti for entry in existing}
+    db.session.add_all([
+        RevokedToken(jti=key, user_id=user_id, token_type="user", expires_at=now + lifetime)
+        for key, user_id in keys.items() if key not in found
+    ])
+
+    revocations = get_revocation_list()
+    for key in keys:
+        revocations.add(key)
@@ -0,0 +1,71 @@
+import time
+from collections import namedtuple
+from threading import Lock
+
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from app.extensions import db
+from app.models import User
+
+# The few fields authorization checks need; never a live ORM object, so it
+# is safe to share between requests and threads
+CachedUser = namedtuple("CachedUser", ["id", "role", "status"])
+
+_lock = Lock()
+
+
+# ---------------------
+# Process-level cache (short TTL)
+# ---------------------
+def _users():
+    """user_id -> (expires_at, CachedUser or None), kept per app instance."""
+    return current_app.extensions.setdefault("user_cache", {})
+
+
+def get_cached_user(user_id):
+    """Return a CachedUser for user_id, hitting the database at most once per USER_CACHE_TTL."""
+    user_id = int(user_id)
+    now = time.monotonic()
+    entry = _users().get(user_id)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    row = db.session.query(User.id, User.role, User.status).filter_by(id=user_id).first()
+    user = CachedUser(*row) if row else None
+    ttl = current_app.config.get("USER_CACHE_TTL", 30)
+    if ttl > 0:
+        with _lock:
+            _users()[user_id] = (now + ttl, user)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user after a role/status change. Other workers catch up within the TTL."""
+    with _lock:
+        _users().pop(int(user_id), None)
+
+
+# ---------------------
+# Per-request helpers
+# ---------------------
+def get_current_user():
+    """The JWT user as an ORM instance, loaded at most once per request."""
+    if "current_user" not in g:
+        user_id = get_jwt_identity()
+        g.current_user = db.session.get(User, int(user_id)) if user_id else None
+    return g.current_user
+
+
+def user_is_admin(user_id):
+    """Admin check that avoids the database whenever the token already settles it.
+
+    A token whose role claim isn't "admin" is trusted as-is; an admin claim is
+    confirmed against the cache so demotions take effect without a new login.
+    """
+    user_id = int(user_id)
+    if str(user_id) == str(get_jwt_identity()) and get_jwt().get("role", "admin") != "admin":
+        return False
+
+    user = get_cached_user(user_id)
+    return bool(user and user.role == "admin")
@@ -0,0 +1,65 @@
+"""Login throughput benchmark.
+
+Fires concurrent logins at an in-memory app and reports logins/second, so the
+effect of PASSWORD_HASH_METHOD / PASSWORD_HASH_WORKERS can be measured:
+
+    python benchmarks/login_benchmark.py --requests 200 --concurrency 8 --workers 0
+    python benchmarks/login_benchmark.py --requests 200 --concurrency 8 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import User  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS (0 = inline)")
+    parser.add_argument("--method", default=Config.PASSWORD_HASH_METHOD, help="PASSWORD_HASH_METHOD")
+    args = parser.parse_args()
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite://"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        PASSWORD_HASH_WORKERS = args.workers
+        PASSWORD_HASH_METHOD = args.method
+        PASSWORD_HASH_MAX_PENDING = max(args.workers, 1) * 4
+        RATE_LIMIT_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(name="Bench", email="bench@example.com", phone="0700000000")
+        user.password = "secret123"
+        db.session.add(user)
+        db.session.commit()
+
+    def login(_):
+        with app.test_client() as client:
+            return client.post("/api/v1/auth/login", json={
+                "email": "bench@example.com", "password": "secret123"
+            }).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        statuses = Counter(pool.map(login, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    print(f"method={args.method} workers={args.workers} concurrency={args.concurrency}")
+    print(f"{args.requests} logins in {elapsed:.2f}s -> {args.requests / elapsed:.1f} logins/s")
+    print(f"status codes: {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    main()
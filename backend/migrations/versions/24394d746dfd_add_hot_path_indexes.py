@@ -0,0 +1,40 @@
+"""Add hot path indexes
+
+Revision ID: 24394d746dfd
+Revises: a6934bdb4193
+Create Date: 2026-10-19 12:17:27.002184
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '24394d746dfd'
+down_revision = 'a6934bdb4193'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_comment_created_by', 'comment', ['created_by']),
+    ('ix_media_incident', 'media', ['incident_id', 'id']),
+    ('ix_media_uploaded_by', 'media', ['uploaded_by']),
+    ('ix_media_updated', 'media', ['updated_at']),
+    ('ix_points_transaction_incident', 'points_transaction', ['incident_id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY doesn't lock out writes on Postgres, but can't
+    # run inside a transaction; other dialects ignore the flag.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
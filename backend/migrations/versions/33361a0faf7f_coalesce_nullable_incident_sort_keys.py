@@ -0,0 +1,50 @@
+"""Coalesce nullable incident sort keys
+
+Revision ID: 33361a0faf7f
+Revises: 452a46434c37
+Create Date: 2026-10-19 12:41:39.438677
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '33361a0faf7f'
+down_revision = '452a46434c37'
+branch_labels = None
+depends_on = None
+
+
+def coalesce(name, type_, null_value):
+    # Same expression as app.utils.pagination.sort_key, with the value inlined per dialect
+    return sa.func.coalesce(sa.column(name, type_), sa.literal(null_value, type_, literal_execute=True))
+
+
+STATUS = coalesce('status', sa.String(length=50), '')
+CREATED = coalesce('created_at', sa.DateTime(), datetime(1970, 1, 1))
+
+# (name, columns before, columns after)
+INDEXES = [
+    ('ix_incident_status_created', ['status', 'created_at', 'id'], [STATUS, CREATED, 'id']),
+    ('ix_incident_created_by_created', ['created_by', 'created_at', 'id'], ['created_by', CREATED, 'id']),
+    ('ix_incident_created', ['created_at', 'id'], [CREATED, 'id']),
+]
+
+
+def upgrade():
+    # The admin listing filters and sorts on COALESCE(column, ...) so NULL rows aren't
+    # skipped by keyset pages; rebuild its indexes on those expressions, concurrently.
+    with op.get_context().autocommit_block():
+        for name, old, new in INDEXES:
+            op.drop_index(name, table_name='incident', postgresql_concurrently=True)
+            op.create_index(name, 'incident', new, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, old, new in reversed(INDEXES):
+            op.drop_index(name, table_name='incident', postgresql_concurrently=True)
+            op.create_index(name, 'incident', old, unique=False, postgresql_concurrently=True)
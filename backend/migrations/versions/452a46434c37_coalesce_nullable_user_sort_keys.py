@@ -0,0 +1,46 @@
+"""Coalesce nullable user sort keys
+
+Revision ID: 452a46434c37
+Revises: 24394d746dfd
+Create Date: 2026-10-19 12:39:16.097110
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '452a46434c37'
+down_revision = '24394d746dfd'
+branch_labels = None
+depends_on = None
+
+
+def coalesce(name, type_, null_value):
+    # Same expression as app.utils.pagination.sort_key, with the value inlined per dialect
+    return sa.func.coalesce(sa.column(name, type_), sa.literal(null_value, type_, literal_execute=True))
+
+
+# (name, columns before, columns after)
+INDEXES = [
+    ('ix_user_created', ['created_at', 'id'], [coalesce('created_at', sa.DateTime(), datetime(1970, 1, 1)), 'id']),
+    ('ix_user_points', ['points', 'id'], [coalesce('points', sa.Integer(), 0), 'id']),
+]
+
+
+def upgrade():
+    # The directory sorts on COALESCE(column, ...) so NULL rows aren't skipped by keyset
+    # pages; rebuild the sort indexes on that expression. Concurrently, as in 24394d746dfd.
+    with op.get_context().autocommit_block():
+        for name, old, new in INDEXES:
+            op.drop_index(name, table_name='user', postgresql_concurrently=True)
+            op.create_index(name, 'user', new, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, old, new in reversed(INDEXES):
+            op.drop_index(name, table_name='user', postgresql_concurrently=True)
+            op.create_index(name, 'user', old, unique=False, postgresql_concurrently=True)
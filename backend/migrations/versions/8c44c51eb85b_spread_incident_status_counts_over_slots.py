@@ -0,0 +1,57 @@
+"""Spread incident status counts over slots
+
+Revision ID: 8c44c51eb85b
+Revises: 33361a0faf7f
+Create Date: 2026-10-19 12:43:25.936685
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c44c51eb85b'
+down_revision = '33361a0faf7f'
+branch_labels = None
+depends_on = None
+
+
+STATUSES = ['pending', 'investigating', 'approved', 'resolved', 'rejected']  # ALLOWED_STATUSES
+SLOTS = 8  # STATUS_COUNT_SLOTS
+
+
+def create_counts(slots):
+    columns = [sa.Column('status', sa.String(length=50), nullable=False)]
+    if slots:
+        columns.append(sa.Column('slot', sa.Integer(), autoincrement=False, nullable=False))
+    columns.append(sa.Column('count', sa.Integer(), nullable=False))
+    return op.create_table('incident_status_count', *columns,
+                    sa.PrimaryKeyConstraint('status', 'slot') if slots else sa.PrimaryKeyConstraint('status'))
+
+
+def upgrade():
+    # The counts are derived data: rebuild the table with the (status, slot) key,
+    # seed a row for every status and slot, so the counter upserts only ever
+    # update, then backfill from incidents into slot 0.
+    op.drop_table('incident_status_count')
+    counts = create_counts(slots=True)
+    op.bulk_insert(counts, [{'status': status, 'slot': slot, 'count': 0} for status in STATUSES for slot in range(SLOTS)])
+    op.execute(
+        "UPDATE incident_status_count SET count = "
+        "(SELECT COUNT(*) FROM incident WHERE incident.status = incident_status_count.status) WHERE slot = 0"
+    )
+    known = ", ".join(f"'{status}'" for status in STATUSES)
+    op.execute(
+        "INSERT INTO incident_status_count (status, slot, count) "
+        f"SELECT status, 0, COUNT(*) FROM incident WHERE status IS NOT NULL AND status NOT IN ({known}) GROUP BY status"
+    )
+
+
+def downgrade():
+    op.rename_table('incident_status_count', 'incident_status_count_slots')
+    create_counts(slots=False)
+    op.execute(
+        "INSERT INTO incident_status_count (status, count) "
+        "SELECT status, SUM(count) FROM incident_status_count_slots GROUP BY status"
+    )
+    op.drop_table('incident_status_count_slots')
@@ -0,0 +1,41 @@
+"""Coalesce nullable comment sort key
+
+Revision ID: 9aacb0664d6d
+Revises: 8c44c51eb85b
+Create Date: 2026-10-19 12:57:31.789257
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9aacb0664d6d'
+down_revision = '8c44c51eb85b'
+branch_labels = None
+depends_on = None
+
+
+def coalesce(name, type_, null_value):
+    # Same expression as app.utils.pagination.sort_key, with the value inlined per dialect
+    return sa.func.coalesce(sa.column(name, type_), sa.literal(null_value, type_, literal_execute=True))
+
+
+OLD = ['incident_id', 'created_at', 'id']
+NEW = ['incident_id', coalesce('created_at', sa.DateTime(), datetime(1970, 1, 1)), 'id']
+
+
+def upgrade():
+    # Comment pages sort on COALESCE(created_at, ...) so NULL rows aren't skipped;
+    # rebuild their index on that expression, concurrently as in 24394d746dfd.
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_comment_incident_created', table_name='comment', postgresql_concurrently=True)
+        op.create_index('ix_comment_incident_created', 'comment', NEW, unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_comment_incident_created', table_name='comment', postgresql_concurrently=True)
+        op.create_index('ix_comment_incident_created', 'comment', OLD, unique=False, postgresql_concurrently=True)
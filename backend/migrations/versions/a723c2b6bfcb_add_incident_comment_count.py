@@ -0,0 +1,38 @@
+"""Add incident comment count
+
+Revision ID: a723c2b6bfcb
+Revises: da2a10c0e9ed
+Create Date: 2026-10-19 11:20:14.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a723c2b6bfcb'
+down_revision = 'da2a10c0e9ed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('incident', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_incident_created', ['incident_id', 'created_at', 'id'], unique=False)
+
+    # Backfill counts for existing incidents
+    op.execute(
+        "UPDATE incident SET comment_count = "
+        "(SELECT COUNT(*) FROM comment WHERE comment.incident_id = incident.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_incident_created')
+
+    with op.batch_alter_table('incident', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
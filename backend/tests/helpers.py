@@ -0,0 +1,23 @@
+def auth_headers(client, email="reporter@example.com", phone="0700000001"):
+    client.post("/api/v1/auth/signup", json={
+        "name": "Reporter", "email": email, "phone": phone, "password": "secret123"
+    })
+    response = client.post("/api/v1/auth/login", json={"email": email, "password": "secret123"})
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def create_incident(client, headers):
+    response = client.post("/api/v1/incidents/", headers=headers, json={
+        "title": "Road Accident", "description": "Two cars collided", "latitude": -1.29, "longitude": 36.82
+    })
+    return response.get_json()["incident_id"]
+
+
+def admin_headers(client, email="admin@example.com", phone="0700000010"):
+    from app.extensions import db
+    from app.models import User
+
+    auth_headers(client, email=email, phone=phone)
+    User.query.filter_by(email=email).first().role = "admin"
+    db.session.commit()
+    return auth_headers(client, email=email, phone=phone)
@@ -2,3 +2,217 @@ def test_admin_list_incidents(client):
     response = client.get("/api/v1/admin/incidents")
     # Not logged in → expect 401
     assert response.status_code in [200, 401]
+
+
+def test_role_claims_and_cache_invalidation(app, client):
+    from flask_jwt_extended import decode_token
+    from app.extensions import db
+    from app.models import User
+    from tests.helpers import auth_headers
+
+    auth_headers(client, email="admin@example.com", phone="0700000010")
+    admin = User.query.filter_by(email="admin@example.com").first()
+    admin.role = "admin"
+    db.session.commit()
+    admin_headers = auth_headers(client, email="admin@example.com", phone="0700000010")
+    assert decode_token(admin_headers["Authorization"][7:])["role"] == "admin"
+
+    user_headers = auth_headers(client)
+    assert client.get("/api/v1/admin/incidents", headers=user_headers).status_code == 403
+    assert client.get("/api/v1/admin/incidents", headers=admin_headers).status_code == 200
+
+    # Demoting the admin takes effect for their existing token
+    client.put(f"/api/v1/users/{admin.id}", headers=admin_headers, json={"role": "user"})
+    assert client.get("/api/v1/admin/incidents", headers=admin_headers).status_code == 403
+
+
+def test_admin_incident_listing_filters_and_pages(app, client):
+    from datetime import datetime
+    from app.extensions import db
+    from app.models import Incident, User
+    from tests.helpers import admin_headers, auth_headers
+
+    auth_headers(client)
+    reporter = User.query.filter_by(email="reporter@example.com").first()
+    rows = [("Road accident", "pending", 1, -1.29, 36.82), ("Fire", "pending", 2, -1.30, 36.80),
+            ("Flood", "approved", 3, -4.05, 39.66), ("Bus accident", "investigating", 4, -1.28, 36.81)]
+    for title, status, day, lat, lon in rows:
+        db.session.add(Incident(title=title, description="...", status=status, latitude=lat, longitude=lon,
+                                created_by=reporter.id, created_at=datetime(2025, 5, day)))
+    db.session.commit()
+    headers = admin_headers(client)
+
+    def titles(query):
+        return [i["title"] for i in client.get(f"/api/v1/admin/incidents?{query}", headers=headers).get_json()]
+
+    assert titles("status=pending,investigating&sort=status,-created_at") == ["Bus accident", "Fire", "Road accident"]
+    assert titles("bbox=36.7,-1.35,36.9,-1.25&q=ACCIDENT&sort=created_at") == ["Road accident", "Bus accident"]
+    assert titles("from=2025-05-02&to=2025-05-04&sort=created_at") == ["Fire", "Flood"]
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/v1/admin/incidents?sort=status,-created_at&limit=3"
+                              + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        seen += [i["title"] for i in response.get_json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["Flood", "Bus accident", "Fire", "Road accident"]
+    assert response.headers["X-Total-Count"] == "4"
+    assert client.get("/api/v1/admin/incidents?sort=description", headers=headers).status_code == 400
+
+
+def test_admin_incident_listing_pages_through_null_sort_values(app, client):
+    from datetime import datetime
+    from app.extensions import db
+    from app.models import Incident, User
+    from tests.helpers import admin_headers, auth_headers
+
+    auth_headers(client)
+    reporter = User.query.filter_by(email="reporter@example.com").first()
+    for day in range(1, 5):
+        db.session.add(Incident(title=f"Incident {day}", description="...", status="pending", latitude=-1.29,
+                                longitude=36.82, created_by=reporter.id, created_at=datetime(2025, 5, day)))
+    db.session.commit()
+    # Column defaults replace an explicit None on insert, so blank the values afterwards
+    db.session.execute(db.update(Incident).where(Incident.title.in_(["Incident 1", "Incident 2"]))
+                       .values(status=None, created_at=None, updated_at=None))
+    db.session.commit()
+    headers = admin_headers(client)
+
+    for sort in ("status,-created_at", "-status,created_at", "-updated_at", "created_at"):
+        seen, cursor = [], None
+        while True:
+            response = client.get(f"/api/v1/admin/incidents?sort={sort}&limit=1"
+                                  + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+            seen += [i["title"] for i in response.get_json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert sorted(seen) == ["Incident 1", "Incident 2", "Incident 3", "Incident 4"], sort
+    # NULL created_at sorts as the oldest, ties in id order
+    assert seen == ["Incident 1", "Incident 2", "Incident 3", "Incident 4"]
+
+
+def test_admin_summary_uses_maintained_counters(app, client):
+    from app.models import IncidentStatusCount
+    from tests.helpers import admin_headers, auth_headers, create_incident
+
+    app.config.update(ADMIN_SUMMARY_CACHE_TTL=0, SMS_ENABLED=False, EMAIL_OUTBOX_THREAD=False)
+    reporter = auth_headers(client)
+    first = create_incident(client, reporter)
+    second = create_incident(client, reporter)
+    headers = admin_headers(client)
+    client.patch(f"/api/v1/admin/incidents/{first}/status", headers=headers, json={"status": "approved"})
+
+    summary = client.get("/api/v1/admin/summary?pending=5", headers=headers).get_json()
+    assert summary["incidents"]["by_status"]["pending"] == 1
+    assert summary["incidents"]["by_status"]["approved"] == 1
+    assert summary["incidents"]["new_last_hour"] == 2
+    assert [i["id"] for i in summary["latest_pending"]] == [second]
+
+    client.delete(f"/api/v1/admin/incidents/{second}", headers=headers)
+    assert IncidentStatusCount.totals() == {"pending": 0, "approved": 1}
+
+
+def test_status_counts_upsert_into_seeded_slots(app, client):
+    from app.extensions import db
+    from app.models import STATUS_COUNT_SLOTS, IncidentStatusCount
+    from tests.helpers import auth_headers, create_incident
+
+    app.config.update(SMS_ENABLED=False, EMAIL_OUTBOX_THREAD=False)
+    # As seeded by the migration
+    db.session.add_all(IncidentStatusCount(status="pending", slot=slot, count=0) for slot in range(STATUS_COUNT_SLOTS))
+    db.session.commit()
+
+    reporter = auth_headers(client)
+    for _ in range(3):
+        create_incident(client, reporter)
+    assert IncidentStatusCount.totals() == {"pending": 3}
+    assert IncidentStatusCount.query.count() == STATUS_COUNT_SLOTS
+
+
+def test_audit_log_is_batched_and_queryable(app, client):
+    from app.models import AuditLog, User
+    from app.utils.audit import get_audit_writer
+    from tests.helpers import admin_headers, auth_headers, create_incident
+
+    app.config.update(SMS_ENABLED=False, EMAIL_OUTBOX_THREAD=False)
+    reporter = auth_headers(client)
+    incident_id = create_incident(client, reporter)
+    reporter_id = User.query.filter_by(email="reporter@example.com").first().id
+    headers = admin_headers(client)
+    admin_id = User.query.filter_by(email="admin@example.com").first().id
+
+    client.patch(f"/api/v1/admin/incidents/{incident_id}/status", headers=headers, json={"status": "approved"})
+    client.patch(f"/api/v1/users/{reporter_id}/status", headers=headers, json={"status": "suspended"})
+    client.patch(f"/api/v1/users/{reporter_id}/status", headers=headers, json={"status": "active"})
+
+    # Routes only enqueue; nothing is written until the writer flushes
+    assert AuditLog.query.count() == 0
+    get_audit_writer().flush()
+    assert AuditLog.query.count() == 3
+
+    events = client.get(f"/api/v1/admin/audit?target_type=user&target_id={reporter_id}", headers=headers).get_json()
+    assert [e["details"]["new"] for e in events] == ["active", "suspended"]
+    assert all(e["actor_id"] == admin_id for e in events)
+
+    page = client.get(f"/api/v1/admin/audit?actor={admin_id}&limit=2", headers=headers)
+    assert len(page.get_json()) == 2
+    rest = client.get(f"/api/v1/admin/audit?actor={admin_id}&cursor={page.headers['X-Next-Cursor']}", headers=headers)
+    assert [e["action"] for e in rest.get_json()] == ["incident.status"]
+    assert client.get("/api/v1/admin/audit", headers=reporter).status_code in [401, 403]
+
+
+def test_audit_writer_thread_stops_and_flushes(app):
+    from datetime import datetime
+    from app.models import AuditLog
+    from app.utils.audit import AuditWriter
+
+    assert AuditWriter(app).thread is None  # off under TESTING unless asked for
+    app.config.update(AUDIT_LOG_THREAD=True, AUDIT_FLUSH_INTERVAL=60)
+    writer = AuditWriter(app)
+    writer.enqueue({"action": "test", "target_type": "user", "created_at": datetime.utcnow()})
+    thread = writer.thread
+    writer.stop()
+    assert not thread.is_alive()
+    assert AuditLog.query.filter_by(action="test").count() == 1
+
+
+def test_db_pool_metrics(app, client):
+    from tests.helpers import admin_headers
+
+    headers = admin_headers(client)
+    metrics = client.get("/api/v1/admin/db/pool", headers=headers).get_json()
+    default = metrics["binds"]["default"]
+    assert default["checkouts"] > 0 and default["timeouts"] == 0
+    assert default["wait_max_ms"] >= default["wait_avg_ms"] >= 0
+
+
+def test_pool_metrics_count_timeouts_and_invalidations(tmp_path):
+    import pytest
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import TimeoutError as PoolTimeout
+    from app.utils.db_pool import PoolMetrics
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=1, max_overflow=0, pool_timeout=0.05)
+    metrics = PoolMetrics(engine)
+    held = engine.connect()
+    assert metrics.snapshot()["checkedout"] == 1
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    held.invalidate()
+    held.close()
+
+    snapshot = metrics.snapshot()
+    assert (snapshot["timeouts"], snapshot["invalidations"], snapshot["checkedout"]) == (1, 1, 0)
+    assert snapshot["wait_max_ms"] >= 50
+
+
+def test_similar_incidents_rejects_bad_max_distance(app, client):
+    from tests.helpers import admin_headers, auth_headers, create_incident
+
+    incident_id = create_incident(client, auth_headers(client))
+    headers = admin_headers(client)
+    assert client.get(f"/api/v1/admin/incidents/{incident_id}/similar?max_distance=x", headers=headers).status_code == 400
+    assert client.get(f"/api/v1/admin/incidents/{incident_id}/similar?max_distance=3", headers=headers).status_code == 200
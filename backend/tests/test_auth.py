@@ -2,3 +2,146 @@ def test_signup(client):
     response = client.post("/api/v1/auth/signup", json={"email": "test@example.com", "password": "123"})
     assert response.status_code == 201
     assert "User registered" in response.get_json()["message"]
+
+
+def test_login_rehashes_when_cost_changes(app, client):
+    from app.models import User
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    client.post("/api/v1/auth/signup", json={
+        "name": "Rehash", "email": "rehash@example.com", "phone": "0700000002", "password": "secret123"
+    })
+    assert User.query.filter_by(email="rehash@example.com").first().password_hash.startswith("pbkdf2:sha256:1000$")
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    response = client.post("/api/v1/auth/login", json={"email": "rehash@example.com", "password": "secret123"})
+    assert response.status_code == 200
+    assert User.query.filter_by(email="rehash@example.com").first().password_hash.startswith("pbkdf2:sha256:2000$")
+
+
+def test_password_hashing_in_worker_pool(app):
+    from app.utils.security import hash_password, verify_password
+
+    app.config["PASSWORD_HASH_WORKERS"] = 1
+    hashed = hash_password("secret123")
+    assert verify_password(hashed, "secret123")
+    assert not verify_password(hashed, "wrong")
+
+    # A dead worker breaks the pool; the next call replaces it
+    from app.utils import security
+    for process in list(security._pool._processes.values()):
+        process.kill()
+        process.join()
+    assert verify_password(hashed, "secret123")
+
+
+def test_needs_rehash_compares_parsed_method(app):
+    from werkzeug.security import generate_password_hash
+    from app.utils.security import needs_rehash
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256"
+    assert not needs_rehash(generate_password_hash("secret123", "pbkdf2:sha256"))
+    assert needs_rehash(generate_password_hash("secret123", "pbkdf2:sha256:1000"))
+    app.config["PASSWORD_HASH_METHOD"] = "scrypt"
+    assert not needs_rehash(generate_password_hash("secret123", "scrypt:32768:8:1"))
+
+
+def test_logout_and_suspension_revoke_tokens(app, client):
+    from app.extensions import db
+    from app.models import User
+    from tests.helpers import auth_headers
+
+    headers = auth_headers(client)
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+    auth_headers(client, email="admin@example.com", phone="0700000010")
+    User.query.filter_by(email="admin@example.com").first().role = "admin"
+    db.session.commit()
+    admin_headers = auth_headers(client, email="admin@example.com", phone="0700000010")
+
+    headers = auth_headers(client)
+    user_id = User.query.filter_by(email="reporter@example.com").first().id
+    client.patch(f"/api/v1/users/{user_id}/status", headers=admin_headers, json={"status": "suspended"})
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+    assert client.post("/api/v1/auth/login", json={
+        "email": "reporter@example.com", "password": "secret123"
+    }).status_code == 403
+
+
+def test_login_rate_limited(app, client):
+    app.config["RATE_LIMITS"] = dict(app.config["RATE_LIMITS"], login="3/minute")
+    for _ in range(3):
+        assert client.post("/api/v1/auth/login", json={"email": "x@example.com", "password": "nope"}).status_code == 401
+
+    response = client.post("/api/v1/auth/login", json={"email": "x@example.com", "password": "nope"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+
+def test_login_limited_per_account_and_per_client_ip(app, client):
+    app.config["RATE_LIMITS"] = dict(app.config["RATE_LIMITS"], login="100/minute", login_account="2/minute")
+    for n in range(2):
+        response = client.post("/api/v1/auth/login", json={"email": "x@example.com", "password": "nope"},
+                               headers={"X-Forwarded-For": f"10.0.0.{n}"})
+        assert response.status_code == 401
+    # Same account from a fresh address, with the email spelled differently
+    response = client.post("/api/v1/auth/login", json={"email": " X@Example.com", "password": "nope"},
+                           headers={"X-Forwarded-For": "10.0.0.9"})
+    assert response.status_code == 429
+
+    # Behind the load balancer each client gets its own per-IP budget
+    app.config["RATE_LIMITS"] = dict(app.config["RATE_LIMITS"], login="1/minute", login_account="100/minute")
+    for ip in ("10.1.0.1", "10.1.0.2"):
+        response = client.post("/api/v1/auth/login", json={"email": "y@example.com", "password": "nope"},
+                               headers={"X-Forwarded-For": ip})
+        assert response.status_code == 401
+
+def test_sqlite_rate_limit_backend_is_shared(tmp_path):
+    from app.utils.rate_limit import SQLiteBackend
+
+    path = str(tmp_path / "limits.sqlite3")
+    worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path)
+    limits = [("login:ip:1.2.3.4:60", 2, 60)]
+    assert worker_a.hit(limits)[0]
+    assert worker_b.hit(limits)[0]
+    assert not worker_a.hit(limits)[0]
+
+
+def test_rejected_request_uses_no_quota():
+    from app.utils.rate_limit import MemoryBackend
+
+    backend = MemoryBackend()
+    limits = [("login:ip:1.2.3.4:60", 5, 60), ("login:ip:1.2.3.4:3600", 1, 3600)]
+    assert backend.hit(limits)[0]
+    for _ in range(3):
+        assert not backend.hit(limits)[0]  # the hourly window is full
+    assert backend.counters["login:ip:1.2.3.4:60"][1][1] == 1
+
+
+def test_token_issued_in_the_revocation_second_stays_valid(app, client):
+    import calendar
+    from flask_jwt_extended import decode_token
+    from app.extensions import db
+    from app.models import RevokedToken, User
+    from app.utils.token_revocation import get_revocation_list, revoke_user_tokens
+    from tests.helpers import auth_headers
+
+    auth_headers(client)
+    user = User.query.filter_by(email="reporter@example.com").first()
+    revoke_user_tokens(user.id)
+    db.session.commit()
+
+    # A login straight after the revocation, within the same second, is valid
+    headers = auth_headers(client)
+    assert decode_token(headers["Authorization"][7:])["iat_us"]
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    # Tokens without iat_us fall back to whole seconds
+    revoked_at = RevokedToken.query.filter_by(jti=f"user:{user.id}").first().revoked_at
+    payload = {"jti": "legacy", "sub": str(user.id), "iat": calendar.timegm(revoked_at.timetuple())}
+    assert not get_revocation_list().is_revoked(payload)
+    payload["iat"] -= 1
+    assert get_revocation_list().is_revoked(payload)
@@ -0,0 +1,54 @@
+from tests.helpers import auth_headers, create_incident
+
+
+def test_comments_paginated_and_counted(client):
+    headers = auth_headers(client)
+    incident_id = create_incident(client, headers)
+    for n in range(5):
+        client.post(f"/api/v1/incidents/{incident_id}/comments", headers=headers, json={"text": f"update {n}"})
+
+    first = client.get(f"/api/v1/incidents/{incident_id}/comments?limit=3")
+    assert [c["text"] for c in first.get_json()] == ["update 0", "update 1", "update 2"]
+    assert first.headers["X-Total-Count"] == "5"
+
+    second = client.get(f"/api/v1/incidents/{incident_id}/comments?limit=3&cursor={first.headers['X-Next-Cursor']}")
+    page = second.get_json()
+    assert [c["text"] for c in page] == ["update 3", "update 4"]
+    assert "X-Next-Cursor" not in second.headers
+
+    client.delete(f"/api/v1/incidents/{incident_id}/comments/{page[0]['id']}", headers=headers)
+    assert client.get(f"/api/v1/incidents/{incident_id}").get_json()["comment_count"] == 4
+
+
+def test_latest_comments_for_several_incidents(client):
+    headers = auth_headers(client)
+    first, second, quiet = (create_incident(client, headers) for _ in range(3))
+    for incident_id in (first, second):
+        for n in range(4):
+            client.post(f"/api/v1/incidents/{incident_id}/comments", headers=headers, json={"text": f"update {n}"})
+
+    data = client.get(f"/api/v1/incidents/comments/latest?ids={first},{second},{quiet}&k=2").get_json()
+    assert [c["text"] for c in data[str(first)]] == ["update 3", "update 2"]
+    assert data[str(second)][0]["author_name"] == "Reporter"
+    assert data[str(quiet)] == []
+
+
+def test_comments_without_created_at_are_not_skipped(app, client):
+    from app import db
+    from app.models import Comment
+
+    headers = auth_headers(client)
+    incident_id = create_incident(client, headers)
+    for n in range(4):
+        client.post(f"/api/v1/incidents/{incident_id}/comments", headers=headers, json={"text": f"update {n}"})
+    db.session.execute(db.update(Comment).where(Comment.text.in_(["update 1", "update 3"])).values(created_at=None))
+    db.session.commit()
+
+    seen, cursor = [], ""
+    while True:
+        resp = client.get(f"/api/v1/incidents/{incident_id}/comments?limit=1{cursor}")
+        seen += [c["text"] for c in resp.get_json()]
+        if "X-Next-Cursor" not in resp.headers:
+            break
+        cursor = f"&cursor={resp.headers['X-Next-Cursor']}"
+    assert seen == ["update 1", "update 3", "update 0", "update 2"]
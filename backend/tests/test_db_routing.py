@@ -0,0 +1,130 @@
+import shutil
+
+
+def make_app(tmp_path, replica_url):
+    from app import create_app
+    from app.config import Config
+
+    class ReplicaConfig(Config):
+        TESTING = True
+        UPLOAD_FOLDER = str(tmp_path / "uploads")
+        MEDIA_METADATA_WORKERS = 0
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        DB_REPLICA_URLS = [replica_url]
+        DB_REPLICA_STICKY_SECONDS = 60
+        EMAIL_OUTBOX_THREAD = False
+
+    return create_app(ReplicaConfig)
+
+
+def incident_titles(client, headers=None, ip="127.0.0.1"):
+    response = client.get("/api/v1/incidents/", headers=headers, environ_base={"REMOTE_ADDR": ip})
+    return [i["title"] for i in response.get_json()]
+
+
+def test_reads_use_replica_until_the_client_writes(tmp_path):
+    from app.extensions import db
+    from tests.helpers import auth_headers, create_incident
+
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        db.create_all()
+    reporter = app.test_client()
+    headers = auth_headers(reporter)
+
+    def replicate():
+        app.extensions["db_router"].engines["replica_1"].dispose()
+        shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+
+    replicate()
+    create_incident(reporter, headers)  # not replicated yet
+
+    # Another client reads the lagging replica; the writer reads its own write
+    assert incident_titles(app.test_client(), ip="10.0.0.2") == []
+    assert incident_titles(reporter, headers) == ["Road Accident"]
+
+    replicate()
+    assert incident_titles(app.test_client(), ip="10.0.0.2") == ["Road Accident"]
+
+
+def test_reads_fall_back_to_primary_when_replica_is_down(tmp_path):
+    from app.extensions import db
+    from tests.helpers import auth_headers, create_incident
+
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    create_incident(client, auth_headers(client))
+
+    assert incident_titles(app.test_client(), ip="10.0.0.2") == ["Road Accident"]
+
+
+def test_sticky_header_pins_reads_to_primary(tmp_path):
+    import time
+    from app.extensions import db
+    from tests.helpers import auth_headers
+
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    headers = auth_headers(client)
+    app.extensions["db_router"].engines["replica_1"].dispose()
+    shutil.copy(tmp_path / "primary.db", tmp_path / "replica.db")
+
+    response = client.post("/api/v1/incidents/", headers=headers, json={
+        "title": "Road Accident", "description": "Two cars collided", "latitude": -1.29, "longitude": 36.82
+    })
+    token = response.headers["X-DB-Primary-Until"]
+
+    # The SPA echoes the token; it holds on any worker, even from another address
+    def titles(sent):
+        response = client.get("/api/v1/incidents/", headers={"X-DB-Primary-Until": sent},
+                              environ_base={"REMOTE_ADDR": "10.0.0.3"})
+        return [i["title"] for i in response.get_json()]
+
+    assert titles(token) == ["Road Accident"]
+    assert titles(f"{time.time() + 3600:.3f}") == []  # not one we could have issued
+    assert titles("garbage") == []
+
+
+def test_failed_replica_reads_are_retried_on_the_primary(tmp_path):
+    import sqlite3
+    from app.extensions import db
+    from tests.helpers import auth_headers, create_incident
+
+    # The replica answers pings but every query against it fails
+    sqlite3.connect(tmp_path / "replica.db").close()
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    create_incident(client, auth_headers(client))
+
+    assert incident_titles(app.test_client(), ip="10.0.0.2") == ["Road Accident"]
+    assert incident_titles(app.test_client(), ip="10.0.0.2") == ["Road Accident"]
+
+
+def test_only_one_request_pings_a_replica(tmp_path):
+    app = make_app(tmp_path, f"sqlite:///{tmp_path / 'replica.db'}")
+    router = app.extensions["db_router"]
+
+    # While another request is pinging, the rest use the last result instead of waiting
+    with router.check_locks["replica_1"]:
+        assert router._check("replica_1")
+    assert router.checked_until == {}
+    assert router._check("replica_1")
+    assert "replica_1" in router.checked_until
+
+
+def test_preflight_allows_the_sticky_header(app, client):
+    response = client.options("/api/v1/incidents/", headers={
+        "Origin": "http://localhost:5173",
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "Authorization, X-DB-Primary-Until",
+    })
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost:5173"
+    assert "X-DB-Primary-Until" in response.headers["Access-Control-Allow-Headers"]
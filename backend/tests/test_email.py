@@ -0,0 +1,107 @@
+import socket
+import threading
+
+
+class FakeSMTPServer(threading.Thread):
+    """Minimal SMTP stand-in that records each message and counts connections."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        self.messages = []
+        self.connections = 0
+
+    def run(self):
+        while True:
+            conn, _ = self.sock.accept()
+            self.connections += 1
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        f = conn.makefile("rwb")
+
+        def reply(line):
+            f.write(line.encode() + b"\r\n")
+            f.flush()
+
+        reply("220 fake smtp")
+        while True:
+            line = f.readline().decode().strip()
+            command = line.split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                reply("250 fake")
+            elif command == "DATA":
+                reply("354 go ahead")
+                data = []
+                while (chunk := f.readline()) not in (b".\r\n", b""):
+                    data.append(chunk)
+                self.messages.append(b"".join(data).decode())
+                reply("250 queued")
+            elif command == "QUIT" or not line:
+                reply("221 bye")
+                conn.close()
+                return
+            else:
+                reply("250 ok")
+
+
+def test_outbox_batches_over_one_connection(app):
+    from app.extensions import db
+    from app.models import EmailOutbox
+    from app.utils.email_utils import queue_email, send_pending
+
+    server = FakeSMTPServer()
+    server.start()
+    app.config["EMAIL_OUTBOX_THREAD"] = False
+    app.extensions["mail"].__dict__.update(
+        server="127.0.0.1", port=server.port, use_tls=False, use_ssl=False, username=None, suppress=False,
+        default_sender="noreply@example.com"
+    )
+
+    for n in range(3):
+        queue_email(f"user{n}@example.com", f"Update {n}", body="Status changed")
+    db.session.commit()
+
+    assert send_pending() == (3, 0)
+    assert len(server.messages) == 3
+    assert server.connections == 1
+    assert {e.status for e in EmailOutbox.query.all()} == {"sent"}
+
+
+def test_outbox_retries_with_backoff(app):
+    from app.extensions import db
+    from app.models import EmailOutbox
+    from app.utils.email_utils import queue_email, send_pending
+
+    app.config["EMAIL_OUTBOX_THREAD"] = False
+    app.extensions["mail"].__dict__.update(server="127.0.0.1", port=1, use_tls=False, suppress=False)
+    queue_email("user@example.com", "Hello", body="Hi")
+    db.session.commit()
+
+    assert send_pending() == (0, 1)
+    email = EmailOutbox.query.one()
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.last_error
+
+
+def test_sender_is_woken_after_commit(app):
+    from app.extensions import db
+    from app.utils.email_utils import queue_email
+
+    class IdleSender:
+        def __init__(self):
+            self.wakeup = threading.Event()
+
+        def is_alive(self):
+            return True
+
+    sender = app.extensions["email_outbox_sender"] = IdleSender()
+    app.config["EMAIL_OUTBOX_THREAD"] = True
+    queue_email("someone@example.com", "Hello", body="Hi")
+    assert not sender.wakeup.is_set()  # the row isn't visible to the sender yet
+    db.session.commit()
+    assert sender.wakeup.is_set()
@@ -0,0 +1,52 @@
+import io
+
+from app.models import Incident, Media
+from tests.helpers import auth_headers, create_incident
+
+INCIDENT = {"title": "Road Accident", "description": "Two cars collided", "latitude": -1.29, "longitude": 36.82}
+
+
+def test_retried_create_incident_is_replayed(app, client):
+    headers = {**auth_headers(client), "Idempotency-Key": "create-1"}
+
+    first = client.post("/api/v1/incidents/", headers=headers, json=INCIDENT)
+    retry = client.post("/api/v1/incidents/", headers=headers, json=INCIDENT)
+    assert first.status_code == retry.status_code == 201
+    assert retry.get_json() == first.get_json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert Incident.query.count() == 1
+
+    # Same key, different request
+    other = client.post("/api/v1/incidents/", headers=headers, json={**INCIDENT, "title": "Fire"})
+    assert other.status_code == 422
+
+    # Keys are per user
+    other_user = {**auth_headers(client, email="other@example.com", phone="0700000002"), "Idempotency-Key": "create-1"}
+    assert client.post("/api/v1/incidents/", headers=other_user, json=INCIDENT).status_code == 201
+    assert Incident.query.count() == 2
+
+
+def test_retried_upload_is_replayed(app, client):
+    headers = auth_headers(client)
+    incident_id = create_incident(client, headers)
+
+    def upload():
+        return client.post(f"/api/v1/media/{incident_id}/upload", headers={**headers, "Idempotency-Key": "up-1"},
+                           data={"file": (io.BytesIO(b"not really a video"), "clip.mp4")},
+                           content_type="multipart/form-data")
+
+    assert upload().status_code == 200
+    assert upload().headers.get("Idempotent-Replayed") == "true"
+    assert Media.query.count() == 1
+
+
+def test_preflight_allows_idempotency_key_on_patch(app, client):
+    response = client.options("/api/v1/admin/incidents/1/status", headers={
+        "Origin": "http://localhost:5173",
+        "Access-Control-Request-Method": "PATCH",
+        "Access-Control-Request-Headers": "Authorization, Idempotency-Key",
+    })
+    assert response.status_code == 200
+    assert response.headers["Access-Control-Allow-Origin"] == "http://localhost:5173"
+    assert "PATCH" in response.headers["Access-Control-Allow-Methods"]
+    assert "Idempotency-Key" in response.headers["Access-Control-Allow-Headers"]
@@ -0,0 +1,47 @@
+from app.extensions import db
+from app.models import User
+from app.utils.points import apply_points
+from tests.helpers import auth_headers
+
+
+def test_leaderboard_and_my_rank(app, client):
+    headers = auth_headers(client)
+    for i, points in enumerate([50, 30, 30, 5]):
+        user = User(name=f"User {i}", email=f"user{i}@example.com", phone=f"07100000{i:02d}", points=points)
+        user.password = "secret123"
+        db.session.add(user)
+    db.session.commit()
+
+    top = client.get("/api/v1/users/leaderboard?top=3").get_json()
+    assert [u["points"] for u in top] == [50, 30, 30]
+    assert client.get("/api/v1/users/leaderboard/me", headers=headers).get_json()["rank"] == 5
+
+    # A ledger change shows up on the next read, in the cached top K too
+    reporter = User.query.filter_by(email="reporter@example.com").first()
+    apply_points(reporter.id, 30, "admin_adjustment")
+    db.session.commit()
+
+    me = client.get("/api/v1/users/leaderboard/me", headers=headers).get_json()
+    assert (me["points"], me["rank"]) == (30, 2)  # ties share a rank
+    top = client.get("/api/v1/users/leaderboard?top=3").get_json()
+    assert [u["points"] for u in top] == [50, 30, 30]
+    assert reporter.id in [u["id"] for u in client.get("/api/v1/users/leaderboard?top=4").get_json()]
+
+
+def test_new_users_join_the_leaderboard_before_any_points(app, client):
+    from app.utils.leaderboard import get_leaderboard
+
+    auth_headers(client)
+    assert len(client.get("/api/v1/users/leaderboard?top=10").get_json()) == 1
+
+    # Signed up on this worker: added straight away
+    auth_headers(client, email="new@example.com", phone="0710000099")
+    assert len(client.get("/api/v1/users/leaderboard?top=10").get_json()) == 2
+
+    # Signed up on another worker: picked up by the next sync
+    user = User(name="Elsewhere", email="elsewhere@example.com", phone="0710000098")
+    user.password = "secret123"
+    db.session.add(user)
+    db.session.commit()
+    get_leaderboard().mark_stale()
+    assert user.id in [u["id"] for u in client.get("/api/v1/users/leaderboard?top=10").get_json()]
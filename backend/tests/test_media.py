@@ -0,0 +1,175 @@
+import io
+
+from tests.helpers import auth_headers, create_incident
+
+
+def test_batch_upload(client):
+    headers = auth_headers(client)
+    incident_id = create_incident(client, headers)
+
+    response = client.post(
+        f"/api/v1/media/{incident_id}/upload/batch",
+        headers=headers,
+        data={"files": [
+            (io.BytesIO(b"first"), "photo.jpg"),
+            (io.BytesIO(b"second"), "photo.jpg"),
+            (io.BytesIO(b"script"), "notes.exe"),
+        ]},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["uploaded"] == 2
+    assert [r["status"] for r in data["results"]] == ["uploaded", "uploaded", "rejected"]
+    assert data["results"][0]["file_url"] != data["results"][1]["file_url"]
+
+
+def test_extract_image_metadata(tmp_path):
+    from PIL import Image
+    from app.utils.media_metadata import extract_metadata
+
+    path = tmp_path / "scene.png"
+    Image.new("RGB", (64, 48)).save(path)
+
+    metadata = extract_metadata(str(path))
+    assert metadata["mime_type"] == "image/png"
+    assert (metadata["width"], metadata["height"]) == (64, 48)
+    assert metadata["file_size"] == path.stat().st_size
+
+
+def test_collect_orphans(app, tmp_path):
+    from app.extensions import db
+    from app.models import Incident, Media, User
+    from app.utils.media_gc import collect_orphans
+
+    user = User(name="Reporter", email="gc@example.com", phone="0700000009", password_hash="x")
+    incident = Incident(title="Fire", description="Market fire", latitude=0, longitude=0, user=user)
+    db.session.add(Media(filename="kept.jpg", file_url="/kept.jpg", incident=incident, user=user))
+    db.session.commit()
+
+    for name in ["kept.jpg", "orphan_a.jpg", "orphan_b.jpg"]:
+        (tmp_path / name).write_bytes(b"data")
+
+    stats = collect_orphans(str(tmp_path), mode="dry-run", min_age=0, chunk_size=1)
+    assert stats["orphans"] == 2
+    assert (tmp_path / "orphan_a.jpg").exists()
+
+    stats = collect_orphans(str(tmp_path), mode="quarantine", min_age=0, batch_size=1)
+    assert stats["removed"] == 2
+    assert sorted(p.name for p in tmp_path.iterdir() if p.is_file()) == ["kept.jpg"]
+
+    # A later orphan with the same name doesn't overwrite the quarantined one
+    (tmp_path / "orphan_a.jpg").write_bytes(b"newer")
+    collect_orphans(str(tmp_path), mode="quarantine", min_age=0)
+    quarantined = sorted(p.read_bytes() for p in (tmp_path / ".quarantine").iterdir() if p.name.startswith("orphan_a"))
+    assert quarantined == [b"data", b"newer"]
+
+
+def test_similar_images_in_bk_tree(tmp_path):
+    from PIL import Image
+    from app.utils.image_similarity import BKTree, compute_dhash
+
+    original = Image.radial_gradient("L").convert("RGB")
+    original.save(tmp_path / "original.png")
+    original.resize((96, 96)).save(tmp_path / "resized.jpg", quality=60)
+    Image.linear_gradient("L").save(tmp_path / "other.png")
+
+    tree = BKTree()
+    for media_id, name in enumerate(["original.png", "resized.jpg", "other.png"], start=1):
+        tree.add(int(compute_dhash(str(tmp_path / name)), 16), media_id)
+
+    matches = [media_id for _, media_id in tree.search(int(compute_dhash(str(tmp_path / "original.png")), 16), 6)]
+    assert matches[:2] == [1, 2]
+    assert 3 not in matches
+
+    # Re-hashed items move to their new hash
+    tree.remove(int(compute_dhash(str(tmp_path / "resized.jpg")), 16), 2)
+    tree.add(int(compute_dhash(str(tmp_path / "other.png")), 16), 2)
+    matches = [media_id for _, media_id in tree.search(int(compute_dhash(str(tmp_path / "other.png")), 16), 0)]
+    assert sorted(matches) == [2, 3]
+
+
+def test_similarity_index_syncs_at_most_once_per_interval(app, client):
+    from app.extensions import db
+    from app.models import Media, User
+    from app.utils.image_similarity import SimilarityIndex
+
+    incident_id = create_incident(client, auth_headers(client))
+    user_id = User.query.first().id
+    index = SimilarityIndex()
+    assert index.similar("00000000000000ff", 0) == []
+
+    # Lookups within SYNC_INTERVAL don't query Media again...
+    media = Media(filename="a.jpg", file_url="/a.jpg", incident_id=incident_id, uploaded_by=user_id,
+                  phash="00000000000000ff")
+    db.session.add(media)
+    db.session.commit()
+    assert index.similar("00000000000000ff", 0) == []
+
+    # ...but hashes pushed by this worker are found straight away
+    index.update(media.id, media.phash)
+    assert index.similar("00000000000000ff", 0) == [(0, media.id)]
+
+
+def test_serve_webp_rendition(client):
+    from PIL import Image
+
+    headers = auth_headers(client)
+    incident_id = create_incident(client, headers)
+    image = io.BytesIO()
+    Image.radial_gradient("L").convert("RGB").save(image, format="JPEG")
+    image.seek(0)
+    upload = client.post(
+        f"/api/v1/media/{incident_id}/upload",
+        headers=headers,
+        data={"file": (image, "scene.jpg")},
+        content_type="multipart/form-data",
+    ).get_json()
+
+    response = client.get(upload["file_url"], headers={"Accept": "image/webp,*/*"})
+    assert response.status_code == 200
+    assert response.mimetype == "image/webp"
+    assert "Accept" in response.headers["Vary"]
+
+    response = client.get(upload["file_url"], headers={"Accept": "*/*"})
+    assert response.mimetype == "image/jpeg"
+
+
+def test_palette_transparency_survives_renditions(tmp_path):
+    from PIL import Image
+    from app.utils.image_renditions import RENDITION_FORMATS, get_rendition
+
+    image = Image.new("P", (8, 8), 0)
+    image.putpalette([255, 0, 0, 0, 0, 255])
+    image.paste(1, (4, 0, 8, 8))
+    image.save(tmp_path / "icon.png", transparency=0)
+
+    webp = next(f for f in RENDITION_FORMATS if f[0] == "image/webp")
+    with Image.open(tmp_path / get_rendition(str(tmp_path), "icon.png", webp)) as rendition:
+        assert rendition.mode == "RGBA"
+        assert rendition.getpixel((0, 0))[3] == 0
+        assert rendition.getpixel((6, 0))[3] == 255
+
+
+def test_save_upload_never_reuses_a_taken_name(app, monkeypatch):
+    import os
+    from werkzeug.datastructures import FileStorage
+    from app.routes import media
+
+    # Another upload takes "photo.jpg" between any existence check and the write
+    real_open = os.open
+
+    def racing_open(path, flags, *args):
+        if path.endswith(os.sep + "photo.jpg") and not os.path.exists(path):
+            with open(path, "wb") as other:
+                other.write(b"other")
+        return real_open(path, flags, *args)
+
+    monkeypatch.setattr(media.os, "open", racing_open)
+    with app.test_request_context():
+        filename, _ = media.save_upload(FileStorage(io.BytesIO(b"mine"), "photo.jpg"))
+
+    folder = app.config["UPLOAD_FOLDER"]
+    assert filename == "photo_1.jpg"
+    with open(os.path.join(folder, "photo.jpg"), "rb") as other, open(os.path.join(folder, filename), "rb") as mine:
+        assert (other.read(), mine.read()) == (b"other", b"mine")
@@ -0,0 +1,50 @@
+from app.extensions import db
+from app.models import PointsTransaction, User
+from tests.helpers import auth_headers, create_incident
+
+
+def make_admin(client):
+    auth_headers(client, email="admin@example.com", phone="0700000010")
+    User.query.filter_by(email="admin@example.com").first().role = "admin"
+    db.session.commit()
+    return auth_headers(client, email="admin@example.com", phone="0700000010")
+
+
+def test_points_ledger_and_atomic_redeem(app, client):
+    app.config.update(SMS_ENABLED=False)
+    headers = auth_headers(client)
+    incident_id = create_incident(client, headers)
+    admin_headers = make_admin(client)
+
+    client.patch(f"/api/v1/incidents/{incident_id}/status", headers=admin_headers, json={"status": "approved"})
+    assert client.get("/api/v1/users/points", headers=headers).get_json()["points"] == 10
+
+    assert client.post("/api/v1/users/redeem", headers=headers, json={"points": 15}).status_code == 400
+    assert client.post("/api/v1/users/redeem", headers=headers, json={"points": -5}).status_code == 400
+    response = client.post("/api/v1/users/redeem", headers=headers, json={"points": 10, "reward": "airtime"})
+    assert response.get_json()["points_remaining"] == 0
+
+    reporter = User.query.filter_by(email="reporter@example.com").first()
+    ledger = PointsTransaction.query.filter_by(user_id=reporter.id).order_by(PointsTransaction.id).all()
+    assert [(t.delta, t.reason) for t in ledger] == [(10, "incident_approved"), (-10, "redemption")]
+    assert ledger[1].redemption_id == response.get_json()["redemption_id"]
+
+    # Rejecting after the points were spent can't push the balance negative
+    client.patch(f"/api/v1/incidents/{incident_id}/status", headers=admin_headers, json={"status": "rejected"})
+    db.session.refresh(reporter)
+    assert reporter.points == 0
+
+
+def test_reconcile_fixes_drift(app, client):
+    auth_headers(client)
+    user = User.query.filter_by(email="reporter@example.com").first()
+    db.session.add(PointsTransaction(user_id=user.id, delta=25, reason="admin_adjustment"))
+    user.points = 7
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    assert "1 drifted balances" in runner.invoke(args=["points", "reconcile"]).output
+    assert "1 drifted balances fixed" in runner.invoke(args=["points", "reconcile", "--fix"]).output
+    db.session.refresh(user)
+    assert user.points == 25
+    assert "0 drifted balances" in runner.invoke(args=["points", "reconcile"]).output
@@ -0,0 +1,69 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# A "SCAN <table>" line without "USING ... INDEX" reads the whole table
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+# estimate_count's COUNT over a LIMIT-ed subquery stops after PAGINATION_EXACT_COUNT_LIMIT rows
+BOUNDED_COUNT = re.compile(r"^SELECT count\(\*\).*\bLIMIT \?", re.S)
+
+
+@contextmanager
+def captured_selects(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def full_scans(db, statements):
+    """(table, statement) for every table the statements read without an index."""
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            if BOUNDED_COUNT.match(statement):
+                continue
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                match = FULL_SCAN.match(row[3])
+                if match and match.group(1) in db.metadata.tables:  # not subqueries
+                    scans.append((match.group(1), statement))
+    return scans
+
+
+def test_hot_routes_use_indexes(app, client):
+    from app.extensions import db
+    from app.models import User
+    from tests.helpers import admin_headers, auth_headers, create_incident
+
+    app.config.update(SMS_ENABLED=False, EMAIL_OUTBOX_THREAD=False)
+    reporter = auth_headers(client)
+    incident_id = create_incident(client, reporter)
+    client.post(f"/api/v1/incidents/{incident_id}/comments", headers=reporter, json={"text": "Seen it"})
+    headers = admin_headers(client)
+    reporter_id = User.query.filter_by(email="reporter@example.com").first().id
+    client.get("/api/v1/users/leaderboard")  # the leaderboard's rebuild reads every user by design
+
+    routes = [
+        ("get", "/api/v1/admin/incidents?status=pending", headers),
+        ("get", f"/api/v1/admin/incidents?reporter={reporter_id}", headers),
+        ("get", "/api/v1/admin/incidents?sort=-created_at", headers),
+        ("get", f"/api/v1/incidents/{incident_id}/comments", reporter),
+        ("get", f"/api/v1/media/incident/{incident_id}", reporter),
+        ("get", "/api/v1/users/redemptions", reporter),
+        ("get", "/api/v1/users/?sort=-points", headers),
+        ("get", f"/api/v1/admin/audit?actor={reporter_id}", headers),
+        ("delete", f"/api/v1/users/{reporter_id}", headers),
+    ]
+    for method, url, route_headers in routes:
+        with captured_selects(db.engine) as statements:
+            response = getattr(client, method)(url, headers=route_headers)
+        assert response.status_code == 200, url
+        assert full_scans(db, statements) == [], url
@@ -0,0 +1,88 @@
+import io
+import json
+import time
+
+from app.utils import sms_utils
+from app.utils.sms_utils import AfricasTalkingProvider, FakeSMSProvider, SMSDispatcher, SMSMessage, normalize_phone
+
+
+def test_dispatcher_batches_and_retries():
+    provider = FakeSMSProvider({})
+    provider.fail_numbers = {"0700000099"}
+    dispatcher = SMSDispatcher(
+        provider, batch_size=3, concurrency=1, rate_limit=0, batch_wait=0.2, max_attempts=2, queue_size=100,
+        retry_backoff=0.3,
+    )
+
+    started = time.monotonic()
+    for i in range(5):
+        dispatcher.enqueue(f"070000000{i}", "hello")
+    dispatcher.enqueue("0700000099", "hello")
+    dispatcher.flush()
+
+    # flush() waited for the retry, which was held back for retry_backoff
+    assert time.monotonic() - started >= 0.3
+
+    assert [len(batch) for batch in provider.batches][:2] == [3, 3]
+    assert len(provider.sent) == 5
+    # The failing number was tried exactly max_attempts times
+    attempts = [m for batch in provider.batches for m in batch if m.phone == "0700000099"]
+    assert [m.attempts for m in attempts] == [0, 1]
+
+    dispatcher.stop()
+    assert not any(thread.is_alive() for thread in [*dispatcher.workers, dispatcher.retrier])
+
+
+def test_status_change_sends_sms(app, client):
+    from app.extensions import db
+    from app.models import User
+    from app.utils.sms_utils import get_dispatcher
+    from tests.helpers import auth_headers, create_incident
+
+    app.config.update(SMS_PROVIDER="fake", SMS_BATCH_WAIT=0, EMAIL_OUTBOX_THREAD=False)
+    incident_id = create_incident(client, auth_headers(client))
+    auth_headers(client, email="admin@example.com", phone="0700000010")
+    User.query.filter_by(email="admin@example.com").first().role = "admin"
+    db.session.commit()
+    admin_headers = auth_headers(client, email="admin@example.com", phone="0700000010")
+
+    for _ in range(2):  # the second update changes nothing and sends nothing
+        response = client.patch(f"/api/v1/admin/incidents/{incident_id}/status", headers=admin_headers,
+                                json={"status": "approved"})
+        assert response.status_code == 200
+
+    dispatcher = get_dispatcher()
+    dispatcher.flush()
+    dispatcher.stop()
+    assert [(m.phone, m.text) for m in dispatcher.provider.sent] == [
+        ("+254700000001", f"Your incident #{incident_id} 'Road Accident' is now approved.")
+    ]
+
+
+
+def test_default_provider_sends_nothing(app):
+    from app.utils.sms_utils import send_sms
+
+    app.config.pop("SMS_PROVIDER", None)
+    assert send_sms("0700000001", "hello") is False
+    assert "sms_dispatcher" not in app.extensions
+
+
+def test_normalize_phone():
+    assert normalize_phone("0712 345 678", "254") == "+254712345678"
+    assert normalize_phone("254712345678", "254") == "+254712345678"
+    assert normalize_phone("+254-712-345-678", "254") == "+254712345678"
+    assert normalize_phone("00254712345678", "254") == "+254712345678"
+
+
+def test_africastalking_matches_e164_recipients(monkeypatch):
+    def urlopen(req, timeout):
+        return io.StringIO(json.dumps({"SMSMessageData": {"Recipients": [
+            {"number": "+254700000001", "status": "Success"},
+            {"number": "+254700000002", "status": "InvalidPhoneNumber"},
+        ]}}))
+
+    monkeypatch.setattr(sms_utils.urlrequest, "urlopen", urlopen)
+    provider = AfricasTalkingProvider({"SMS_COUNTRY_CODE": "254"})
+    failed = provider.send_batch([SMSMessage("0700000001", "hi", 0), SMSMessage("+254700000002", "hi", 0)])
+    assert [m.phone for m in failed] == ["+254700000002"]
@@ -0,0 +1,153 @@
+from datetime import datetime
+
+from app.extensions import db
+from app.models import User
+from tests.helpers import admin_headers
+
+
+def test_user_directory_search_sort_and_pages(app, client):
+    headers = admin_headers(client)
+    for i in range(5):
+        user = User(name=f"Jane {i}", email=f"jane{i}@example.com", phone=f"07200000{i:02d}", points=i * 10)
+        user.password = "secret123"
+        db.session.add(user)
+    db.session.commit()
+
+    response = client.get("/api/v1/users/?q=JANE&sort=-points&limit=2", headers=headers)
+    assert [u["points"] for u in response.get_json()] == [40, 30]
+    assert response.headers["X-Total-Count"] == "5"
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/v1/users/?q=jane&sort=-points&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=headers)
+        seen += [u["points"] for u in response.get_json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [40, 30, 20, 10, 0]
+
+    assert len(client.get("/api/v1/users/?q=0720000003", headers=headers).get_json()) == 1
+    assert len(client.get("/api/v1/users/?role=admin", headers=headers).get_json()) == 1
+    assert client.get("/api/v1/users/?sort=password_hash", headers=headers).status_code == 400
+
+
+def test_user_directory_estimates_large_totals(app, client):
+    headers = admin_headers(client)
+    app.config["PAGINATION_EXACT_COUNT_LIMIT"] = 0
+    response = client.get("/api/v1/users/", headers=headers)
+    assert response.headers["X-Total-Count-Estimated"] == "true"
+
+
+def test_redemption_history_pages_and_report(app, client):
+    from datetime import datetime
+    from app.models import RewardRedemption
+    from tests.helpers import auth_headers
+
+    headers = auth_headers(client)
+    user = User.query.filter_by(email="reporter@example.com").first()
+    for day, reward, points in [(1, "airtime", 10), (2, "airtime", 20), (2, "coupon", 5), (9, "coupon", 15)]:
+        db.session.add(RewardRedemption(
+            user_id=user.id, reward_name=reward, points_spent=points, redeemed_at=datetime(2025, 3, day, 12)
+        ))
+    db.session.commit()
+
+    response = client.get("/api/v1/users/redemptions?limit=3", headers=headers)
+    assert [r["points_spent"] for r in response.get_json()] == [15, 5, 20]
+    assert response.headers["X-Total-Count"] == "4"
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/api/v1/users/redemptions?limit=3&cursor={cursor}", headers=headers)
+    assert [r["points_spent"] for r in response.get_json()] == [10]
+    assert "X-Next-Cursor" not in response.headers
+
+    summary = client.get("/api/v1/users/redemptions/summary", headers=headers).get_json()
+    assert summary["points_spent"] == 50
+    assert [(r["reward_name"], r["points_spent"]) for r in summary["by_reward"]] == [("airtime", 30), ("coupon", 20)]
+
+    report = client.get("/api/v1/admin/redemptions/report?bucket=week&from=2025-03-01&to=2025-03-08",
+                        headers=admin_headers(client)).get_json()
+    assert report["totals"] == {"redemptions": 3, "points_spent": 35, "users": 1}
+    assert [(b["bucket"], b["reward_name"], b["points_spent"]) for b in report["by_bucket"]] == [
+        ("2025-02-24", "airtime", 30), ("2025-02-24", "coupon", 5)
+    ]
+
+
+def test_bulk_status_role_and_points(app, client):
+    from app.models import AuditLog, PointsTransaction
+    from app.utils.audit import get_audit_writer
+    from tests.helpers import auth_headers
+
+    headers = admin_headers(client)
+    spam_headers = auth_headers(client, email="spam1@example.com", phone="0730000001")
+    auth_headers(client, email="spam2@example.com", phone="0730000002")
+    ids = [u.id for u in User.query.filter(User.email.like("spam%")).all()]
+
+    response = client.patch("/api/v1/users/bulk/status", headers=headers,
+                            json={"status": "suspended", "filter": {"q": "spam"}})
+    assert response.get_json()["updated"] == 2
+    assert client.get("/api/v1/users/points", headers=spam_headers).status_code == 401
+
+    # The acting admin is never touched by their own bulk change
+    response = client.patch("/api/v1/users/bulk/role", headers=headers,
+                            json={"role": "moderator", "filter": {"role": "admin"}})
+    assert response.get_json()["updated"] == 0
+
+    response = client.post("/api/v1/users/bulk/points", headers=headers, json={"delta": 5, "ids": ids})
+    assert response.get_json()["updated"] == 2
+    response = client.post("/api/v1/users/bulk/points", headers=headers, json={"delta": -8, "ids": ids})
+    assert (response.get_json()["updated"], response.get_json()["skipped"]) == (0, 2)
+    assert PointsTransaction.query.filter(PointsTransaction.user_id.in_(ids)).count() == 2
+
+    # One audit row per user changed, so each user's history shows the bulk change
+    get_audit_writer().flush()
+    rows = client.get(f"/api/v1/admin/audit?target_type=user&target_id={ids[0]}", headers=headers).get_json()
+    assert [(e["action"], e["details"]) for e in rows] == [
+        ("user.points", {"updated": 2, "delta": 5}),
+        ("user.status", {"filter": {"q": "spam"}, "updated": 2, "new": "suspended"}),
+    ]
+    events = AuditLog.query.filter(AuditLog.action.like("user.%")).all()
+    assert sorted((e.action, e.target_id) for e in events) == sorted(
+        [("user.status", i) for i in ids] + [("user.points", i) for i in ids])
+
+    assert client.patch("/api/v1/users/bulk/status", headers=headers, json={"status": "active"}).status_code == 400
+
+
+
+def test_edit_user_rejects_non_integer_points(app, client):
+    from tests.helpers import auth_headers
+
+    headers = admin_headers(client)
+    auth_headers(client, email="jane@example.com", phone="0730000003")
+    user_id = User.query.filter_by(email="jane@example.com").first().id
+    for points in ("abc", None, 1.5, True):
+        response = client.put(f"/api/v1/users/{user_id}", headers=headers, json={"points": points})
+        assert response.status_code == 400
+    assert client.put(f"/api/v1/users/{user_id}", headers=headers, json={"points": 7}).status_code == 200
+    assert db.session.get(User, user_id).points == 7
+
+def test_user_directory_pages_through_null_sort_values(app, client):
+    headers = admin_headers(client)
+    for i in range(4):
+        user = User(name=f"Null {i}", email=f"null{i}@example.com", phone=f"07300000{i:02d}",
+                    points=i, created_at=datetime(2025, 5, i + 1))
+        user.password = "secret123"
+        db.session.add(user)
+    db.session.commit()
+    # Column defaults replace an explicit None on insert, so blank the values afterwards
+    db.session.execute(db.update(User).where(User.name.in_(["Null 1", "Null 3"])).values(points=None))
+    db.session.execute(db.update(User).where(User.name.in_(["Null 0", "Null 1"])).values(created_at=None))
+    db.session.commit()
+
+    for sort in ("points", "-points", "created_at", "-created_at"):
+        seen, cursor = [], None
+        while True:
+            url = f"/api/v1/users/?q=null&sort={sort}&limit=1" + (f"&cursor={cursor}" if cursor else "")
+            response = client.get(url, headers=headers)
+            seen += [u["name"] for u in response.get_json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert sorted(seen) == ["Null 0", "Null 1", "Null 2", "Null 3"], sort
+    # NULL created_at sorts as the oldest, ties in id order
+    assert seen[-2:] == ["Null 1", "Null 0"]
@@ -14,7 +14,6 @@ export const AdminControlPanel = () => {
     totalUsers: 0,
     avgResponse: "0min",
   })
-  const [users, setUsers] = useState([])
   const [loading, setLoading] = useState(true)
 
   const API_BASE = import.meta.env.VITE_API_BASE_URL
@@ -28,108 +27,35 @@ export const AdminControlPanel = () => {
 
   const fetchAdminData = async () => {
     try {
-      console.log("[v0] Fetching admin data...")
-      console.log("[v0] API_BASE:", API_BASE)
-      console.log("[v0] Token:", token ? "Present" : "Missing")
-
-      // Stats will be calculated from the actual data we fetch
-
-      console.log("[v0] Fetching users from:", `${API_BASE}/users/`)
-      const usersResponse = await fetch(`${API_BASE}/users/`, {
+      // One request: the backend keeps the counters, so we no longer pull every user and report
+      const response = await fetch(`${API_BASE}/admin/summary`, {
         headers: {
           Authorization: `Bearer ${token}`,
           "Content-Type": "application/json",
         },
       })
 
-      console.log("[v0] Users response status:", usersResponse.status)
-      const usersText = await usersResponse.text()
-      console.log("[v0] Users raw response:", usersText)
-
-      if (usersResponse.ok) {
-        let usersData
-        try {
-          usersData = JSON.parse(usersText)
-        } catch (e) {
-          console.error("[v0] Failed to parse users JSON:", e)
-          setUsers([])
-          setLoading(false)
-          return
-        }
-
-        let usersArray = []
-        if (Array.isArray(usersData)) {
-          usersArray = usersData
-        } else if (usersData.users && Array.isArray(usersData.users)) {
-          usersArray = usersData.users
-        } else if (usersData.data && Array.isArray(usersData.data)) {
-          usersArray = usersData.data
-        }
-
-        console.log("[v0] Users data received:", usersArray.length, "users")
-        setUsers(usersArray)
-        setStats((prev) => ({
-          ...prev,
-          totalUsers: usersArray.length,
-        }))
-      } else {
-        console.error("[v0] Failed to fetch users. Status:", usersResponse.status, "Response:", usersText)
-        setUsers([])
+      if (!response.ok) {
+        console.error("[v0] Failed to fetch admin summary. Status:", response.status)
+        return
       }
 
-      console.log("[v0] Fetching reports from:", `${API_BASE}/incidents/`)
-      const reportsResponse = await fetch(`${API_BASE}/incidents/`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-          "Content-Type": "application/json",
-        },
+      const summary = await response.json()
+      const byStatus = summary.incidents?.by_status || {}
+      setStats({
+        totalReports: summary.incidents?.total || 0,
+        activeReports: (summary.incidents?.total || 0) - (byStatus.resolved || 0) - (byStatus.rejected || 0),
+        totalUsers: summary.users?.total || 0,
+        avgResponse: "5min", // Default value since we don't have this data from backend
       })
-
-      console.log("[v0] Reports response status:", reportsResponse.status)
-      const reportsText = await reportsResponse.text()
-      console.log("[v0] Reports raw response:", reportsText)
-
-      if (reportsResponse.ok) {
-        let reportsData
-        try {
-          reportsData = JSON.parse(reportsText)
-        } catch (e) {
-          console.error("[v0] Failed to parse reports JSON:", e)
-          setLoading(false)
-          return
-        }
-
-        let reportsArray = []
-        if (Array.isArray(reportsData)) {
-          reportsArray = reportsData
-        } else if (reportsData.incidents && Array.isArray(reportsData.incidents)) {
-          reportsArray = reportsData.incidents
-        } else if (reportsData.data && Array.isArray(reportsData.data)) {
-          reportsArray = reportsData.data
-        }
-
-        console.log("[v0] Reports data received:", reportsArray.length, "reports")
-        const activeReports = reportsArray.filter((r) => r.status !== "resolved" && r.status !== "rejected").length
-
-        setStats((prev) => ({
-          ...prev,
-          totalReports: reportsArray.length,
-          activeReports: activeReports,
-          avgResponse: "5min", // Default value since we don't have this data from backend
-        }))
-      } else {
-        console.error("[v0] Failed to fetch reports. Status:", reportsResponse.status, "Response:", reportsText)
-      }
     } catch (error) {
       console.error("[v0] Error fetching admin data:", error)
-      console.error("[v0] Error stack:", error.stack)
       setStats({
         totalReports: 0,
         activeReports: 0,
         totalUsers: 0,
         avgResponse: "0min",
       })
-      setUsers([])
     } finally {
       setLoading(false)
     }
@@ -1,6 +1,7 @@
 import { StrictMode } from 'react'
 import { createRoot } from 'react-dom/client'
 import './index.css'
+import './utils/api.js' // installs the read-your-writes fetch wrapper
 import App from './App.jsx'
 
 createRoot(document.getElementById('root')).render(
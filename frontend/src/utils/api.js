@@ -4,6 +4,29 @@ console.log("[v0] API_BASE configured as:", API_BASE)
 console.log("[v0] Environment mode:", import.meta.env.MODE)
 console.log("[v0] Full API URL will be:", window.location.origin + API_BASE)
 
+// Read-your-writes with read replicas: after a write the API returns X-DB-Primary-Until,
+// and GETs that send it back are served by the primary database until the replicas have
+// caught up. Components call fetch directly, so it is echoed here for every API request.
+const PRIMARY_UNTIL_HEADER = "X-DB-Primary-Until"
+let primaryUntil = null
+const nativeFetch = window.fetch.bind(window)
+
+window.fetch = async (input, init = {}) => {
+  const url = typeof input === "string" ? input : input.url ?? String(input)
+  if (!url.startsWith(API_BASE)) {
+    return nativeFetch(input, init)
+  }
+
+  if (primaryUntil) {
+    const headers = new Headers(init.headers ?? (input instanceof Request ? input.headers : undefined))
+    headers.set(PRIMARY_UNTIL_HEADER, primaryUntil)
+    init = { ...init, headers }
+  }
+  const response = await nativeFetch(input, init)
+  primaryUntil = response.headers.get(PRIMARY_UNTIL_HEADER) ?? primaryUntil
+  return response
+}
+
 export const getAuthHeaders = () => {
   const token = localStorage.getItem("token")
   return {